@@ -0,0 +1,595 @@
+import os
+import contextlib
+import gzip
+import shutil
+import stat
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Set, Tuple
+
+from copy_engine import CopyProgress
+
+
+ZIP = 'zip'
+TAR = 'tar'
+TAR_GZ = 'tar.gz'
+TAR_ZST = 'tar.zst'
+
+FORMATS = (ZIP, TAR, TAR_GZ, TAR_ZST)
+
+_SUFFIXES = (('.tar.gz', TAR_GZ), ('.tgz', TAR_GZ), ('.tar.zst', TAR_ZST), ('.tzst', TAR_ZST),
+             ('.tar', TAR), ('.zip', ZIP))
+
+# Members that are already compressed are stored in zip archives rather than deflated again
+_STORED_EXTENSIONS = {'.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar', '.jpg', '.jpeg', '.png',
+                      '.gif', '.webp', '.mp3', '.mp4', '.mkv', '.avi', '.mov', '.docx', '.xlsx', '.pptx'}
+
+
+def archive_format(path: str) -> Optional[str]:
+    """Archive format implied by path's extension, or None."""
+    lower = path.lower()
+    for suffix, fmt in _SUFFIXES:
+        if lower.endswith(suffix):
+            return fmt
+    return None
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("tar.zst archives need the zstandard package (pip install zstandard)") from None
+    return zstandard
+
+
+class ArchiveEntry:
+    """One member of an archive as reported by ArchiveEngine.list_members()."""
+
+    __slots__ = ('name', 'size', 'compressed_size', 'mtime', 'is_dir')
+
+    def __init__(self, name: str, size: int, compressed_size: Optional[int], mtime: float, is_dir: bool):
+        self.name = name
+        self.size = size
+        self.compressed_size = compressed_size
+        self.mtime = mtime
+        self.is_dir = is_dir
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ArchiveResult:
+    def __init__(self):
+        self.files: List[str] = []
+        self.skipped: List[Tuple[str, str]] = []
+        self.errors: List[Tuple[str, str]] = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.elapsed = 0.0
+        self.cancelled = False
+
+    @property
+    def success(self) -> bool:
+        return not self.errors and not self.cancelled
+
+
+ProgressCallback = Callable[[CopyProgress], None]
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class _ProgressReader:
+    """File wrapper that reports bytes read and stops reading once the engine is cancelled."""
+
+    def __init__(self, fileobj, engine: 'ArchiveEngine', path: str):
+        self._file = fileobj
+        self._engine = engine
+        self._path = path
+
+    def read(self, size: int = -1) -> bytes:
+        if self._engine.cancelled:
+            raise _Cancelled()
+        data = self._file.read(size)
+        self._engine._advance(len(data), self._path)
+        return data
+
+
+class _ParallelGzipWriter:
+    """Write-only stream that gzips fixed-size blocks on a thread pool.
+
+    Each block becomes a separate gzip member; concatenated members form a
+    valid gzip file that gzip, tarfile and other tools read as one stream.
+    At most max_pending blocks are held in memory at once.
+    """
+
+    def __init__(self, raw, pool: ThreadPoolExecutor, level: int, block_size: int, max_pending: int):
+        self._raw = raw
+        self._pool = pool
+        self._level = level
+        self._block_size = block_size
+        self._max_pending = max_pending
+        self._buffer = bytearray()
+        self._pending: 'deque[Future]' = deque()
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self._block_size:
+            self._submit(bytes(self._buffer[:self._block_size]))
+            del self._buffer[:self._block_size]
+        return len(data)
+
+    def _submit(self, block: bytes):
+        self._pending.append(self._pool.submit(gzip.compress, block, self._level, mtime=0))
+        while len(self._pending) > self._max_pending:
+            self._raw.write(self._pending.popleft().result())
+
+    def close(self):
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        while self._pending:
+            self._raw.write(self._pending.popleft().result())
+
+
+class ArchiveEngine:
+    """Creates, lists and extracts zip, tar, tar.gz and tar.zst archives.
+
+    Data is streamed in buffer_size chunks and never held whole in memory.
+    When creating zip archives, members are deflated in parallel into spool
+    files (in memory up to spool_size bytes, on disk beyond) and appended to
+    the archive in order. tar.gz archives are compressed in block_size blocks
+    on the pool, and tar.zst uses zstandard's own worker threads; tar.zst
+    needs the optional zstandard package. Zip members are extracted in
+    parallel and only the requested members are read. A tar stream is read
+    sequentially, stopping after the last member named exactly.
+
+    Archives are written to a temporary file beside archive_path and moved into
+    place when complete, so a cancelled or failed create leaves nothing
+    behind. Progress is reported as copy_engine.CopyProgress snapshots
+    counting uncompressed bytes, from worker threads, throttled to
+    progress_interval seconds.
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 compression_level: int = 6,
+                 buffer_size: int = 1024 * 1024,
+                 block_size: int = 1024 * 1024,
+                 spool_size: int = 8 * 1024 * 1024,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 progress_interval: float = 0.1):
+        self.max_workers = max_workers or min(16, os.cpu_count() or 1)
+        self.compression_level = compression_level
+        self.buffer_size = buffer_size
+        self.block_size = block_size
+        self.spool_size = spool_size
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._progress = CopyProgress()
+        self._start = 0.0
+        self._last_report = 0.0
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    # Creating
+
+    def create(self, sources: List[str], archive_path: str, format: Optional[str] = None) -> ArchiveResult:
+        """Pack files and directory trees into archive_path; each source is stored under its own name."""
+        format = format or archive_format(archive_path)
+        if format not in FORMATS:
+            raise ValueError(f"Unknown archive format for {archive_path}; expected one of {', '.join(FORMATS)}")
+        zstandard = _zstandard() if format == TAR_ZST else None
+
+        result = ArchiveResult()
+        self._start = time.monotonic()
+        entries = self._plan(sources, result)
+        self._progress = CopyProgress(sum(max(size, 0) for _, _, size in entries),
+                                      sum(size >= 0 for _, _, size in entries))
+        self._report(force=True)
+
+        directory = os.path.dirname(os.path.abspath(archive_path))
+        fd, temp_path = tempfile.mkstemp(prefix='.' + os.path.basename(archive_path) + '.', suffix='.part', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as raw:
+                if format == ZIP:
+                    self._create_zip(raw, entries, result)
+                else:
+                    self._create_tar(raw, entries, format, zstandard, result)
+            if self.cancelled:
+                raise _Cancelled()
+            os.replace(temp_path, archive_path)
+            result.bytes_out = os.path.getsize(archive_path)
+        except _Cancelled:
+            result.cancelled = True
+        except Exception as e:
+            result.errors.append((archive_path, str(e)))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        result.bytes_in = self._progress.bytes_done
+        result.elapsed = time.monotonic() - self._start
+        self._report(force=True)
+        return result
+
+    def _plan(self, sources: List[str], result: ArchiveResult) -> List[Tuple[str, str, int]]:
+        """(path, archive name, size) for every member; size is -1 for directories and links."""
+        entries = []
+        for source in sources:
+            source = os.path.abspath(source)
+            base = os.path.basename(source.rstrip(os.sep)) or os.path.splitdrive(source)[0].rstrip(':')
+            try:
+                stats = os.lstat(source)
+            except OSError as e:
+                result.errors.append((source, str(e)))
+                continue
+            if not stat.S_ISDIR(stats.st_mode):
+                entries.append((source, base, stats.st_size if stat.S_ISREG(stats.st_mode) else -1))
+                continue
+            entries.append((source, base, -1))
+            for root, dirnames, filenames in os.walk(source, onerror=lambda e: result.errors.append((e.filename, str(e)))):
+                dirnames.sort()
+                relative = os.path.relpath(root, source)
+                prefix = base + '/' if relative == '.' else f"{base}/{relative.replace(os.sep, '/')}/"
+                for name in dirnames:
+                    path = os.path.join(root, name)
+                    # Links to directories are listed but not descended into
+                    entries.append((path, prefix + name, -1))
+                for name in sorted(filenames):
+                    path = os.path.join(root, name)
+                    try:
+                        stats = os.lstat(path)
+                    except OSError as e:
+                        result.errors.append((path, str(e)))
+                        continue
+                    entries.append((path, prefix + name, stats.st_size if stat.S_ISREG(stats.st_mode) else -1))
+        return entries
+
+    def _create_zip(self, raw, entries: List[Tuple[str, str, int]], result: ArchiveResult):
+        with zipfile.ZipFile(raw, 'w', allowZip64=True) as archive, \
+                ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="archive") as pool:
+            pending: 'deque[Tuple[str, Future]]' = deque()
+            try:
+                for path, name, size in entries:
+                    if self.cancelled:
+                        raise _Cancelled()
+                    if size < 0:
+                        if os.path.isdir(path) and not os.path.islink(path):
+                            archive.writestr(zipfile.ZipInfo.from_file(path, name), b'')
+                        else:
+                            result.skipped.append((path, "links and special files are not stored in zip archives"))
+                        continue
+                    pending.append((path, pool.submit(self._deflate_member, path, name)))
+                    # Bound the number of compressed members waiting to be written
+                    while len(pending) > self.max_workers * 2:
+                        self._append_member(archive, *pending.popleft(), result)
+                while pending:
+                    self._append_member(archive, *pending.popleft(), result)
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def _deflate_member(self, path: str, name: str):
+        info = zipfile.ZipInfo.from_file(path, name)
+        stored = os.path.splitext(name)[1].lower() in _STORED_EXTENSIONS
+        info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+        compressor = None if stored else zlib.compressobj(self.compression_level, zlib.DEFLATED, -15)
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        try:
+            crc = 0
+            size = 0
+            with open(path, 'rb') as f:
+                reader = _ProgressReader(f, self, path)
+                while True:
+                    chunk = reader.read(self.buffer_size)
+                    if not chunk:
+                        break
+                    crc = zlib.crc32(chunk, crc)
+                    size += len(chunk)
+                    spool.write(compressor.compress(chunk) if compressor else chunk)
+            if compressor:
+                spool.write(compressor.flush())
+            info.CRC = crc
+            info.file_size = size
+            info.compress_size = spool.tell()
+            return info, spool
+        except BaseException:
+            spool.close()
+            raise
+
+    def _append_member(self, archive: zipfile.ZipFile, path: str, future: Future, result: ArchiveResult):
+        try:
+            info, spool = future.result()
+        except OSError as e:
+            result.errors.append((path, str(e)))
+            self._fail(path)
+            return
+        with spool:
+            # zipfile cannot append data compressed elsewhere, so write the
+            # member the way ZipFile.write() does once it has compressed it
+            zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+            info.header_offset = archive.fp.tell()
+            archive.fp.write(info.FileHeader(zip64))
+            spool.seek(0)
+            shutil.copyfileobj(spool, archive.fp, self.buffer_size)
+            archive.filelist.append(info)
+            archive.NameToInfo[info.filename] = info
+            archive.start_dir = archive.fp.tell()
+            archive._didModify = True
+        result.files.append(info.filename)
+        with self._lock:
+            self._progress.files_done += 1
+
+    def _create_tar(self, raw, entries: List[Tuple[str, str, int]], format: str, zstandard, result: ArchiveResult):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="archive") as pool:
+            if format == TAR_GZ:
+                out = _ParallelGzipWriter(raw, pool, self.compression_level, self.block_size, self.max_workers * 2)
+            elif format == TAR_ZST:
+                compressor = zstandard.ZstdCompressor(level=self.compression_level, threads=self.max_workers)
+                out = compressor.stream_writer(raw, closefd=False)
+            else:
+                out = raw
+            with tarfile.open(fileobj=out, mode='w|', format=tarfile.PAX_FORMAT,
+                              bufsize=self.buffer_size) as archive:
+                for path, name, size in entries:
+                    if self.cancelled:
+                        raise _Cancelled()
+                    try:
+                        info = archive.gettarinfo(path, name)
+                        source = open(path, 'rb') if info is not None and info.isreg() else None
+                    except OSError as e:
+                        result.errors.append((path, str(e)))
+                        self._fail(path)
+                        continue
+                    if info is None:
+                        result.skipped.append((path, "sockets cannot be archived"))
+                    elif source is None:
+                        archive.addfile(info)
+                    else:
+                        # A read error part way through a member leaves the stream unusable, so it propagates
+                        with source:
+                            archive.addfile(info, _ProgressReader(source, self, path))
+                        result.files.append(name)
+                        with self._lock:
+                            self._progress.files_done += 1
+            if out is not raw:
+                out.close()
+
+    # Listing
+
+    def list_members(self, archive_path: str) -> List[ArchiveEntry]:
+        """Members of archive_path. Zip archives are listed from their central
+        directory; tar archives have to be decompressed to be listed."""
+        if archive_format(archive_path) == ZIP or zipfile.is_zipfile(archive_path):
+            with zipfile.ZipFile(archive_path) as archive:
+                return [ArchiveEntry(info.filename, info.file_size, info.compress_size,
+                                     _zip_mtime(info), info.is_dir()) for info in archive.infolist()]
+        with self._open_tar(archive_path) as archive:
+            return [ArchiveEntry(info.name, info.size, None, info.mtime, info.isdir()) for info in archive]
+
+    # Extracting
+
+    def extract(self, archive_path: str, destination: str,
+                members: Optional[Iterable[str]] = None) -> ArchiveResult:
+        """Extract archive_path into destination.
+
+        members restricts extraction to those names; a directory name selects
+        everything below it. Members whose names would land outside
+        destination, links and special files are skipped.
+        """
+        result = ArchiveResult()
+        self._start = time.monotonic()
+        wanted = None if members is None else {member.replace('\\', '/').rstrip('/') for member in members}
+        try:
+            os.makedirs(destination, exist_ok=True)
+            if archive_format(archive_path) == ZIP or zipfile.is_zipfile(archive_path):
+                self._extract_zip(archive_path, destination, wanted, result)
+            else:
+                self._extract_tar(archive_path, destination, wanted, result)
+        except _Cancelled:
+            pass
+        except (OSError, zipfile.BadZipFile, tarfile.TarError, ValueError) as e:
+            result.errors.append((archive_path, str(e)))
+        result.cancelled = self.cancelled
+        result.bytes_in = self._progress.bytes_done
+        result.elapsed = time.monotonic() - self._start
+        self._report(force=True)
+        return result
+
+    def _extract_zip(self, archive_path: str, destination: str, wanted: Optional[Set[str]], result: ArchiveResult):
+        with zipfile.ZipFile(archive_path) as archive:
+            infos = [info for info in archive.infolist() if _selected(info.filename, wanted)]
+        files = []
+        directories = []
+        for info in infos:
+            target = _target(destination, info.filename)
+            if target is None:
+                result.skipped.append((info.filename, "path outside the destination"))
+            elif info.is_dir():
+                directories.append((target, info))
+            elif stat.S_ISLNK(info.external_attr >> 16):
+                result.skipped.append((info.filename, "links are not extracted"))
+            else:
+                files.append((target, info))
+
+        self._progress = CopyProgress(sum(info.file_size for _, info in files), len(files))
+        self._report(force=True)
+        for target, _ in directories:
+            os.makedirs(target, exist_ok=True)
+
+        handles: List[zipfile.ZipFile] = []
+        local = threading.local()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="archive") as pool:
+            futures = [(info.filename, pool.submit(self._extract_zip_member, archive_path, local, handles, info, target))
+                       for target, info in files]
+            for name, future in futures:
+                try:
+                    future.result()
+                    result.files.append(name)
+                except _Cancelled:
+                    pass
+                except (OSError, zipfile.BadZipFile, zlib.error) as e:
+                    result.errors.append((name, str(e)))
+                    self._fail(name)
+        for handle in handles:
+            handle.close()
+        for target, info in reversed(directories):
+            _set_mtime(target, _zip_mtime(info))
+
+    def _extract_zip_member(self, archive_path: str, local: threading.local, handles: List[zipfile.ZipFile],
+                            info: zipfile.ZipInfo, target: str):
+        if self.cancelled:
+            raise _Cancelled()
+        # Each worker decompresses through its own handle on the archive
+        archive = getattr(local, 'archive', None)
+        if archive is None:
+            archive = local.archive = zipfile.ZipFile(archive_path)
+            with self._lock:
+                handles.append(archive)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with archive.open(info) as source, open(target, 'wb') as out:
+            self._stream(_ProgressReader(source, self, info.filename), out)
+        mode = (info.external_attr >> 16) & 0o777
+        if mode and os.name != 'nt':
+            os.chmod(target, mode)
+        _set_mtime(target, _zip_mtime(info))
+        with self._lock:
+            self._progress.files_done += 1
+
+    def _extract_tar(self, archive_path: str, destination: str, wanted: Optional[Set[str]], result: ArchiveResult):
+        # The uncompressed size is unknown until the stream has been read
+        self._progress = CopyProgress()
+        self._report(force=True)
+        remaining = set(wanted) if wanted is not None else None
+        # Once a selected directory is seen, its members may appear anywhere later on
+        open_ended = False
+        directories = []
+        with self._open_tar(archive_path) as archive:
+            for info in archive:
+                if self.cancelled:
+                    raise _Cancelled()
+                name = info.name.rstrip('/')
+                if not _selected(name, wanted):
+                    continue
+                target = _target(destination, name)
+                if target is None:
+                    result.skipped.append((info.name, "path outside the destination"))
+                elif info.isdir():
+                    os.makedirs(target, exist_ok=True)
+                    directories.append((target, info.mtime))
+                elif not info.isreg():
+                    result.skipped.append((info.name, "links and special files are not extracted"))
+                else:
+                    try:
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        with archive.extractfile(info) as source, open(target, 'wb') as out:
+                            self._stream(_ProgressReader(source, self, name), out)
+                        if os.name != 'nt':
+                            os.chmod(target, info.mode & 0o777)
+                        _set_mtime(target, info.mtime)
+                        result.files.append(info.name)
+                        with self._lock:
+                            self._progress.files_done += 1
+                    except OSError as e:
+                        result.errors.append((info.name, str(e)))
+                        self._fail(info.name)
+                if remaining is not None:
+                    open_ended = open_ended or info.isdir() or name not in remaining
+                    remaining.discard(name)
+                    if not remaining and not open_ended:
+                        break
+        for target, mtime in reversed(directories):
+            _set_mtime(target, mtime)
+
+    @contextlib.contextmanager
+    def _open_tar(self, archive_path: str) -> Iterator[tarfile.TarFile]:
+        if archive_format(archive_path) == TAR_ZST:
+            with open(archive_path, 'rb') as raw, \
+                    _zstandard().ZstdDecompressor().stream_reader(raw) as reader, \
+                    tarfile.open(fileobj=reader, mode='r|', bufsize=self.buffer_size) as archive:
+                yield archive
+        else:
+            # Opened through GzipFile, which, unlike tarfile's stream mode,
+            # reads the multi-member gzip files written by create()
+            with tarfile.open(archive_path, mode='r:*') as archive:
+                yield archive
+
+    def _stream(self, source, out):
+        while True:
+            chunk = source.read(self.buffer_size)
+            if not chunk:
+                break
+            out.write(chunk)
+
+    # Progress
+
+    def _advance(self, count: int, current: str):
+        with self._lock:
+            self._progress.bytes_done += count
+            self._progress.current = current
+        self._report()
+
+    def _fail(self, path: str):
+        with self._lock:
+            self._progress.files_failed += 1
+            self._progress.current = path
+
+    def _report(self, force: bool = False):
+        if self.progress_callback is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_report < self.progress_interval:
+                return
+            self._last_report = now
+            self._progress.elapsed = now - self._start
+            snapshot = self._progress.copy()
+        self.progress_callback(snapshot)
+
+
+def _selected(name: str, wanted: Optional[Set[str]]) -> bool:
+    if wanted is None:
+        return True
+    name = name.rstrip('/')
+    if name in wanted:
+        return True
+    return any(name.startswith(prefix + '/') for prefix in wanted)
+
+
+def _target(destination: str, name: str) -> Optional[str]:
+    """Path for member name under destination, or None if it would escape destination."""
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.')]
+    if not parts or name.startswith(('/', '\\')) or '..' in parts or os.path.splitdrive(parts[0])[0]:
+        return None
+    if os.name == 'nt' and any(':' in part for part in parts):
+        return None
+    return os.path.join(destination, *parts)
+
+
+def _zip_mtime(info: zipfile.ZipInfo) -> float:
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return 0.0
+
+
+def _set_mtime(path: str, mtime: float):
+    try:
+        os.utime(path, (mtime, mtime))
+    except OSError:
+        pass
@@ -0,0 +1,256 @@
+import asyncio
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncIterator, Callable, Iterator, Optional, Tuple
+
+from file_manager import FileManager, ListingEntry
+
+
+DEFAULT_LIMITS = {
+    'listing': 16,
+    'properties': 64,
+    'search': 4,
+    'copy': 4,
+    'archive': 2,
+    'move': 8,
+    'delete': 8,
+    'create': 32,
+    'drives': 1,
+    'usage': 2,
+}
+
+_DONE = object()
+
+
+class _Failure:
+    __slots__ = ('error',)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _pump(iterator: Iterator, items: 'queue.Queue', stop: threading.Event):
+    """Feed iterator into items until it is exhausted or stop is set, then put _DONE (or a _Failure)."""
+    last: Any = _DONE
+    try:
+        for item in iterator:
+            if not _put(items, item, stop):
+                break
+    except Exception as e:
+        last = _Failure(e)
+    finally:
+        if stop.is_set():
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+        _put(items, last, stop)
+
+
+def _put(items: 'queue.Queue', item: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _take(items: 'queue.Queue', count: int, interval: float, stop: threading.Event) -> Tuple[List[Any], bool]:
+    """Up to count items, fewer if interval seconds pass after the first; also whether the stream ended.
+
+    The deadline is checked while waiting, so items that arrived are handed
+    over on time even if the producer finds nothing more for a long while.
+    """
+    batch: List[Any] = []
+    deadline = None
+    while len(batch) < count:
+        timeout = 0.1
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                break
+        try:
+            item = items.get(timeout=timeout)
+        except queue.Empty:
+            if stop.is_set():
+                return batch, True
+            continue
+        if item is _DONE:
+            return batch, True
+        if isinstance(item, _Failure):
+            raise item.error
+        batch.append(item)
+        if deadline is None:
+            deadline = time.monotonic() + interval
+    return batch, False
+
+
+class AsyncFileManager:
+    """asyncio counterpart of FileManager.
+
+    Every operation is a coroutine that runs the blocking FileManager call on
+    a shared thread pool. Each kind of operation has its own semaphore, so a
+    service can fan out thousands of calls while at most limits[kind] of them
+    occupy worker threads at once. Listing and search are also available as
+    async generators.
+    """
+
+    def __init__(self, max_workers: int = 32, limits: Optional[Dict[str, int]] = None,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="async-fm")
+        self.limits = dict(DEFAULT_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self) -> 'AsyncFileManager':
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
+
+    def _semaphore(self, kind: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(kind)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limits.get(kind, 8))
+            self._semaphores[kind] = semaphore
+        return semaphore
+
+    async def _run(self, kind: str, func: Callable, *args, **kwargs):
+        async with self._semaphore(kind):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def _iterate(self, kind: str, factory: Callable[[], Any]) -> AsyncIterator[Any]:
+        """Drive a blocking iterable from the executor, one item per hop.
+
+        The semaphore is held for the lifetime of the iteration. Closing the
+        async generator early cancels the underlying search if it supports it.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(kind):
+            iterable = await loop.run_in_executor(self.executor, factory)
+            iterator: Iterator = iter(iterable)
+            try:
+                while True:
+                    item = await loop.run_in_executor(self.executor, next, iterator, _DONE)
+                    if item is _DONE:
+                        break
+                    yield item
+            finally:
+                await self._close_iterable(iterable, iterator)
+
+    async def _iterate_batches(self, kind: str, factory: Callable[[], Any], batch_size: int = 256,
+                               batch_interval: float = 0.05) -> AsyncIterator[List[Any]]:
+        """Like _iterate, but each hop collects up to batch_size items or as many as arrive within batch_interval.
+
+        The iterable is driven by its own producer thread into a bounded queue,
+        so a batch is handed over batch_interval seconds after its first item
+        however long the producer then takes to find the next one, and a
+        consumer that stops reading stalls the producer once the queue is full.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(kind):
+            iterable = await loop.run_in_executor(self.executor, factory)
+            items: 'queue.Queue' = queue.Queue(maxsize=batch_size * 4)
+            stop = threading.Event()
+            threading.Thread(target=_pump, args=(iter(iterable), items, stop),
+                             name=f"async-fm-{kind}", daemon=True).start()
+            try:
+                while True:
+                    batch, finished = await loop.run_in_executor(
+                        self.executor, _take, items, batch_size, batch_interval, stop)
+                    if batch:
+                        yield batch
+                    if finished:
+                        break
+            finally:
+                # The producer thread closes the iterator itself once it sees stop
+                stop.set()
+                cancel = getattr(iterable, 'cancel', None)
+                if cancel is not None:
+                    cancel()
+
+    async def _close_iterable(self, iterable: Any, iterator: Iterator):
+        cancel = getattr(iterable, 'cancel', None)
+        if cancel is not None:
+            cancel()
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            try:
+                await asyncio.get_running_loop().run_in_executor(self.executor, close)
+            except ValueError:
+                # Still running in a worker after cancellation; it will wind down on its own
+                pass
+
+    async def get_directory_contents(self, path: str) -> List[Dict[str, Any]]:
+        return await self._run('listing', FileManager.get_directory_contents, path)
+
+    async def iter_directory_contents(self, path: str, chunk_size: int = 1000) -> AsyncIterator[List[ListingEntry]]:
+        async for chunk in self._iterate('listing', lambda: FileManager.iter_directory_contents(path, chunk_size)):
+            yield chunk
+
+    async def get_item_properties(self, path: str) -> Dict[str, Any]:
+        return await self._run('properties', FileManager.get_item_properties, path)
+
+    async def get_directory_size(self, path: str) -> Dict[str, Any]:
+        return await self._run('usage', FileManager.get_directory_size, path)
+
+    async def search_files(self, directory: str, query: str, recursive: bool = True) -> List[str]:
+        return await self._run('search', FileManager.search_files, directory, query, recursive)
+
+    async def iter_search_files(self, directory: str, query: str = "", recursive: bool = True,
+                                **criteria) -> AsyncIterator[str]:
+        factory = lambda: FileManager.iter_search_files(directory, query, recursive, **criteria)
+        async for path in self._iterate('search', factory):
+            yield path
+
+    async def iter_search_file_contents(self, directory: str, pattern: str, **options) -> AsyncIterator[Any]:
+        factory = lambda: FileManager.search_file_contents(directory, pattern, **options)
+        async for match in self._iterate('search', factory):
+            yield match
+
+    async def copy_item(self, source: str, destination: str, **options) -> bool:
+        return await self._run('copy', FileManager.copy_item, source, destination, **options)
+
+    async def sync_directories(self, source: str, destination: str, **options) -> bool:
+        return await self._run('copy', FileManager.sync_directories, source, destination, **options)
+
+    async def create_archive(self, sources: List[str], archive_path: str, **options) -> bool:
+        return await self._run('archive', FileManager.create_archive, sources, archive_path, **options)
+
+    async def extract_archive(self, archive_path: str, destination: str, **options) -> bool:
+        return await self._run('archive', FileManager.extract_archive, archive_path, destination, **options)
+
+    async def list_archive(self, archive_path: str) -> List[Dict[str, Any]]:
+        return await self._run('archive', FileManager.list_archive, archive_path)
+
+    async def move_item(self, source: str, destination: str) -> bool:
+        return await self._run('move', FileManager.move_item, source, destination)
+
+    async def rename_item(self, old_path: str, new_path: str) -> bool:
+        return await self._run('move', FileManager.rename_item, old_path, new_path)
+
+    async def delete_item(self, path: str, use_trash: bool = True) -> bool:
+        return await self._run('delete', FileManager.delete_item, path, use_trash)
+
+    async def create_directory(self, path: str) -> bool:
+        return await self._run('create', FileManager.create_directory, path)
+
+    async def create_file(self, path: str, content: str = "") -> bool:
+        return await self._run('create', FileManager.create_file, path, content)
+
+    async def get_drives(self) -> List[Dict[str, Any]]:
+        return await self._run('drives', FileManager.get_drives)
+
+    async def find_duplicates(self, paths: List[str], **options) -> List[Dict[str, Any]]:
+        return await self._run('usage', FileManager.find_duplicates, paths, **options)
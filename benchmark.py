@@ -0,0 +1,263 @@
+"""Synthetic-tree benchmarks for FileManager operations.
+
+Usage:
+    python benchmark.py run [--output results.json] [--repeat 5] [--warmup 1] [--seed 42] [--scale 1.0]
+    python benchmark.py compare baseline.json candidate.json [--threshold 0.10] [--min-delta 0.001]
+
+Trees are generated from a seed, so two runs with the same seed and scale
+time identical workloads. Everything runs headless.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import tempfile
+from typing import List, Dict, Any, Callable, Optional
+
+from file_manager import FileManager
+
+
+class TreeSpec:
+    def __init__(self, name: str, dirs: int, files_per_dir: int, depth: int, file_size: int,
+                 huge_files: int = 0, huge_size: int = 0):
+        self.name = name
+        self.dirs = dirs
+        self.files_per_dir = files_per_dir
+        self.depth = depth
+        self.file_size = file_size
+        self.huge_files = huge_files
+        self.huge_size = huge_size
+
+    def scaled(self, scale: float) -> 'TreeSpec':
+        return TreeSpec(self.name, max(1, int(self.dirs * scale)), max(1, int(self.files_per_dir * scale)),
+                        self.depth, self.file_size, self.huge_files, int(self.huge_size * scale))
+
+
+TREES = [
+    TreeSpec('wide', dirs=1, files_per_dir=20000, depth=1, file_size=64),
+    TreeSpec('deep', dirs=400, files_per_dir=5, depth=40, file_size=256),
+    TreeSpec('tiny_files', dirs=200, files_per_dir=100, depth=3, file_size=16),
+    TreeSpec('huge_files', dirs=1, files_per_dir=4, depth=1, file_size=1024,
+             huge_files=3, huge_size=64 * 1024 * 1024),
+]
+
+
+def generate_tree(root: str, spec: TreeSpec, seed: int) -> Dict[str, int]:
+    """Create a reproducible tree under root. Returns file and byte counts."""
+    rng = random.Random(f"{seed}:{spec.name}")
+    os.makedirs(root, exist_ok=True)
+    # Directories form chains of spec.depth levels hanging off the root
+    directories = [root]
+    for i in range(1, spec.dirs):
+        parent = directories[i - 1] if spec.depth > 1 and i % spec.depth else root
+        path = os.path.join(parent, f"dir_{i:05d}")
+        os.makedirs(path, exist_ok=True)
+        directories.append(path)
+
+    files = 0
+    total = 0
+    extensions = ['.txt', '.log', '.py', '.dat', '.csv']
+    for d_index, directory in enumerate(directories):
+        for f_index in range(spec.files_per_dir):
+            size = rng.randint(0, spec.file_size * 2)
+            name = f"file_{d_index:05d}_{f_index:05d}{rng.choice(extensions)}"
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(_random_bytes(rng, size))
+            files += 1
+            total += size
+
+    chunk = 1024 * 1024
+    for h_index in range(spec.huge_files):
+        block = (rng.getrandbits(64).to_bytes(8, 'little')) * (chunk // 8)
+        with open(os.path.join(root, f"huge_{h_index}.bin"), 'wb') as f:
+            remaining = spec.huge_size
+            while remaining > 0:
+                f.write(block[:min(chunk, remaining)])
+                remaining -= chunk
+        files += 1
+        total += spec.huge_size
+
+    # Backdate directories so listing caches treat them as settled, like real data
+    settled = time.time() - 3600
+    for directory in reversed(directories):
+        os.utime(directory, (settled, settled))
+    return {'files': files, 'bytes': total, 'directories': len(directories)}
+
+
+def _random_bytes(rng: random.Random, size: int) -> bytes:
+    return rng.getrandbits(size * 8).to_bytes(size, 'little') if size else b''
+
+
+def time_operation(func: Callable[[], Any], repeat: int, warmup: int,
+                   setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """Run func warmup + repeat times and summarise the timed runs in seconds."""
+    samples = []
+    for i in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed)
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples),
+        'max': max(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'runs': len(samples),
+    }
+
+
+def _remove(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def benchmark_tree(workdir: str, spec: TreeSpec, seed: int, repeat: int, warmup: int) -> Dict[str, Any]:
+    root = os.path.join(workdir, spec.name)
+    copy_target = os.path.join(workdir, spec.name + "_copy")
+    move_target = os.path.join(workdir, spec.name + "_moved")
+    info = generate_tree(root, spec, seed)
+    results: Dict[str, Any] = {'tree': info, 'operations': {}}
+    operations = results['operations']
+
+    def cold_listing():
+        FileManager.cache.clear()
+        FileManager.get_directory_contents(root)
+
+    operations['list_cold'] = time_operation(cold_listing, repeat, warmup)
+    operations['list_cached'] = time_operation(lambda: FileManager.get_directory_contents(root), repeat, warmup)
+    table = FileManager.get_listing_table(root)
+    operations['sort'] = time_operation(lambda: table.sort(['type', '-size', 'natural']), repeat, warmup)
+    operations['properties'] = time_operation(lambda: FileManager.get_item_properties(root), repeat, warmup)
+    operations['search'] = time_operation(
+        lambda: FileManager.search_files(root, "file_0", use_index=False), repeat, warmup)
+    operations['copy'] = time_operation(
+        lambda: FileManager.copy_item(root, copy_target), repeat, warmup, setup=lambda: _remove(copy_target))
+
+    def prepare_move():
+        _remove(move_target)
+        if not os.path.exists(copy_target):
+            FileManager.copy_item(root, copy_target)
+
+    operations['move'] = time_operation(
+        lambda: FileManager.move_item(copy_target, move_target), repeat, warmup, setup=prepare_move)
+
+    operations['delete'] = time_operation(
+        lambda: FileManager.delete_item(copy_target, use_trash=False), repeat, warmup, setup=prepare_move)
+
+    for path in (root, copy_target, move_target):
+        _remove(path)
+    return results
+
+
+def run(trees: List[TreeSpec], seed: int = 42, repeat: int = 5, warmup: int = 1, scale: float = 1.0,
+        workdir: Optional[str] = None) -> Dict[str, Any]:
+    base = tempfile.mkdtemp(prefix="fm-bench-", dir=workdir)
+    try:
+        report = {
+            'meta': {
+                'seed': seed,
+                'repeat': repeat,
+                'warmup': warmup,
+                'scale': scale,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'timestamp': time.time(),
+            },
+            'trees': {},
+        }
+        for spec in trees:
+            report['trees'][spec.name] = benchmark_tree(base, spec.scaled(scale), seed, repeat, warmup)
+        return report
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float = 0.10,
+            min_delta: float = 0.001) -> List[Dict[str, Any]]:
+    """Compare median timings. Returns one row per operation with its relative change.
+
+    A slowdown only counts as a regression if it exceeds threshold and is also
+    larger than min_delta seconds, so sub-millisecond noise is not flagged.
+    """
+    rows = []
+    for tree, data in candidate['trees'].items():
+        base_ops = baseline.get('trees', {}).get(tree, {}).get('operations', {})
+        for operation, timing in data['operations'].items():
+            if operation not in base_ops:
+                continue
+            before = base_ops[operation]['median']
+            after = timing['median']
+            change = (after - before) / before if before else 0.0
+            rows.append({
+                'tree': tree,
+                'operation': operation,
+                'baseline': before,
+                'candidate': after,
+                'change': change,
+                'regression': change > threshold and after - before > min_delta,
+            })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help="generate trees and time operations")
+    run_parser.add_argument('--output', '-o', help="write JSON results to this file")
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--warmup', type=int, default=1)
+    run_parser.add_argument('--scale', type=float, default=1.0, help="multiply tree sizes by this factor")
+    run_parser.add_argument('--tree', action='append', choices=[spec.name for spec in TREES],
+                            help="only run the named tree (repeatable)")
+    run_parser.add_argument('--workdir', help="directory for generated trees (default: system temp)")
+
+    compare_parser = sub.add_parser('compare', help="compare two result files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help="relative slowdown that counts as a regression (default 0.10)")
+    compare_parser.add_argument('--min-delta', type=float, default=0.001,
+                                help="ignore slowdowns smaller than this many seconds (default 0.001)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        trees = [spec for spec in TREES if not args.tree or spec.name in args.tree]
+        report = run(trees, args.seed, args.repeat, args.warmup, args.scale, args.workdir)
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(text)
+        else:
+            print(text)
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate = json.load(f)
+    rows = compare(baseline, candidate, args.threshold, args.min_delta)
+    regressions = 0
+    for row in rows:
+        marker = "REGRESSION" if row['regression'] else ""
+        print(f"{row['tree']:<12} {row['operation']:<12} {row['baseline'] * 1000:>10.2f} ms "
+              f"{row['candidate'] * 1000:>10.2f} ms {row['change'] * 100:>+7.1f}% {marker}")
+        regressions += row['regression']
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import os
+import re
+import mmap
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from instrumentation import instrumented, record_bytes
+
+
+SNIFF_BYTES = 8192
+SNIPPET_CHARS = 200
+
+
+class ContentMatch:
+    __slots__ = ('path', 'line_number', 'snippet')
+
+    def __init__(self, path: str, line_number: int, snippet: str):
+        self.path = path
+        self.line_number = line_number
+        self.snippet = snippet
+
+    def __iter__(self):
+        return iter((self.path, self.line_number, self.snippet))
+
+    def __reduce__(self):
+        return (ContentMatch, (self.path, self.line_number, self.snippet))
+
+    def __repr__(self) -> str:
+        return f"ContentMatch({self.path!r}, {self.line_number}, {self.snippet!r})"
+
+
+def compile_pattern(pattern: str, regex: bool = False, case_sensitive: bool = False) -> 're.Pattern':
+    flags = 0 if case_sensitive else re.IGNORECASE
+    source = pattern.encode('utf-8')
+    if not regex:
+        source = re.escape(source)
+    return re.compile(source, flags | re.MULTILINE)
+
+
+def is_binary(head: bytes) -> bool:
+    """Cheap binary sniff: a NUL byte in the first block means binary."""
+    return b'\0' in head
+
+
+def search_file(path: str, compiled: 're.Pattern', max_matches: int = 1000) -> List[ContentMatch]:
+    """Search one file through mmap, reporting at most one match per line."""
+    matches: List[ContentMatch] = []
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+            if not head or is_binary(head):
+                return matches
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                line_number = 1
+                counted_to = 0
+                next_line_start = -1
+                for match in compiled.finditer(data):
+                    start = match.start()
+                    if start < next_line_start:
+                        continue
+                    line_number += data[counted_to:start].count(b'\n')
+                    counted_to = start
+                    line_start = data.rfind(b'\n', 0, start) + 1
+                    line_end = data.find(b'\n', start)
+                    if line_end == -1:
+                        line_end = len(data)
+                    snippet = data[line_start:min(line_end, line_start + SNIPPET_CHARS * 4)]
+                    matches.append(ContentMatch(path, line_number,
+                                                snippet.decode('utf-8', 'replace').strip()[:SNIPPET_CHARS]))
+                    if len(matches) >= max_matches:
+                        break
+                    next_line_start = line_end + 1
+    except (OSError, ValueError):
+        pass
+    return matches
+
+
+def _search_batch(paths: List[str], pattern: str, regex: bool, case_sensitive: bool,
+                  max_matches: int) -> Tuple[List[ContentMatch], int]:
+    compiled = compile_pattern(pattern, regex, case_sensitive)
+    results: List[ContentMatch] = []
+    scanned = 0
+    for path in paths:
+        results.extend(search_file(path, compiled, max_matches))
+        try:
+            scanned += os.path.getsize(path)
+        except OSError:
+            pass
+    return results, scanned
+
+
+def iter_candidates(root: str, extensions: Optional[Iterable[str]] = None,
+                    min_size: int = 1, max_size: Optional[int] = None) -> Iterator[Tuple[str, int]]:
+    """Walk root and yield (path, size) of regular files passing the name and size filters."""
+    if extensions:
+        extensions = {(ext if ext.startswith('.') else '.' + ext).lower() for ext in extensions}
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                for dirent in it:
+                    try:
+                        if dirent.is_dir(follow_symlinks=False):
+                            pending.append(dirent.path)
+                            continue
+                        if not dirent.is_file(follow_symlinks=False):
+                            continue
+                        if extensions and os.path.splitext(dirent.name)[1].lower() not in extensions:
+                            continue
+                        size = dirent.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+                    if size < min_size or (max_size is not None and size > max_size):
+                        continue
+                    yield dirent.path, size
+        except OSError:
+            continue
+
+
+class ContentSearch:
+    """Searches file contents under a root in a process pool and streams matches.
+
+    Files are filtered by extension and size from directory entries before
+    anything is opened, grouped into batches of roughly batch_bytes, and
+    searched in worker processes through mmap. Binary files are skipped after
+    sniffing their first block. Iterate the search to receive ContentMatch
+    results as batches finish; cancel() stops submitting new work.
+    """
+
+    def __init__(self, root: str, pattern: str, regex: bool = False, case_sensitive: bool = False,
+                 extensions: Optional[Iterable[str]] = None, max_file_size: Optional[int] = 256 * 1024 * 1024,
+                 processes: Optional[int] = None, batch_files: int = 64, batch_bytes: int = 16 * 1024 * 1024,
+                 max_matches_per_file: int = 1000):
+        self.root = root
+        self.pattern = pattern
+        self.regex = regex
+        self.case_sensitive = case_sensitive
+        self.extensions = extensions
+        self.max_file_size = max_file_size
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_files = batch_files
+        self.batch_bytes = batch_bytes
+        self.max_matches_per_file = max_matches_per_file
+        self.files_searched = 0
+        self.bytes_searched = 0
+        self._cancelled = threading.Event()
+        # Fail early on an invalid regex instead of in every worker
+        compile_pattern(pattern, regex, case_sensitive)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def __iter__(self) -> Iterator[ContentMatch]:
+        return self._run()
+
+    def results(self) -> List[ContentMatch]:
+        return list(self)
+
+    def _batches(self) -> Iterator[List[str]]:
+        batch: List[str] = []
+        batch_size = 0
+        for path, size in iter_candidates(self.root, self.extensions, 1, self.max_file_size):
+            if self.cancelled:
+                return
+            batch.append(path)
+            batch_size += size
+            if len(batch) >= self.batch_files or batch_size >= self.batch_bytes:
+                yield batch
+                batch = []
+                batch_size = 0
+        if batch:
+            yield batch
+
+    # Timed here rather than in FileManager, which only hands out the lazy search
+    @instrumented('content_search')
+    def _run(self) -> Iterator[ContentMatch]:
+        max_in_flight = self.processes * 2
+        executor = ProcessPoolExecutor(max_workers=self.processes)
+        in_flight = {}
+        batches = self._batches()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and not self.cancelled and len(in_flight) < max_in_flight:
+                    batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                        break
+                    future = executor.submit(_search_batch, batch, self.pattern, self.regex,
+                                             self.case_sensitive, self.max_matches_per_file)
+                    in_flight[future] = len(batch)
+                if not in_flight or self.cancelled:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files = in_flight.pop(future)
+                    matches, scanned = future.result()
+                    self.files_searched += files
+                    self.bytes_searched += scanned
+                    record_bytes(scanned)
+                    for match in matches:
+                        yield match
+        finally:
+            self.cancel()
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+
+def naive_search(root: str, pattern: str, regex: bool = False, case_sensitive: bool = False,
+                 extensions: Optional[Iterable[str]] = None) -> List[ContentMatch]:
+    """Baseline: read every candidate file as text and test it line by line."""
+    flags = 0 if case_sensitive else re.IGNORECASE
+    compiled = re.compile(pattern if regex else re.escape(pattern), flags)
+    results = []
+    for path, _ in iter_candidates(root, extensions, 1, None):
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for line_number, line in enumerate(f, 1):
+                    if compiled.search(line):
+                        results.append(ContentMatch(path, line_number, line.strip()[:SNIPPET_CHARS]))
+        except OSError:
+            continue
+    return results
+
+
+def measure_throughput(root: str, pattern: str, regex: bool = False, **kwargs) -> Dict[str, Any]:
+    """Time ContentSearch against naive_search over the same tree."""
+    start = time.perf_counter()
+    search = ContentSearch(root, pattern, regex=regex, **kwargs)
+    parallel_matches = sum(1 for _ in search)
+    parallel_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    naive_matches = len(naive_search(root, pattern, regex=regex, extensions=kwargs.get('extensions')))
+    naive_time = time.perf_counter() - start
+
+    megabytes = search.bytes_searched / (1024 * 1024)
+    return {
+        'files': search.files_searched,
+        'megabytes': round(megabytes, 2),
+        'parallel_seconds': round(parallel_time, 4),
+        'parallel_mb_per_second': round(megabytes / parallel_time, 2) if parallel_time else None,
+        'parallel_matches': parallel_matches,
+        'naive_seconds': round(naive_time, 4),
+        'naive_mb_per_second': round(megabytes / naive_time, 2) if naive_time else None,
+        'naive_matches': naive_matches,
+        'speedup': round(naive_time / parallel_time, 2) if parallel_time else None,
+    }
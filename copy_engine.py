@@ -0,0 +1,340 @@
+import os
+import errno
+import shutil
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+
+class CopyProgress:
+    """Snapshot of a running copy, passed to progress callbacks."""
+
+    __slots__ = ('bytes_total', 'bytes_done', 'files_total', 'files_done', 'files_failed',
+                 'elapsed', 'current')
+
+    def __init__(self, bytes_total: int = 0, files_total: int = 0):
+        self.bytes_total = bytes_total
+        self.bytes_done = 0
+        self.files_total = files_total
+        self.files_done = 0
+        self.files_failed = 0
+        self.elapsed = 0.0
+        self.current = ""
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files_done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def percent(self) -> float:
+        if self.bytes_total:
+            return round(self.bytes_done * 100.0 / self.bytes_total, 1)
+        if self.files_total:
+            return round(self.files_done * 100.0 / self.files_total, 1)
+        return 100.0
+
+    def copy(self) -> 'CopyProgress':
+        snapshot = CopyProgress(self.bytes_total, self.files_total)
+        for name in self.__slots__:
+            setattr(snapshot, name, getattr(self, name))
+        return snapshot
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['bytes_per_second'] = self.bytes_per_second
+        data['files_per_second'] = self.files_per_second
+        data['percent'] = self.percent
+        return data
+
+
+class CopyResult:
+    def __init__(self):
+        self.copied: List[str] = []
+        # Sources left uncopied because the copy was cancelled
+        self.skipped: List[str] = []
+        self.errors: List[Tuple[str, str]] = []
+        self.bytes_copied = 0
+        self.elapsed = 0.0
+        self.cancelled = False
+
+    @property
+    def success(self) -> bool:
+        return not self.errors and not self.cancelled
+
+
+ProgressCallback = Callable[[CopyProgress], None]
+
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF, errno.EPERM,
+                    getattr(errno, 'EOPNOTSUPP', errno.EINVAL), getattr(errno, 'ENOTSUP', errno.EINVAL)}
+
+
+class CopyEngine:
+    """Copies files and directory trees through a worker pool.
+
+    Small files are copied concurrently with shutil.copyfile, which already
+    uses the platform's fast copy where available. Files of at least
+    large_file_threshold bytes are copied in large chunks with
+    os.copy_file_range or os.sendfile, falling back to buffered reads, so
+    progress can be reported while the kernel moves the data.
+    Progress callbacks run on worker threads and are throttled to
+    progress_interval seconds. file_callback, if given, is called with
+    (source, destination) for every completed file on the calling thread.
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 buffer_size: int = 8 * 1024 * 1024,
+                 large_file_threshold: int = 16 * 1024 * 1024,
+                 verify: bool = False,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 progress_interval: float = 0.1,
+                 overwrite: bool = False,
+                 file_callback: Optional[Callable[[str, str], None]] = None):
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.buffer_size = buffer_size
+        self.large_file_threshold = large_file_threshold
+        self.verify = verify
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self.overwrite = overwrite
+        self.file_callback = file_callback
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._progress = CopyProgress()
+        self._start = 0.0
+        self._last_report = 0.0
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def copy(self, source: str, destination: str) -> CopyResult:
+        """Copy a file or directory tree. Directory destinations must not exist unless overwrite is set."""
+        return self.copy_many([(source, destination)])
+
+    def copy_many(self, pairs: List[Tuple[str, str]]) -> CopyResult:
+        """Copy several (source, destination) pairs through one shared worker pool."""
+        result = CopyResult()
+        self._start = time.monotonic()
+        files: List[Tuple[str, str, int]] = []
+        dirs: List[Tuple[str, str]] = []
+
+        for source, destination in pairs:
+            try:
+                if os.path.isdir(source):
+                    self._plan_tree(source, destination, files, dirs, result.errors)
+                else:
+                    if os.path.isdir(destination):
+                        destination = os.path.join(destination, os.path.basename(source))
+                    files.append((source, destination, os.stat(source).st_size))
+            except OSError as e:
+                result.errors.append((source, str(e)))
+
+        self._progress = CopyProgress(sum(size for _, _, size in files), len(files))
+        self._report(force=True)
+
+        if files:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="copy") as executor:
+                futures = {executor.submit(self._copy_one, src, dst, size): (src, dst) for src, dst, size in files}
+                for future in as_completed(futures):
+                    src, dst = futures[future]
+                    error = future.exception()
+                    if error is None and future.result():
+                        result.copied.append(dst)
+                        if self.file_callback is not None:
+                            self.file_callback(src, dst)
+                    elif error is not None:
+                        result.errors.append((src, str(error)))
+                        with self._lock:
+                            self._progress.files_failed += 1
+                    else:
+                        result.skipped.append(src)
+
+        # Directory timestamps are restored last because copying files into them changes their mtime
+        for source, destination in reversed(dirs):
+            try:
+                shutil.copystat(source, destination)
+            except OSError:
+                pass
+
+        result.bytes_copied = self._progress.bytes_done
+        result.cancelled = self.cancelled
+        result.elapsed = time.monotonic() - self._start
+        self._report(force=True)
+        return result
+
+    def _plan_tree(self, source: str, destination: str, files: List[Tuple[str, str, int]],
+                   dirs: List[Tuple[str, str]], errors: List[Tuple[str, str]]):
+        """Create the destination directories and collect the files to copy.
+
+        Entries that cannot be read (dangling symlinks, unreadable folders) are
+        recorded in errors and skipped; only failing to create destination
+        itself aborts the tree.
+        """
+        os.makedirs(destination, exist_ok=self.overwrite)
+        dirs.append((source, destination))
+        pending = [(source, destination)]
+        while pending:
+            src_dir, dst_dir = pending.pop()
+            try:
+                with os.scandir(src_dir) as it:
+                    for dirent in it:
+                        dst_path = os.path.join(dst_dir, dirent.name)
+                        try:
+                            if dirent.is_dir():
+                                os.makedirs(dst_path, exist_ok=self.overwrite)
+                                dirs.append((dirent.path, dst_path))
+                                pending.append((dirent.path, dst_path))
+                            else:
+                                files.append((dirent.path, dst_path, dirent.stat().st_size))
+                        except OSError as e:
+                            errors.append((dirent.path, str(e)))
+            except OSError as e:
+                errors.append((src_dir, str(e)))
+
+    def _copy_one(self, source: str, destination: str, size: int) -> bool:
+        if self.cancelled:
+            return False
+        if not self.overwrite and os.path.exists(destination):
+            raise FileExistsError(f"Destination exists: {destination}")
+
+        if size >= self.large_file_threshold:
+            try:
+                self._copy_large(source, destination)
+            except BaseException:
+                self._remove_partial(destination)
+                raise
+            if self.cancelled:
+                # A truncated file must not pass for a finished copy
+                self._remove_partial(destination)
+                return False
+        else:
+            shutil.copyfile(source, destination)
+            self._advance(size, 0, source)
+        shutil.copystat(source, destination)
+
+        if self.verify and not self.cancelled:
+            if file_checksum(source, self.buffer_size) != file_checksum(destination, self.buffer_size):
+                raise IOError(f"Checksum mismatch after copying {source}")
+
+        self._advance(0, 1, source)
+        return True
+
+    def _copy_large(self, source: str, destination: str):
+        with open(source, 'rb') as fsrc, open(destination, 'wb') as fdst:
+            size = os.fstat(fsrc.fileno()).st_size
+            for copier in (self._copy_file_range, self._sendfile):
+                try:
+                    copied = copier(fsrc, fdst, source)
+                except OSError as e:
+                    if e.errno not in _FALLBACK_ERRNOS:
+                        raise
+                    # Unsupported for this filesystem pair; restart with the next strategy
+                    self._rewind(fsrc, fdst, source)
+                    continue
+                if copied is None:
+                    continue
+                if copied >= size or self.cancelled:
+                    return
+                # Some filesystems end the copy early instead of failing; do not trust a short copy
+                self._rewind(fsrc, fdst, source)
+            copied = self._copy_buffered(fsrc, fdst, source)
+            if copied < size and not self.cancelled:
+                raise IOError(f"Source shrank while copying {source}: {copied} of {size} bytes")
+
+    @staticmethod
+    def _remove_partial(destination: str):
+        try:
+            os.remove(destination)
+        except OSError:
+            pass
+
+    def _rewind(self, fsrc, fdst, source: str):
+        done = os.lseek(fdst.fileno(), 0, os.SEEK_CUR)
+        if done:
+            self._advance(-done, 0, source)
+        fsrc.seek(0)
+        fdst.seek(0)
+        fdst.truncate()
+
+    def _copy_file_range(self, fsrc, fdst, source: str) -> Optional[int]:
+        if not hasattr(os, 'copy_file_range'):
+            return None
+        return self._kernel_loop(lambda src_fd, dst_fd, n: os.copy_file_range(src_fd, dst_fd, n),
+                                 fsrc, fdst, source)
+
+    def _sendfile(self, fsrc, fdst, source: str) -> Optional[int]:
+        if not hasattr(os, 'sendfile') or os.name == 'nt':
+            return None
+        return self._kernel_loop(lambda src_fd, dst_fd, n: os.sendfile(dst_fd, src_fd, None, n),
+                                 fsrc, fdst, source)
+
+    def _kernel_loop(self, func: Callable[[int, int, int], int], fsrc, fdst, source: str) -> Optional[int]:
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        total = 0
+        while not self.cancelled:
+            n = func(src_fd, dst_fd, self.buffer_size)
+            if n == 0:
+                if total == 0:
+                    # Nothing at offset 0 means the filesystem does not support it (procfs, some FUSE/NFS),
+                    # as shutil also assumes; try the next strategy
+                    return None
+                break
+            total += n
+            self._advance(n, 0, source)
+        return total
+
+    def _copy_buffered(self, fsrc, fdst, source: str) -> int:
+        buf = bytearray(self.buffer_size)
+        view = memoryview(buf)
+        total = 0
+        while not self.cancelled:
+            n = fsrc.readinto(buf)
+            if not n:
+                break
+            fdst.write(view[:n])
+            total += n
+            self._advance(n, 0, source)
+        fdst.flush()
+        return total
+
+    def _advance(self, nbytes: int, nfiles: int, current: str):
+        with self._lock:
+            self._progress.bytes_done += nbytes
+            self._progress.files_done += nfiles
+            self._progress.current = current
+        self._report()
+
+    def _report(self, force: bool = False):
+        if self.progress_callback is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_report < self.progress_interval:
+                return
+            self._last_report = now
+            self._progress.elapsed = now - self._start
+            snapshot = self._progress.copy()
+        self.progress_callback(snapshot)
+
+
+def file_checksum(path: str, buffer_size: int = 1024 * 1024, algorithm: str = 'blake2b') -> str:
+    digest = hashlib.new(algorithm)
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+    with open(path, 'rb') as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
@@ -0,0 +1,548 @@
+"""Headless daemon serving FileManager operations over a Unix domain socket.
+
+Usage:
+    python daemon.py [--socket PATH] [--max-inflight 128] [--workers 32]
+
+Scripts connect with DaemonClient and reuse one warm process (listing cache,
+search indexes, thread pools) instead of importing everything per operation:
+
+    with DaemonClient() as client:
+        properties = client.call('get_item_properties', '/data')
+        futures = [client.submit('get_item_properties', path) for path in paths]
+        for entry in client.stream('iter_directory_contents', '/data'):
+            ...
+
+Every frame is a 4-byte big-endian length followed by a UTF-8 JSON object.
+A request is {"id": 1, "op": "...", "args": [...], "kwargs": {...}}. Unary
+operations answer {"id": 1, "result": ...}; streaming operations answer with
+{"id": 1, "items": [...]} frames and finish with {"id": 1, "done": true,
+"count": n}. Failures answer {"id": 1, "error": "...", "type": "..."}.
+Requests on one connection run concurrently, so clients can pipeline them
+and replies may arrive out of order.
+
+Back-pressure: a connection stops reading new requests while max_inflight
+of its requests are running, and a stream sends at most "window" frames
+ahead of the client, which returns credit with {"op": "ack", "target": id,
+"credits": n}. {"op": "cancel", "target": id} ends a stream early.
+"""
+import os
+import sys
+import stat
+import json
+import queue
+import socket
+import struct
+import asyncio
+import argparse
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+
+from file_manager import FileManager
+
+
+MAX_FRAME = 64 * 1024 * 1024
+DEFAULT_WINDOW = 8
+
+_HEADER = struct.Struct('!I')
+
+# Operation name -> AsyncFileManager semaphore it runs under
+UNARY_OPS = {
+    'get_directory_contents': 'listing',
+    'get_item_properties': 'properties',
+    'get_disk_space': 'properties',
+    'get_directory_size': 'usage',
+    'find_duplicates': 'usage',
+    'search_files': 'search',
+    'build_search_index': 'search',
+    'refresh_search_index': 'search',
+    'create_directory': 'create',
+    'create_file': 'create',
+    'rename_item': 'move',
+    'move_item': 'move',
+    'delete_item': 'delete',
+    'copy_item': 'copy',
+    'sync_directories': 'copy',
+    'create_archive': 'archive',
+    'extract_archive': 'archive',
+    'list_archive': 'archive',
+    'get_drives': 'drives',
+}
+
+
+def _iter_listing(path: str, chunk_size: int = 1000):
+    for chunk in FileManager.iter_directory_contents(path, chunk_size):
+        yield from chunk
+
+
+# Operation name -> (semaphore, factory returning an iterable of items)
+STREAM_OPS: Dict[str, Tuple[str, Callable[..., Any]]] = {
+    'iter_directory_contents': ('listing', _iter_listing),
+    'iter_search_files': ('search', FileManager.iter_search_files),
+    'search_file_contents': ('search', FileManager.search_file_contents),
+}
+
+
+def default_socket_path() -> str:
+    """Socket path in a directory only the current user can enter, so no one else can claim it first."""
+    base = os.environ.get('XDG_RUNTIME_DIR')
+    if base:
+        return os.path.join(base, 'windows-file-manager.sock')
+    import tempfile
+    if not hasattr(os, 'getuid'):
+        return os.path.join(tempfile.gettempdir(), 'windows-file-manager.sock')
+    directory = os.path.join(tempfile.gettempdir(), f'windows-file-manager-{os.getuid()}')
+    _private_directory(directory)
+    return os.path.join(directory, 'daemon.sock')
+
+
+def _private_directory(path: str):
+    """Create path as a 0700 directory, or make sure an existing one is ours and closed to others."""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    stats = os.lstat(path)
+    if not stat.S_ISDIR(stats.st_mode) or stats.st_uid != os.getuid() or stats.st_mode & 0o077:
+        raise PermissionError(f"{path} is not a private directory of the current user")
+
+
+def _encode(obj: Any) -> Any:
+    to_dict = getattr(obj, 'to_dict', None)
+    if to_dict is not None:
+        return to_dict()
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    return str(obj)
+
+
+def _pack(message: Dict[str, Any]) -> bytes:
+    data = json.dumps(message, default=_encode, separators=(',', ':')).encode('utf-8')
+    return _HEADER.pack(len(data)) + data
+
+
+def _unpack(data: bytes) -> Dict[str, Any]:
+    message = json.loads(data)
+    if not isinstance(message, dict):
+        raise ValueError("Frame is not a JSON object")
+    return message
+
+
+class DaemonError(Exception):
+    """An operation failed inside the daemon."""
+
+    def __init__(self, message: str, type_name: str = 'Exception'):
+        super().__init__(message)
+        self.type_name = type_name
+
+
+class _Stream:
+    __slots__ = ('credits', 'event', 'cancelled')
+
+    def __init__(self, window: int):
+        self.credits = window
+        self.event = asyncio.Event()
+        self.cancelled = False
+
+
+class _Connection:
+    def __init__(self, writer: asyncio.StreamWriter, max_inflight: int):
+        self.writer = writer
+        self.slots = asyncio.Semaphore(max_inflight)
+        self.streams: Dict[Any, _Stream] = {}
+        self._drain_lock = asyncio.Lock()
+
+    async def send(self, message: Dict[str, Any]):
+        # Frames are written whole, so replies to pipelined requests never interleave
+        self.writer.write(_pack(message))
+        async with self._drain_lock:
+            await self.writer.drain()
+
+    def credit(self, target: Any, credits: int):
+        stream = self.streams.get(target)
+        if stream is not None:
+            stream.credits += credits
+            stream.event.set()
+
+    def cancel(self, target: Any):
+        stream = self.streams.get(target)
+        if stream is not None:
+            stream.cancelled = True
+            stream.event.set()
+
+    async def wait_credit(self, stream: _Stream) -> bool:
+        """Take one credit, waiting for the client if there is none; False if the stream was cancelled."""
+        if not stream.credits and not stream.cancelled:
+            # A stream parked on its client must not hold a slot, or the acks it
+            # is waiting for could be stuck behind requests that cannot start
+            self.slots.release()
+            try:
+                while not stream.credits and not stream.cancelled:
+                    stream.event.clear()
+                    await stream.event.wait()
+            finally:
+                await self.slots.acquire()
+        if stream.cancelled:
+            return False
+        stream.credits -= 1
+        return True
+
+
+class FileManagerDaemon:
+    """Serves FileManager operations to DaemonClient connections; see the module docstring.
+
+    Blocking work runs on an AsyncFileManager, whose per-kind semaphores
+    bound how many of each operation occupy worker threads across all
+    connections. Streaming results are gathered in batches of batch_size
+    items per frame.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_inflight: int = 128, max_workers: int = 32,
+                 batch_size: int = 256, window: int = DEFAULT_WINDOW):
+        self.path = path or default_socket_path()
+        self.max_inflight = max_inflight
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.window = window
+        self.connections = 0
+        self.requests = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def serve(self, ready: Optional[threading.Event] = None):
+        if not hasattr(asyncio, 'start_unix_server'):
+            raise RuntimeError("Unix domain sockets are not supported on this platform")
+        from async_file_manager import AsyncFileManager
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._remove_stale_socket()
+        # Only the owner may connect; the socket is created with these permissions, never wider
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self._handle, path=self.path)
+        finally:
+            os.umask(umask)
+        self.fm = AsyncFileManager(max_workers=self.max_workers)
+        try:
+            async with server:
+                if ready is not None:
+                    ready.set()
+                await self._stopped.wait()
+        finally:
+            self.fm.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def stop(self):
+        """Stop serving; safe to call from any thread."""
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    def start_in_thread(self, timeout: float = 5.0) -> threading.Thread:
+        """Serve from a background thread, e.g. inside the GUI process so scripts share its caches."""
+        ready = threading.Event()
+        self._thread = threading.Thread(target=asyncio.run, args=(self.serve(ready),),
+                                        name="file-manager-daemon", daemon=True)
+        self._thread.start()
+        if not ready.wait(timeout):
+            raise RuntimeError(f"Daemon did not start listening on {self.path}")
+        return self._thread
+
+    def close(self, timeout: float = 5.0):
+        self.stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pid': os.getpid(),
+            'connections': self.connections,
+            'requests': self.requests,
+            'cache': FileManager.cache.stats(),
+        }
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            # Left behind by a daemon that did not shut down cleanly
+            os.unlink(self.path)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {self.path}")
+        finally:
+            probe.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        connection = _Connection(writer, self.max_inflight)
+        tasks = set()
+        try:
+            while True:
+                message = await _read_frame(reader)
+                if message is None:
+                    break
+                op = message.get('op')
+                if op == 'ack':
+                    connection.credit(message.get('target'), int(message.get('credits', 1)))
+                    continue
+                if op == 'cancel':
+                    connection.cancel(message.get('target'))
+                    continue
+                # Stop reading requests while the connection has too many running
+                await connection.slots.acquire()
+                self.requests += 1
+                task = asyncio.ensure_future(self._dispatch(connection, message))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: connection.slots.release())
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Dropped connection or a malformed frame; the stream cannot be resynchronised
+            pass
+        except asyncio.CancelledError:
+            # The daemon is shutting down
+            pass
+        finally:
+            self.connections -= 1
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _dispatch(self, connection: _Connection, message: Dict[str, Any]):
+        request_id = message.get('id')
+        op = message.get('op')
+        args = message.get('args') or []
+        kwargs = message.get('kwargs') or {}
+        try:
+            if op in STREAM_OPS:
+                await self._stream(connection, request_id, op, args, kwargs,
+                                   int(message.get('window', self.window)))
+            else:
+                result = await self._call(op, args, kwargs)
+                await connection.send({'id': request_id, 'result': result})
+        except asyncio.CancelledError:
+            raise
+        except ConnectionError:
+            pass
+        except Exception as e:
+            try:
+                await connection.send({'id': request_id, 'error': str(e), 'type': type(e).__name__})
+            except ConnectionError:
+                pass
+
+    async def _call(self, op: str, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+        if op == 'ping':
+            return 'pong'
+        if op == 'stats':
+            return self.stats()
+        if op == 'shutdown':
+            self.stop()
+            return True
+        kind = UNARY_OPS.get(op)
+        if kind is None:
+            raise ValueError(f"Unknown operation: {op}")
+        return await self.fm._run(kind, getattr(FileManager, op), *args, **kwargs)
+
+    async def _stream(self, connection: _Connection, request_id: Any, op: str,
+                      args: List[Any], kwargs: Dict[str, Any], window: int):
+        kind, factory = STREAM_OPS[op]
+        stream = connection.streams[request_id] = _Stream(max(1, window))
+        batches = self.fm._iterate_batches(kind, lambda: factory(*args, **kwargs), self.batch_size)
+        count = 0
+        try:
+            async for batch in batches:
+                if not await connection.wait_credit(stream):
+                    break
+                await connection.send({'id': request_id, 'items': batch})
+                count += len(batch)
+            await connection.send({'id': request_id, 'done': True, 'count': count, 'cancelled': stream.cancelled})
+        finally:
+            connection.streams.pop(request_id, None)
+            await batches.aclose()
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    try:
+        header = await reader.readexactly(_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME} byte limit")
+    return _unpack(await reader.readexactly(length))
+
+
+class DaemonClient:
+    """Blocking, thread-safe client for FileManagerDaemon.
+
+    One connection carries any number of concurrent requests: submit()
+    returns a Future immediately, call() waits for the result and stream()
+    iterates a streaming operation. At most max_pending requests may be
+    outstanding; further submits block until replies arrive.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_pending: int = 128, timeout: Optional[float] = None):
+        self.path = path or default_socket_path()
+        self.timeout = timeout
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(self.path)
+        self._file = self._socket.makefile('rb')
+        self._send_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Any] = {}
+        self._pending_lock = threading.Lock()
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="daemon-client", daemon=True)
+        self._reader.start()
+
+    def __enter__(self) -> 'DaemonClient':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        self._reader.join()
+
+    def submit(self, op: str, *args, **kwargs) -> Future:
+        future: Future = Future()
+        self._request(future, {'op': op, 'args': args, 'kwargs': kwargs})
+        return future
+
+    def call(self, op: str, *args, **kwargs) -> Any:
+        return self.submit(op, *args, **kwargs).result(self.timeout)
+
+    def stream(self, op: str, *args, window: int = DEFAULT_WINDOW, **kwargs) -> Iterator[Any]:
+        """Iterate the items of a streaming operation.
+
+        The daemon sends at most window batches ahead of this iterator;
+        abandoning the iterator cancels the stream.
+        """
+        replies: 'queue.Queue[Dict[str, Any]]' = queue.Queue()
+        request_id = self._request(replies, {'op': op, 'args': args, 'kwargs': kwargs, 'window': window})
+        finished = False
+        try:
+            while True:
+                message = replies.get(timeout=self.timeout)
+                if 'error' in message:
+                    finished = True
+                    raise DaemonError(message['error'], message.get('type', 'Exception'))
+                if message.get('done'):
+                    finished = True
+                    return
+                self._send({'op': 'ack', 'target': request_id, 'credits': 1})
+                yield from message['items']
+        finally:
+            if not finished and not self._closed:
+                self._send({'op': 'cancel', 'target': request_id})
+
+    def _request(self, target: Any, message: Dict[str, Any]) -> int:
+        if self._closed:
+            raise ConnectionError("Client is closed")
+        self._slots.acquire()
+        request_id = next(self._ids)
+        with self._pending_lock:
+            self._pending[request_id] = target
+        message['id'] = request_id
+        try:
+            self._send(message)
+        except BaseException:
+            self._finish(request_id)
+            raise
+        return request_id
+
+    def _send(self, message: Dict[str, Any]):
+        frame = _pack(message)
+        with self._send_lock:
+            self._socket.sendall(frame)
+
+    def _finish(self, request_id: Any) -> Any:
+        with self._pending_lock:
+            target = self._pending.pop(request_id, None)
+        if target is not None:
+            self._slots.release()
+        return target
+
+    def _read_loop(self):
+        try:
+            while True:
+                header = self._file.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                (length,) = _HEADER.unpack(header)
+                message = _unpack(self._file.read(length))
+                request_id = message.get('id')
+                with self._pending_lock:
+                    target = self._pending.get(request_id)
+                if isinstance(target, queue.Queue):
+                    if 'items' not in message:
+                        self._finish(request_id)
+                    target.put(message)
+                elif target is not None:
+                    self._finish(request_id)
+                    if 'error' in message:
+                        target.set_exception(DaemonError(message['error'], message.get('type', 'Exception')))
+                    else:
+                        target.set_result(message.get('result'))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._pending_lock:
+                pending = list(self._pending.items())
+            for request_id, target in pending:
+                self._finish(request_id)
+                if isinstance(target, queue.Queue):
+                    target.put({'error': "Connection to the daemon was closed", 'type': 'ConnectionError'})
+                else:
+                    target.set_exception(ConnectionError("Connection to the daemon was closed"))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--socket', help="socket path (default: in $XDG_RUNTIME_DIR, or a private folder "
+                                         "in the temp directory)")
+    parser.add_argument('--max-inflight', type=int, default=128,
+                        help="concurrent requests per connection before reading pauses (default 128)")
+    parser.add_argument('--workers', type=int, default=32, help="worker threads (default 32)")
+    args = parser.parse_args(argv)
+
+    try:
+        daemon = FileManagerDaemon(args.socket, max_inflight=args.max_inflight, max_workers=args.workers)
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    async def run():
+        import signal
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, daemon.stop)
+        await daemon.serve()
+
+    try:
+        asyncio.run(run())
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,358 @@
+import os
+import errno
+import stat
+import threading
+import time
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+
+# dir_fd-relative calls skip resolving the full path of every file again
+_DIR_FD = (os.open in os.supports_dir_fd and os.unlink in os.supports_dir_fd
+           and os.rmdir in os.supports_dir_fd and os.scandir in os.supports_fd)
+
+_OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_CLOEXEC', 0)
+
+
+class DeleteProgress:
+    """Snapshot of a running delete, passed to progress callbacks."""
+
+    __slots__ = ('files_done', 'dirs_done', 'items_failed', 'paths_total', 'paths_done', 'elapsed', 'current')
+
+    def __init__(self, paths_total: int = 0):
+        self.files_done = 0
+        self.dirs_done = 0
+        self.items_failed = 0
+        self.paths_total = paths_total
+        self.paths_done = 0
+        self.elapsed = 0.0
+        self.current = ""
+
+    @property
+    def items_per_second(self) -> float:
+        return (self.files_done + self.dirs_done) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def copy(self) -> 'DeleteProgress':
+        snapshot = DeleteProgress(self.paths_total)
+        for name in self.__slots__:
+            setattr(snapshot, name, getattr(self, name))
+        return snapshot
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data['items_per_second'] = self.items_per_second
+        return data
+
+
+class DeleteResult:
+    def __init__(self):
+        self.deleted: List[str] = []
+        self.errors: List[Tuple[str, str]] = []
+        self.files_deleted = 0
+        self.dirs_deleted = 0
+        self.elapsed = 0.0
+        self.cancelled = False
+
+    @property
+    def success(self) -> bool:
+        return not self.errors and not self.cancelled
+
+
+ProgressCallback = Callable[[DeleteProgress], None]
+
+
+class _Node:
+    __slots__ = ('path', 'name', 'parent', 'fd', 'pending', 'failed')
+
+    def __init__(self, path: str, name: str, parent: Optional['_Node'] = None):
+        self.path = path
+        self.name = name
+        self.parent = parent
+        self.fd: Optional[int] = None
+        self.pending = 0
+        self.failed = False
+
+
+class DeleteEngine:
+    """Deletes files and directory trees permanently or to the trash.
+
+    Permanent deletes run on a pool of worker threads sharing a stack of
+    directories, so different subtrees are emptied in parallel while the
+    traversal stays depth-first and the number of open directories stays
+    small. Where the platform supports it each directory is opened relative
+    to its parent, its files are unlinked relative to that descriptor and it
+    is removed from its parent's descriptor once its last child is gone.
+    Trash deletes are sent to send2trash in batches of trash_batch_size.
+
+    cancel() stops the delete between entries; whatever was not yet removed
+    is left intact. Failures are collected per path rather than aborting.
+    Progress callbacks run on worker threads and are throttled to
+    progress_interval seconds.
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 use_trash: bool = False,
+                 trash_batch_size: int = 256,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 progress_interval: float = 0.1):
+        self.max_workers = max_workers or min(16, (os.cpu_count() or 1) * 4)
+        self.use_trash = use_trash
+        self.trash_batch_size = trash_batch_size
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._progress = DeleteProgress()
+        self._result = DeleteResult()
+        self._start = 0.0
+        self._last_report = 0.0
+        self._stack: List[_Node] = []
+        self._active = 0
+        self._open: Dict[int, _Node] = {}
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def delete(self, path: str) -> DeleteResult:
+        return self.delete_many([path])
+
+    def delete_many(self, paths: List[str]) -> DeleteResult:
+        self._result = result = DeleteResult()
+        self._start = time.monotonic()
+        self._progress = DeleteProgress(len(paths))
+        self._report(force=True)
+
+        if self.use_trash:
+            self._trash(paths)
+        else:
+            self._delete(paths)
+
+        result.cancelled = self.cancelled
+        result.files_deleted = self._progress.files_done
+        result.dirs_deleted = self._progress.dirs_done
+        result.elapsed = time.monotonic() - self._start
+        self._report(force=True)
+        return result
+
+    def _trash(self, paths: List[str]):
+        import send2trash
+        for i in range(0, len(paths), self.trash_batch_size):
+            if self.cancelled:
+                return
+            batch = paths[i:i + self.trash_batch_size]
+            # Missing paths are failed up front, so a path gone after a failed batch must have been trashed by it
+            present = []
+            for path in batch:
+                if os.path.lexists(path):
+                    present.append(path)
+                else:
+                    self._fail(path, FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path))
+            try:
+                if present:
+                    send2trash.send2trash(present)
+                done = present
+            except Exception:
+                # Retry one by one so a single bad path does not fail the whole batch;
+                # send2trash may already have trashed the paths before the bad one
+                done = []
+                for path in present:
+                    if not os.path.lexists(path):
+                        done.append(path)
+                        continue
+                    try:
+                        send2trash.send2trash(path)
+                        done.append(path)
+                    except Exception as e:
+                        self._fail(path, e)
+            with self._lock:
+                self._result.deleted.extend(done)
+                self._progress.paths_done += len(batch)
+                self._progress.current = batch[-1]
+            self._report()
+
+    def _delete(self, paths: List[str]):
+        roots = []
+        for path in paths:
+            try:
+                stats = os.lstat(path)
+            except OSError as e:
+                self._fail(path, e)
+                continue
+            if stat.S_ISDIR(stats.st_mode):
+                roots.append(_Node(path, path))
+                continue
+            try:
+                self._unlink(path, None, path)
+                with self._lock:
+                    self._progress.files_done += 1
+                self._finish_top(path)
+            except OSError as e:
+                self._fail(path, e)
+                self._finish_top(path, failed=True)
+
+        if not roots:
+            return
+        with self._lock:
+            self._stack.extend(reversed(roots))
+        workers = [threading.Thread(target=self._worker, name=f"delete-{i}", daemon=True)
+                   for i in range(self.max_workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        # After a cancel, directories that were opened but not finished still hold descriptors
+        for node in list(self._open.values()):
+            self._close(node)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._stack and self._active and not self.cancelled:
+                    self._cond.wait()
+                if self.cancelled or not self._stack:
+                    self._cond.notify_all()
+                    return
+                node = self._stack.pop()
+                self._active += 1
+            try:
+                self._scan(node)
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._cond.notify_all()
+
+    def _scan(self, node: _Node):
+        children = []
+        try:
+            if _DIR_FD:
+                parent_fd = node.parent.fd if node.parent is not None else None
+                node.fd = os.open(node.name, _OPEN_FLAGS, dir_fd=parent_fd)
+                with self._lock:
+                    self._open[node.fd] = node
+                listing = os.scandir(node.fd)
+            else:
+                listing = os.scandir(node.path)
+            with listing as it:
+                unlinked = 0
+                for dirent in it:
+                    if self.cancelled:
+                        break
+                    if dirent.is_dir(follow_symlinks=False):
+                        children.append(dirent.name)
+                        continue
+                    # Listed through a descriptor, dirent.path is only the name
+                    path = os.path.join(node.path, dirent.name)
+                    try:
+                        self._unlink(dirent.name if _DIR_FD else path, node.fd, path)
+                        unlinked += 1
+                    except OSError as e:
+                        node.failed = True
+                        self._fail(path, e)
+                    if unlinked == 256:
+                        self._count_files(unlinked, path)
+                        unlinked = 0
+                self._count_files(unlinked, node.path)
+        except OSError as e:
+            node.failed = True
+            self._fail(node.path, e)
+
+        if self.cancelled:
+            return
+        if not children:
+            self._complete(node)
+            return
+        with self._cond:
+            node.pending = len(children)
+            for name in children:
+                self._stack.append(_Node(os.path.join(node.path, name), name, node))
+            self._cond.notify_all()
+
+    def _unlink(self, name: str, dir_fd: Optional[int], path: str):
+        try:
+            os.unlink(name, dir_fd=dir_fd)
+        except PermissionError:
+            if os.name != 'nt':
+                raise
+            # Windows refuses to delete read-only files
+            os.chmod(path, stat.S_IWRITE)
+            os.unlink(path)
+
+    def _complete(self, node: _Node):
+        """Remove an emptied directory and, when it was its parent's last child, the parent too."""
+        while node is not None:
+            self._close(node)
+            if self.cancelled:
+                return
+            if not node.failed:
+                try:
+                    if _DIR_FD and node.parent is not None:
+                        os.rmdir(node.name, dir_fd=node.parent.fd)
+                    else:
+                        os.rmdir(node.path)
+                    with self._lock:
+                        self._progress.dirs_done += 1
+                except OSError as e:
+                    node.failed = True
+                    self._fail(node.path, e)
+            parent = node.parent
+            if parent is None:
+                self._finish_top(node.path, node.failed)
+                return
+            with self._lock:
+                if node.failed:
+                    # The parent cannot become empty; the child's own error is already recorded
+                    parent.failed = True
+                parent.pending -= 1
+                if parent.pending:
+                    return
+            node = parent
+
+    def _close(self, node: _Node):
+        if node.fd is None:
+            return
+        with self._lock:
+            self._open.pop(node.fd, None)
+        try:
+            os.close(node.fd)
+        except OSError:
+            pass
+        node.fd = None
+
+    def _count_files(self, count: int, current: str):
+        if not count:
+            return
+        with self._lock:
+            self._progress.files_done += count
+            self._progress.current = current
+        self._report()
+
+    def _finish_top(self, path: str, failed: bool = False):
+        with self._lock:
+            if not failed:
+                self._result.deleted.append(path)
+            self._progress.paths_done += 1
+        self._report()
+
+    def _fail(self, path: str, error: Exception):
+        with self._lock:
+            self._result.errors.append((path, str(error)))
+            self._progress.items_failed += 1
+
+    def _report(self, force: bool = False):
+        if self.progress_callback is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_report < self.progress_interval:
+                return
+            self._last_report = now
+            self._progress.elapsed = now - self._start
+            snapshot = self._progress.copy()
+        self.progress_callback(snapshot)
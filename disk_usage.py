@@ -0,0 +1,215 @@
+import os
+import stat
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+
+class DirUsage:
+    """Per-directory record: direct file totals, subdirectories and recursive totals."""
+
+    __slots__ = ('validator', 'own_bytes', 'own_files', 'subdirs', 'total_bytes', 'total_files', 'total_dirs')
+
+    def __init__(self, validator: Tuple[int, int], own_bytes: int, own_files: int, subdirs: List[str]):
+        self.validator = validator
+        self.own_bytes = own_bytes
+        self.own_files = own_files
+        self.subdirs = subdirs
+        self.total_bytes = own_bytes
+        self.total_files = own_files
+        self.total_dirs = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            'size_bytes': self.total_bytes,
+            'file_count': self.total_files,
+            'dir_count': self.total_dirs,
+        }
+
+
+class DiskUsageCalculator:
+    """Recursive folder sizes computed with a parallel, level-by-level scandir walk.
+
+    Direct file totals and subdirectory names are cached per directory and
+    validated against the directory's mtime/ctime, so a repeat calculation
+    re-lists only directories that changed and costs one stat for the rest.
+    As with listing caches, a file that grows in place without touching its
+    directory is not seen until that directory is invalidated.
+
+    The walk stays on the filesystem of the starting directory and checks
+    cancel_event before listing each directory.
+
+    Each calculation sums into fresh records and publishes the recursive
+    totals of every directory it walked for cached(). A change deep in a tree
+    does not touch the validators of its ancestors, so whoever changes a
+    directory must call invalidate_tree_above() to drop the stale totals.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_entries: int = 500000):
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.max_entries = max_entries
+        self._cache: 'OrderedDict[str, DirUsage]' = OrderedDict()
+        self._totals: 'OrderedDict[str, DirUsage]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; totals computed across one are not published
+        self._generation = 0
+        self.relisted = 0
+        self.reused = 0
+
+    def calculate(self, path: str, cancel_event: Optional[threading.Event] = None) -> Optional[DirUsage]:
+        """Compute recursive totals for path, reusing valid cached subtotals."""
+        path = os.path.abspath(path)
+        order: List[str] = []
+        records: Dict[str, DirUsage] = {}
+        level = [path]
+        with self._lock:
+            generation = self._generation
+        try:
+            device = os.stat(path).st_dev
+        except OSError:
+            return None
+
+        def scan(dir_path: str) -> Optional[DirUsage]:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            return self._scan(dir_path, device)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="du") as executor:
+            while level:
+                next_level = []
+                for dir_path, record in zip(level, executor.map(scan, level)):
+                    if record is None:
+                        continue
+                    # Cached records are shared with concurrent calculations; totals go into a copy
+                    records[dir_path] = DirUsage(record.validator, record.own_bytes, record.own_files, record.subdirs)
+                    order.append(dir_path)
+                    next_level.extend(record.subdirs)
+                level = next_level
+        # Directories skipped after a cancel would leave the totals short
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+
+        # Children always come after their parent in BFS order, so a reverse pass sums bottom-up
+        for dir_path in reversed(order):
+            record = records[dir_path]
+            record.total_bytes = record.own_bytes
+            record.total_files = record.own_files
+            record.total_dirs = 0
+            for child in record.subdirs:
+                child_record = records.get(child)
+                if child_record is not None:
+                    record.total_bytes += child_record.total_bytes
+                    record.total_files += child_record.total_files
+                    record.total_dirs += child_record.total_dirs + 1
+
+        with self._lock:
+            if self._generation == generation:
+                for dir_path in order:
+                    key = os.path.normcase(dir_path)
+                    self._totals[key] = records[dir_path]
+                    self._totals.move_to_end(key)
+                while len(self._totals) > self.max_entries:
+                    self._totals.popitem(last=False)
+        return records.get(path)
+
+    def cached(self, path: str) -> Optional[DirUsage]:
+        """Return the last computed totals for path, or None if path itself changed since."""
+        with self._lock:
+            record = self._totals.get(os.path.normcase(os.path.abspath(path)))
+        if record is None:
+            return None
+        try:
+            stats = os.stat(path)
+        except OSError:
+            return None
+        if (stats.st_mtime_ns, stats.st_ctime_ns) != record.validator:
+            return None
+        return record
+
+    def invalidate(self, path: str):
+        key = os.path.normcase(os.path.abspath(path))
+        with self._lock:
+            self._generation += 1
+            self._cache.pop(key, None)
+            self._totals.pop(key, None)
+
+    def invalidate_tree_above(self, path: str):
+        """Forget path's listing and the recursive totals of path and every ancestor."""
+        key = os.path.normcase(os.path.abspath(path))
+        with self._lock:
+            self._generation += 1
+            self._cache.pop(key, None)
+            while True:
+                self._totals.pop(key, None)
+                parent = os.path.dirname(key)
+                if parent == key:
+                    break
+                key = parent
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+            self._totals.clear()
+
+    def _scan(self, path: str, device: int) -> Optional[DirUsage]:
+        """Direct totals of path, or None if it cannot be read or is on another device than device."""
+        key = os.path.normcase(path)
+        try:
+            stats = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._cache.pop(key, None)
+            return None
+        if stats.st_dev != device:
+            # A mount point; like du -x, other filesystems are not counted
+            return None
+        validator = (stats.st_mtime_ns, stats.st_ctime_ns)
+
+        with self._lock:
+            record = self._cache.get(key)
+            if record is not None and record.validator == validator:
+                self._cache.move_to_end(key)
+                self.reused += 1
+                return record
+
+        own_bytes = 0
+        own_files = 0
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for dirent in it:
+                    try:
+                        if dirent.is_dir(follow_symlinks=False):
+                            subdirs.append(dirent.path)
+                        else:
+                            entry_stats = dirent.stat(follow_symlinks=False)
+                            if stat.S_ISREG(entry_stats.st_mode):
+                                own_bytes += entry_stats.st_size
+                            own_files += 1
+                    except OSError:
+                        pass
+        except OSError:
+            return None
+
+        record = DirUsage(validator, own_bytes, own_files, subdirs)
+        with self._lock:
+            self.relisted += 1
+            self._cache[key] = record
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return record
+
+
+_default_calculator: Optional[DiskUsageCalculator] = None
+_default_lock = threading.Lock()
+
+
+def default_calculator() -> DiskUsageCalculator:
+    global _default_calculator
+    with _default_lock:
+        if _default_calculator is None:
+            _default_calculator = DiskUsageCalculator()
+        return _default_calculator
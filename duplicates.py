@@ -0,0 +1,216 @@
+import os
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
+
+
+class DuplicateGroup:
+    __slots__ = ('size', 'digest', 'paths')
+
+    def __init__(self, size: int, digest: str, paths: List[str]):
+        self.size = size
+        self.digest = digest
+        self.paths = paths
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        return self.size * (len(self.paths) - 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'size_bytes': self.size,
+            'digest': self.digest,
+            'paths': list(self.paths),
+            'reclaimable_bytes': self.reclaimable_bytes,
+        }
+
+    def __repr__(self) -> str:
+        return f"DuplicateGroup(size={self.size}, paths={self.paths!r})"
+
+
+class DuplicateProgress:
+    __slots__ = ('stage', 'done', 'total', 'bytes_hashed', 'reclaimable_bytes')
+
+    def __init__(self, stage: str, total: int):
+        self.stage = stage
+        self.done = 0
+        self.total = total
+        self.bytes_hashed = 0
+        self.reclaimable_bytes = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+ProgressCallback = Callable[[DuplicateProgress], None]
+
+
+class DuplicateFinder:
+    """Finds duplicate files in stages so most files are never fully read.
+
+    1. 'scan': group regular files by size; unique sizes cannot be duplicates.
+    2. 'partial': hash the first and last edge_bytes of each remaining file.
+    3. 'full': fully hash only the files whose partial hashes still collide.
+
+    Hard links to the same inode are collapsed to one path, since removing
+    them frees nothing. Hashing runs on a thread pool; hashlib releases the
+    GIL on large buffers, so reads and digests overlap across workers.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, edge_bytes: int = 4096, min_size: int = 1,
+                 algorithm: str = 'blake2b', buffer_size: int = 1024 * 1024,
+                 progress_callback: Optional[ProgressCallback] = None, progress_interval: float = 0.1):
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.edge_bytes = edge_bytes
+        self.min_size = min_size
+        self.algorithm = algorithm
+        self.buffer_size = buffer_size
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self._last_report = 0.0
+        self.slice_size = 10000
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._progress = DuplicateProgress('scan', 0)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def find(self, roots: Iterable[str]) -> List[DuplicateGroup]:
+        """Return duplicate groups under roots, largest reclaimable space first."""
+        by_size = self._group_by_size(roots)
+        candidates = [paths for paths in by_size.values() if len(paths) > 1]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dupes") as executor:
+            candidates = self._refine(executor, 'partial', candidates, self._partial_hash)
+            candidates = self._refine(executor, 'full', candidates, self._full_hash)
+        if self.cancelled:
+            return []
+
+        groups = []
+        for paths in candidates:
+            size, digest = paths[0][1], paths[0][2]
+            groups.append(DuplicateGroup(size, digest, sorted(path for path, _, _ in paths)))
+        groups.sort(key=lambda group: group.reclaimable_bytes, reverse=True)
+
+        self._progress.reclaimable_bytes = sum(group.reclaimable_bytes for group in groups)
+        self._report(force=True)
+        return groups
+
+    def _group_by_size(self, roots: Iterable[str]) -> Dict[int, List[Tuple[str, int, str]]]:
+        self._progress = DuplicateProgress('scan', 0)
+        by_size: Dict[int, List[Tuple[str, int, str]]] = {}
+        seen_inodes = set()
+        pending = [os.path.abspath(root) for root in roots]
+        while pending and not self.cancelled:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for dirent in it:
+                        try:
+                            if dirent.is_dir(follow_symlinks=False):
+                                pending.append(dirent.path)
+                                continue
+                            if not dirent.is_file(follow_symlinks=False):
+                                continue
+                            stats = dirent.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if stats.st_size < self.min_size:
+                            continue
+                        if stats.st_nlink > 1:
+                            inode = (stats.st_dev, stats.st_ino)
+                            if inode in seen_inodes:
+                                continue
+                            seen_inodes.add(inode)
+                        by_size.setdefault(stats.st_size, []).append((dirent.path, stats.st_size, ''))
+                        self._progress.done += 1
+            except OSError:
+                continue
+        self._report(force=True)
+        return by_size
+
+    def _refine(self, executor: ThreadPoolExecutor, stage: str, groups: List[List[Tuple[str, int, str]]],
+                hasher: Callable[[str, int, str], Optional[str]]) -> List[List[Tuple[str, int, str]]]:
+        jobs = [item for group in groups for item in group]
+
+        with self._lock:
+            self._progress = DuplicateProgress(stage, len(jobs))
+        self._report(force=True)
+
+        buckets: Dict[Tuple[int, str], List[Tuple[str, int, str]]] = {}
+        # Submit in slices so millions of candidates do not become millions of pending futures
+        for start in range(0, len(jobs), self.slice_size):
+            if self.cancelled:
+                break
+            digests = executor.map(lambda job: (job[0], job[1], hasher(*job)), jobs[start:start + self.slice_size])
+            for path, size, digest in digests:
+                if digest is not None:
+                    buckets.setdefault((size, digest), []).append((path, size, digest))
+
+        refined = [paths for paths in buckets.values() if len(paths) > 1]
+        with self._lock:
+            self._progress.reclaimable_bytes = sum(paths[0][1] * (len(paths) - 1) for paths in refined)
+        self._report(force=True)
+        return refined
+
+    def _partial_hash(self, path: str, size: int, previous: str) -> Optional[str]:
+        digest = hashlib.new(self.algorithm)
+        try:
+            with open(path, 'rb') as f:
+                head = f.read(self.edge_bytes)
+                digest.update(head)
+                if size > self.edge_bytes * 2:
+                    f.seek(-self.edge_bytes, os.SEEK_END)
+                    digest.update(f.read(self.edge_bytes))
+                elif size > self.edge_bytes:
+                    digest.update(f.read())
+        except OSError:
+            return None
+        self._advance(min(size, self.edge_bytes * 2))
+        return digest.hexdigest()
+
+    def _full_hash(self, path: str, size: int, previous: str) -> Optional[str]:
+        # Files no larger than the two sampled edges were already hashed completely
+        if size <= self.edge_bytes * 2:
+            self._advance(0)
+            return previous
+        digest = hashlib.new(self.algorithm)
+        buf = bytearray(self.buffer_size)
+        view = memoryview(buf)
+        try:
+            with open(path, 'rb') as f:
+                while not self.cancelled:
+                    n = f.readinto(buf)
+                    if not n:
+                        break
+                    digest.update(view[:n])
+        except OSError:
+            return None
+        self._advance(size)
+        return digest.hexdigest()
+
+    def _advance(self, nbytes: int):
+        with self._lock:
+            self._progress.done += 1
+            self._progress.bytes_hashed += nbytes
+        self._report()
+
+    def _report(self, force: bool = False):
+        if self.progress_callback is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_report < self.progress_interval:
+                return
+            self._last_report = now
+            snapshot = DuplicateProgress(self._progress.stage, self._progress.total)
+            for name in DuplicateProgress.__slots__:
+                setattr(snapshot, name, getattr(self._progress, name))
+        self.progress_callback(snapshot)
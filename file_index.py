@@ -0,0 +1,331 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set, Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS dirs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    parent_id INTEGER,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    dir_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    is_directory INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    trigram TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir_id);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent_id);
+"""
+
+SCHEMA_VERSION = "1"
+
+# Directories reported changed (see mark_changed) since the indexes covering them were refreshed
+MAX_CHANGED = 4096
+_changed: Set[str] = set()
+_changed_overflow_at = 0.0
+_changed_lock = threading.Lock()
+
+
+def default_index_dir() -> str:
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'windows-file-manager', 'indexes')
+
+
+def default_index_path(root: str) -> str:
+    """Location of the index database for a root directory."""
+    root = os.path.normcase(os.path.abspath(root))
+    digest = hashlib.sha1(root.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    return os.path.join(default_index_dir(), f"{digest}.sqlite")
+
+
+def mark_changed(path: str):
+    """Note that directory path changed, so an index covering it refreshes before its next search."""
+    global _changed_overflow_at
+    with _changed_lock:
+        _changed.add(os.path.normcase(os.path.abspath(path)))
+        if len(_changed) > MAX_CHANGED:
+            # Too many to track one by one: every index refreshed before now is stale
+            _changed.clear()
+            _changed_overflow_at = time.time()
+
+
+def trigrams(name: str) -> Set[str]:
+    name = name.lower()
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+
+class FileIndex:
+    """Persistent trigram index of file and folder names under a root directory.
+
+    The index lives in a SQLite database. build() walks the whole tree once;
+    refresh() stats every indexed directory and only re-lists the ones whose
+    mtime changed, which is enough to pick up creations, deletions and renames.
+    refresh_if_stale() does so only when the watcher reported a change under
+    root (see mark_changed) or the last refresh is too old.
+    """
+
+    def __init__(self, root: str, db_path: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path or default_index_path(self.root)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._check_schema()
+
+    @staticmethod
+    def exists(root: str, db_path: Optional[str] = None) -> bool:
+        return os.path.isfile(db_path or default_index_path(root))
+
+    @staticmethod
+    def find_for(path: str) -> Optional['FileIndex']:
+        """Open the index of path or of its nearest indexed ancestor, if any."""
+        current = os.path.abspath(path)
+        while True:
+            if FileIndex.exists(current):
+                index = FileIndex(current)
+                if index.is_built():
+                    return index
+                index.close()
+            parent = os.path.dirname(current)
+            if parent == current:
+                return None
+            current = parent
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> 'FileIndex':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _check_schema(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        if row is None:
+            with self.conn:
+                self.conn.execute("INSERT INTO meta VALUES ('schema', ?)", (SCHEMA_VERSION,))
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (self.root,))
+        elif row[0] != SCHEMA_VERSION:
+            self.clear()
+
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def is_built(self) -> bool:
+        return self._get_meta('built_at') is not None
+
+    def last_refresh(self) -> Optional[float]:
+        value = self._get_meta('refreshed_at')
+        return float(value) if value else None
+
+    def refresh_if_stale(self, max_age: float) -> bool:
+        """Refresh if paths under root were marked changed or the last refresh is older than max_age seconds."""
+        root = os.path.normcase(self.root)
+        prefix = root.rstrip(os.sep) + os.sep
+        with _changed_lock:
+            changed = {path for path in _changed if path == root or path.startswith(prefix)}
+            _changed.difference_update(changed)
+            overflow_at = _changed_overflow_at
+        last = self.last_refresh()
+        if changed or last is None or last < overflow_at or time.time() - last > max_age:
+            self.refresh()
+            return True
+        return False
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM trigrams")
+            self.conn.execute("DELETE FROM files")
+            self.conn.execute("DELETE FROM dirs")
+            self.conn.execute("DELETE FROM meta")
+            self.conn.execute("INSERT INTO meta VALUES ('schema', ?)", (SCHEMA_VERSION,))
+            self.conn.execute("INSERT INTO meta VALUES ('root', ?)", (self.root,))
+
+    def build(self) -> int:
+        """Index the whole tree from scratch. Returns the number of indexed entries."""
+        self.clear()
+        count = 0
+        with self.conn:
+            pending = [(self.root, None)]
+            while pending:
+                path, parent_id = pending.pop()
+                listed = self._list_directory(path)
+                if listed is None:
+                    continue
+                mtime, entries = listed
+                dir_id = self._insert_dir(path, parent_id, mtime)
+                count += self._insert_entries(dir_id, entries)
+                for name, is_directory in entries:
+                    if is_directory:
+                        pending.append((os.path.join(path, name), dir_id))
+            now = str(time.time())
+            self._set_meta('built_at', now)
+            self._set_meta('refreshed_at', now)
+        return count
+
+    def refresh(self) -> Dict[str, int]:
+        """Bring the index up to date, re-listing only directories whose mtime changed."""
+        if not self.is_built():
+            return {'scanned': 0, 'relisted': 0, 'entries': self.build()}
+
+        stats = {'scanned': 0, 'relisted': 0, 'removed': 0}
+        with self.conn:
+            root_row = self.conn.execute("SELECT id, mtime FROM dirs WHERE path = ?", (self.root,)).fetchone()
+            pending = [(self.root, root_row, None)]
+            while pending:
+                path, row, parent_id = pending.pop()
+                stats['scanned'] += 1
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    if row is not None:
+                        stats['removed'] += self._remove_dir_tree(row[0])
+                    continue
+
+                if row is not None and row[1] == mtime:
+                    dir_id = row[0]
+                    children = self.conn.execute(
+                        "SELECT d.id, d.path, d.mtime FROM dirs d WHERE d.parent_id = ?", (dir_id,)
+                    ).fetchall()
+                    for child_id, child_path, child_mtime in children:
+                        pending.append((child_path, (child_id, child_mtime), dir_id))
+                    continue
+
+                listed = self._list_directory(path)
+                if listed is None:
+                    continue
+                mtime, entries = listed
+                stats['relisted'] += 1
+                if row is None:
+                    dir_id = self._insert_dir(path, parent_id, mtime)
+                else:
+                    dir_id = row[0]
+                    self.conn.execute("UPDATE dirs SET mtime = ? WHERE id = ?", (mtime, dir_id))
+                    self._delete_entries(dir_id)
+                self._insert_entries(dir_id, entries)
+
+                known = {
+                    child_path: (child_id, child_mtime)
+                    for child_id, child_path, child_mtime in self.conn.execute(
+                        "SELECT id, path, mtime FROM dirs WHERE parent_id = ?", (dir_id,)
+                    )
+                }
+                for name, is_directory in entries:
+                    if is_directory:
+                        child_path = os.path.join(path, name)
+                        pending.append((child_path, known.pop(child_path, None), dir_id))
+                for child_id, _ in known.values():
+                    stats['removed'] += self._remove_dir_tree(child_id)
+
+            self._set_meta('refreshed_at', str(time.time()))
+        return stats
+
+    def search(self, query: str, directory: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
+        """Return paths whose name contains query (case-insensitive), optionally under directory."""
+        return list(self.iter_search(query, directory, limit))
+
+    def iter_search(self, query: str, directory: Optional[str] = None, limit: Optional[int] = None) -> Iterator[str]:
+        query = query.lower()
+        grams = sorted(trigrams(query))
+        params: List[Any] = []
+
+        if grams:
+            placeholders = ",".join("?" * len(grams))
+            sql = (
+                "SELECT d.path, f.name FROM files f JOIN dirs d ON d.id = f.dir_id "
+                "WHERE f.id IN (SELECT file_id FROM trigrams WHERE trigram IN (" + placeholders + ") "
+                "GROUP BY file_id HAVING COUNT(*) = ?) AND instr(f.name_lower, ?) > 0"
+            )
+            params.extend(grams)
+            params.append(len(grams))
+        else:
+            sql = "SELECT d.path, f.name FROM files f JOIN dirs d ON d.id = f.dir_id WHERE instr(f.name_lower, ?) > 0"
+        params.append(query)
+
+        if directory is not None:
+            directory = os.path.abspath(directory)
+            if directory != self.root:
+                prefix = directory.rstrip(os.sep) + os.sep
+                sql += " AND (d.path = ? OR substr(d.path, 1, ?) = ?)"
+                params.extend([directory, len(prefix), prefix])
+
+        sql += " ORDER BY d.path, f.name"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        for dir_path, name in self.conn.execute(sql, params):
+            yield os.path.join(dir_path, name)
+
+    def _list_directory(self, path: str) -> Optional[Tuple[float, List[Tuple[str, bool]]]]:
+        try:
+            mtime = os.stat(path).st_mtime
+            entries = []
+            with os.scandir(path) as it:
+                for dirent in it:
+                    try:
+                        is_directory = dirent.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_directory = False
+                    entries.append((dirent.name, is_directory))
+            return mtime, entries
+        except OSError:
+            return None
+
+    def _insert_dir(self, path: str, parent_id: Optional[int], mtime: float) -> int:
+        cursor = self.conn.execute(
+            "INSERT INTO dirs (path, parent_id, mtime) VALUES (?, ?, ?)", (path, parent_id, mtime)
+        )
+        return cursor.lastrowid
+
+    def _insert_entries(self, dir_id: int, entries: Iterable[Tuple[str, bool]]) -> int:
+        count = 0
+        postings = []
+        for name, is_directory in entries:
+            cursor = self.conn.execute(
+                "INSERT INTO files (dir_id, name, name_lower, is_directory) VALUES (?, ?, ?, ?)",
+                (dir_id, name, name.lower(), int(is_directory))
+            )
+            file_id = cursor.lastrowid
+            postings.extend((gram, file_id) for gram in trigrams(name))
+            count += 1
+        self.conn.executemany("INSERT OR IGNORE INTO trigrams (trigram, file_id) VALUES (?, ?)", postings)
+        return count
+
+    def _delete_entries(self, dir_id: int):
+        postings = []
+        for file_id, name_lower in self.conn.execute("SELECT id, name_lower FROM files WHERE dir_id = ?", (dir_id,)):
+            postings.extend((gram, file_id) for gram in trigrams(name_lower))
+        self.conn.executemany("DELETE FROM trigrams WHERE trigram = ? AND file_id = ?", postings)
+        self.conn.execute("DELETE FROM files WHERE dir_id = ?", (dir_id,))
+
+    def _remove_dir_tree(self, dir_id: int) -> int:
+        removed = 0
+        pending = [dir_id]
+        while pending:
+            current = pending.pop()
+            pending.extend(row[0] for row in self.conn.execute("SELECT id FROM dirs WHERE parent_id = ?", (current,)))
+            self._delete_entries(current)
+            self.conn.execute("DELETE FROM dirs WHERE id = ?", (current,))
+            removed += 1
+        return removed
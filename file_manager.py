@@ -1,168 +1,718 @@
 import os
 import shutil
 import stat
-import datetime
-import send2trash
-from pathlib import Path
-from typing import List, Dict, Any, Tuple
+import time
+import threading
+from collections import OrderedDict
+from instrumentation import instrumented, count_syscalls, record_bytes, report_error
+from typing import List, Dict, Any, Callable, Tuple, Iterator, Optional, Sequence
+
+
+def _format_timestamp(timestamp: float) -> str:
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+
+
+class ListingEntry:
+    """Compact directory listing record with lazily formatted display fields."""
+
+    __slots__ = ('name', 'path', 'size_bytes', 'mtime', 'is_directory', '_size', '_modified')
+
+    def __init__(self, name: str, path: str, size_bytes: int, mtime: float, is_directory: bool):
+        self.name = name
+        self.path = path
+        self.size_bytes = size_bytes
+        self.mtime = mtime
+        self.is_directory = is_directory
+        self._size = None
+        self._modified = None
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.name)[1].lower() if not self.is_directory else ""
+
+    @property
+    def size(self) -> str:
+        if self._size is None:
+            self._size = FileManager._get_human_readable_size(self.size_bytes)
+        return self._size
+
+    @property
+    def modified(self) -> str:
+        if self._modified is None:
+            self._modified = _format_timestamp(self.mtime)
+        return self._modified
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'path': self.path,
+            'size': self.size,
+            'size_bytes': self.size_bytes,
+            'modified': self.modified,
+            'is_directory': self.is_directory,
+            'extension': self.extension
+        }
+
+    def __repr__(self) -> str:
+        return f"ListingEntry({self.path!r}, is_directory={self.is_directory})"
+
+
+class DirectoryCache:
+    """Shared LRU cache of directory listings validated against the directory's own mtime/ctime.
+
+    A cached listing is reused as long as the directory's st_mtime_ns and
+    st_ctime_ns are unchanged, so revisiting a folder costs one stat. Changes
+    that do not touch the directory itself (such as a file growing in place)
+    are not detected until the directory is invalidated or modified.
+    Memory use is estimated per entry and capped at max_bytes.
+    """
+
+    # Listings of directories modified this recently are not cached, because a
+    # further change within the same timestamp tick would go unnoticed.
+    RACY_WINDOW = 2.0
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, Tuple[Tuple[int, int], List[ListingEntry], int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    @staticmethod
+    def _validator(stats: os.stat_result) -> Tuple[int, int]:
+        return (stats.st_mtime_ns, stats.st_ctime_ns)
+
+    @staticmethod
+    def estimate_size(entries: List[ListingEntry]) -> int:
+        return sum(200 + len(entry.path) + len(entry.name) for entry in entries)
+
+    def get(self, path: str, stats: Optional[os.stat_result] = None) -> Optional[List[ListingEntry]]:
+        """Return the cached listing of path if it is still valid, else None."""
+        key = self._key(path)
+        try:
+            if stats is None:
+                stats = os.stat(path)
+        except OSError:
+            self.invalidate(path)
+            return None
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == self._validator(stats):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            if cached is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, path: str, stats: os.stat_result, entries: List[ListingEntry]) -> bool:
+        size = self.estimate_size(entries)
+        if size > self.max_bytes:
+            return False
+        if stats.st_mtime > time.time() - self.RACY_WINDOW:
+            return False
+
+        key = self._key(path)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (self._validator(stats), entries, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._drop(self._key(path))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def set_max_bytes(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _drop(self, key: str):
+        cached = self._entries.pop(key, None)
+        if cached is not None:
+            self._bytes -= cached[2]
 
 
 class FileManager:
     """Class to handle file system operations."""
+
+    cache = DirectoryCache()
+    # Seconds a search index is trusted without a refresh when the watcher reported no changes under it
+    INDEX_MAX_AGE = 60.0
+    _drives: Optional[List[Dict[str, Any]]] = None
+    _drives_lock = threading.Lock()
     
     @staticmethod
-    def get_directory_contents(path: str) -> List[Dict[str, Any]]:
-        """Get contents of a directory with file/folder details."""
-        items = []
-        
+    @instrumented('list')
+    def get_directory_contents(path: str, use_cache: bool = True,
+                               sort_by: Sequence[str] = ('type', 'name')) -> List[Dict[str, Any]]:
+        """Get contents of a directory with file/folder details.
+
+        sort_by takes listing_table sort keys, most significant first; the
+        default lists folders before files, each by case-insensitive name.
+        """
+        table = FileManager.get_listing_table(path, use_cache)
+        return table.to_dicts(table.sort(sort_by))
+
+    @staticmethod
+    def get_listing_table(path: str, use_cache: bool = True):
+        """Load a directory into a listing_table.ListingTable for repeated sorting and filtering."""
+        from listing_table import ListingTable
+        return ListingTable.from_chunks(FileManager.iter_directory_contents(path, use_cache=use_cache))
+
+    @staticmethod
+    @instrumented('list_iter')
+    def iter_directory_contents(path: str, chunk_size: int = 1000, use_cache: bool = True,
+                                stats: Optional[os.stat_result] = None) -> Iterator[List[ListingEntry]]:
+        """Stream directory contents as chunks of ListingEntry records.
+
+        Entries are yielded unsorted in directory order; size and date strings
+        are only formatted when a caller reads them. A valid cached listing is
+        served from FileManager.cache, and a fully consumed listing is stored there.
+        Callers that already hold the directory's stat result can pass it as stats.
+        """
+        if not use_cache:
+            stats = None
+        elif stats is None:
+            count_syscalls('stat')
+            try:
+                stats = os.stat(path)
+            except OSError:
+                stats = None
+        if stats is not None:
+            cached = FileManager.cache.get(path, stats)
+            if cached is not None:
+                for i in range(0, len(cached), chunk_size):
+                    yield cached[i:i + chunk_size]
+                return
+
+        chunk = []
+        collected: Optional[List[ListingEntry]] = [] if stats is not None else None
+
         try:
-            for item in os.listdir(path):
-                item_path = os.path.join(path, item)
-                stats = os.stat(item_path)
-                
-                size = FileManager._get_human_readable_size(stats.st_size)
-                modified = datetime.datetime.fromtimestamp(stats.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
-                is_directory = os.path.isdir(item_path)
-                extension = os.path.splitext(item)[1].lower() if not is_directory else ""
-                
-                items.append({
-                    'name': item,
-                    'path': item_path,
-                    'size': size,
-                    'size_bytes': stats.st_size,
-                    'modified': modified,
-                    'is_directory': is_directory,
-                    'extension': extension
-                })
-                
-            items.sort(key=lambda x: (not x['is_directory'], x['name'].lower()))
-            
+            count_syscalls('listdir')
+            with os.scandir(path) as it:
+                for dirent in it:
+                    entry = FileManager._make_listing_entry(dirent)
+                    if entry is None:
+                        continue
+                    chunk.append(entry)
+                    if len(chunk) >= chunk_size:
+                        if collected is not None:
+                            collected.extend(chunk)
+                        # Counted per chunk to keep the per-entry path free of bookkeeping
+                        count_syscalls('stat', len(chunk) if os.name != 'nt' else 0)
+                        yield chunk
+                        chunk = []
         except PermissionError:
-            pass
+            collected = None
         except Exception as e:
-            print(f"Error accessing {path}: {e}")
-            
-        return items
-    
+            collected = None
+            report_error('list', path, e, f"Error accessing {path}: {e}")
+
+        if chunk:
+            if collected is not None:
+                collected.extend(chunk)
+            count_syscalls('stat', len(chunk) if os.name != 'nt' else 0)
+            yield chunk
+
+        if collected is not None:
+            FileManager.cache.put(path, stats, collected)
+
+    @staticmethod
+    def _make_listing_entry(dirent: os.DirEntry) -> Optional[ListingEntry]:
+        try:
+            is_directory = dirent.is_dir()
+            stats = dirent.stat()
+        except OSError:
+            # Dangling symlink or entry removed while listing
+            try:
+                stats = dirent.stat(follow_symlinks=False)
+                is_directory = False
+            except OSError:
+                return None
+        return ListingEntry(dirent.name, dirent.path, stats.st_size, stats.st_mtime, is_directory)
+
     @staticmethod
+    @instrumented('create_directory')
     def create_directory(path: str) -> bool:
         try:
             os.makedirs(path, exist_ok=True)
+            FileManager._invalidate_cache(path)
             return True
         except Exception as e:
-            print(f"Error creating directory {path}: {e}")
+            report_error('create_directory', path, e, f"Error creating directory {path}: {e}")
             return False
     
     @staticmethod
+    @instrumented('rename')
     def rename_item(old_path: str, new_path: str) -> bool:
         try:
             os.rename(old_path, new_path)
+            FileManager._invalidate_cache(old_path, new_path)
             return True
         except Exception as e:
-            print(f"Error renaming {old_path} to {new_path}: {e}")
+            report_error('rename', old_path, e, f"Error renaming {old_path} to {new_path}: {e}")
             return False
     
     @staticmethod
-    def delete_item(path: str, use_trash: bool = True) -> bool:
+    @instrumented('delete')
+    def delete_item(path: str, use_trash: bool = True, progress_callback=None,
+                    max_workers: Optional[int] = None) -> bool:
+        """Delete a file or directory tree, to the trash or permanently.
+
+        Permanent deletes of directories unlink subtrees in parallel; see
+        delete_engine.DeleteEngine. progress_callback receives DeleteProgress
+        snapshots from worker threads.
+        """
         try:
-            if use_trash:
-                send2trash.send2trash(path)
-            else:
-                if os.path.isdir(path):
-                    shutil.rmtree(path)
-                else:
-                    os.remove(path)
-            return True
+            from delete_engine import DeleteEngine
+            engine = DeleteEngine(max_workers=max_workers, use_trash=use_trash,
+                                  progress_callback=progress_callback)
+            result = engine.delete(path)
+            FileManager._invalidate_cache(path)
+            for failed, error in result.errors:
+                report_error('delete', failed, error, f"Error deleting {failed}: {error}")
+            return result.success
         except Exception as e:
-            print(f"Error deleting {path}: {e}")
+            report_error('delete', path, e, f"Error deleting {path}: {e}")
             return False
     
     @staticmethod
-    def copy_item(source: str, destination: str) -> bool:
+    @instrumented('copy')
+    def copy_item(source: str, destination: str, progress_callback=None, verify: bool = False,
+                  max_workers: Optional[int] = None) -> bool:
+        """Copy a file or directory tree through the parallel copy engine.
+
+        progress_callback receives copy_engine.CopyProgress snapshots from worker
+        threads; verify compares checksums of every copied file. As with
+        shutil.copy2 and shutil.copytree, an existing destination file is
+        overwritten but an existing destination folder is an error.
+        """
         try:
-            if os.path.isdir(source):
-                shutil.copytree(source, destination)
-            else:
-                shutil.copy2(source, destination)
-            return True
+            from copy_engine import CopyEngine
+            if os.path.isdir(source) and os.path.exists(destination):
+                raise FileExistsError(f"Destination exists: {destination}")
+            engine = CopyEngine(max_workers=max_workers, verify=verify, progress_callback=progress_callback,
+                                overwrite=True)
+            result = engine.copy(source, destination)
+            record_bytes(result.bytes_copied)
+            FileManager._invalidate_cache(destination)
+            for path, error in result.errors:
+                report_error('copy', path, error, f"Error copying {path}: {error}")
+            return result.success
         except Exception as e:
-            print(f"Error copying {source} to {destination}: {e}")
+            report_error('copy', source, e, f"Error copying {source} to {destination}: {e}")
             return False
     
     @staticmethod
-    def move_item(source: str, destination: str) -> bool:
+    @instrumented('sync')
+    def sync_directories(source: str, destination: str, delete_extra: bool = False, checksum: bool = False,
+                         progress_callback=None, max_workers: Optional[int] = None) -> bool:
+        """Mirror source onto destination, transferring only new and changed files.
+
+        Large changed files are updated block by block; see sync_engine.SyncEngine.
+        delete_extra removes destination entries that are not in source.
+        """
         try:
-            shutil.move(source, destination)
-            return True
+            from sync_engine import SyncEngine
+            engine = SyncEngine(delete_extra=delete_extra, checksum=checksum, max_workers=max_workers,
+                                progress_callback=progress_callback)
+            result = engine.sync(source, destination)
+            record_bytes(result.bytes_copied + result.bytes_literal)
+            FileManager._invalidate_cache(destination)
+            for path, error in result.errors:
+                report_error('sync', path, error, f"Error syncing {path}: {error}")
+            return result.success
+        except Exception as e:
+            report_error('sync', source, e, f"Error syncing {source} to {destination}: {e}")
+            return False
+
+    @staticmethod
+    @instrumented('archive')
+    def create_archive(sources: List[str], archive_path: str, format: Optional[str] = None,
+                       progress_callback=None, max_workers: Optional[int] = None) -> bool:
+        """Pack sources into a zip, tar, tar.gz or tar.zst archive; see archive_engine.ArchiveEngine.
+
+        The format follows archive_path's extension unless given. tar.zst needs
+        the optional zstandard package.
+        """
+        try:
+            from archive_engine import ArchiveEngine
+            engine = ArchiveEngine(max_workers=max_workers, progress_callback=progress_callback)
+            result = engine.create(sources, archive_path, format)
+            record_bytes(result.bytes_in)
+            FileManager._invalidate_cache(archive_path)
+            for path, error in result.errors:
+                report_error('archive', path, error, f"Error archiving {path}: {error}")
+            return result.success
+        except Exception as e:
+            report_error('archive', archive_path, e, f"Error creating {archive_path}: {e}")
+            return False
+
+    @staticmethod
+    @instrumented('extract')
+    def extract_archive(archive_path: str, destination: str, members: Optional[List[str]] = None,
+                        progress_callback=None, max_workers: Optional[int] = None) -> bool:
+        """Extract an archive, or only the named members (directories include their contents)."""
+        try:
+            from archive_engine import ArchiveEngine
+            engine = ArchiveEngine(max_workers=max_workers, progress_callback=progress_callback)
+            result = engine.extract(archive_path, destination, members)
+            record_bytes(result.bytes_in)
+            FileManager._invalidate_cache(destination)
+            for path, error in result.errors:
+                report_error('extract', path, error, f"Error extracting {path}: {error}")
+            return result.success
+        except Exception as e:
+            report_error('extract', archive_path, e, f"Error extracting {archive_path}: {e}")
+            return False
+
+    @staticmethod
+    @instrumented('list_archive')
+    def list_archive(archive_path: str) -> List[Dict[str, Any]]:
+        try:
+            from archive_engine import ArchiveEngine
+            return [entry.to_dict() for entry in ArchiveEngine().list_members(archive_path)]
+        except Exception as e:
+            report_error('list_archive', archive_path, e, f"Error reading {archive_path}: {e}")
+            return []
+    
+    @staticmethod
+    @instrumented('move')
+    def move_item(source: str, destination: str, progress_callback=None,
+                  max_workers: Optional[int] = None) -> bool:
+        """Move a file or directory tree; see move_engine.MoveEngine.
+
+        Moves within a filesystem are a rename. Moves across filesystems copy
+        then delete, and an interrupted one resumes when the same move is
+        started again or through resume_interrupted_moves().
+        """
+        try:
+            from move_engine import MoveEngine
+            engine = MoveEngine(max_workers=max_workers, progress_callback=progress_callback)
+            result = engine.move(source, destination)
+            record_bytes(result.bytes_copied)
+            FileManager._invalidate_cache(source, destination)
+            for path, error in result.errors:
+                report_error('move', path, error, f"Error moving {path}: {error}")
+            return result.success
         except Exception as e:
-            print(f"Error moving {source} to {destination}: {e}")
+            report_error('move', source, e, f"Error moving {source} to {destination}: {e}")
+            return False
+
+    @staticmethod
+    @instrumented('move')
+    def resume_interrupted_moves(progress_callback=None) -> bool:
+        """Finish cross-filesystem moves that were interrupted part way."""
+        try:
+            from move_engine import MoveEngine
+            engine = MoveEngine(progress_callback=progress_callback)
+            pairs = engine.interrupted()
+            result = engine.move_many(pairs)
+            record_bytes(result.bytes_copied)
+            for source, destination in pairs:
+                FileManager._invalidate_cache(source, destination)
+            for path, error in result.errors:
+                report_error('move', path, error, f"Error moving {path}: {error}")
+            return result.success
+        except Exception as e:
+            report_error('move', '', e, f"Error resuming moves: {e}")
             return False
     
     @staticmethod
+    @instrumented('properties')
     def get_item_properties(path: str) -> Dict[str, Any]:
         try:
+            count_syscalls('stat')
             stats = os.stat(path)
+            is_directory = stat.S_ISDIR(stats.st_mode)
             properties = {
                 'name': os.path.basename(path),
                 'path': path,
                 'size': FileManager._get_human_readable_size(stats.st_size),
                 'size_bytes': stats.st_size,
-                'created': datetime.datetime.fromtimestamp(stats.st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
-                'modified': datetime.datetime.fromtimestamp(stats.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                'accessed': datetime.datetime.fromtimestamp(stats.st_atime).strftime('%Y-%m-%d %H:%M:%S'),
-                'is_directory': os.path.isdir(path),
-                'is_file': os.path.isfile(path),
+                'created': _format_timestamp(stats.st_ctime),
+                'modified': _format_timestamp(stats.st_mtime),
+                'accessed': _format_timestamp(stats.st_atime),
+                'is_directory': is_directory,
+                'is_file': stat.S_ISREG(stats.st_mode),
                 'is_hidden': FileManager._is_hidden(path),
                 'permissions': FileManager._get_permissions(stats.st_mode),
             }
             
-            if properties['is_directory']:
+            if is_directory:
                 try:
-                    properties['contents_count'] = len(os.listdir(path))
+                    cached = FileManager.cache.get(path, stats)
+                    if cached is not None:
+                        properties['contents_count'] = len(cached)
+                    else:
+                        # Names only: this runs on the GUI thread and must not stat every entry
+                        count_syscalls('listdir')
+                        with os.scandir(path) as it:
+                            properties['contents_count'] = sum(1 for _ in it)
                 except:
                     properties['contents_count'] = 'Unknown'
+
+                from disk_usage import default_calculator
+                usage = default_calculator().cached(path)
+                if usage is not None:
+                    properties.update(FileManager.usage_properties(usage))
+
+            properties.update(FileManager.get_disk_space(path))
             
             return properties
         except Exception as e:
-            print(f"Error getting properties for {path}: {e}")
+            report_error('properties', path, e, f"Error getting properties for {path}: {e}")
             return {}
-    
+
+    @staticmethod
+    def usage_properties(usage) -> Dict[str, Any]:
+        """Property fields for a disk_usage.DirUsage's recursive totals."""
+        return {
+            'total_size': FileManager._get_human_readable_size(usage.total_bytes),
+            'total_size_bytes': usage.total_bytes,
+            'file_count': usage.total_files,
+            'folder_count': usage.total_dirs,
+        }
+
+    @staticmethod
+    @instrumented('directory_size')
+    def get_directory_size(path: str) -> Dict[str, Any]:
+        """Recursively total the size and file count of a directory.
+
+        Per-directory subtotals are cached, so repeat calls only re-walk the
+        directories that changed. This can take a while on a cold tree; callers
+        on the GUI thread should run it in the background.
+        """
+        try:
+            from disk_usage import default_calculator
+            usage = default_calculator().calculate(path)
+            if usage is None:
+                return {}
+            result = usage.to_dict()
+            result['size'] = FileManager._get_human_readable_size(usage.total_bytes)
+            return result
+        except Exception as e:
+            report_error('directory_size', path, e, f"Error calculating size of {path}: {e}")
+            return {}
+
+    @staticmethod
+    @instrumented('find_duplicates')
+    def find_duplicates(paths: List[str], progress_callback=None, min_size: int = 1,
+                        max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Find duplicate files under paths.
+
+        Files are grouped by size, then by a hash of their first and last few KB,
+        and only files that still collide are hashed in full. Each result lists
+        the duplicate paths and the bytes that removing all but one would free.
+        """
+        try:
+            from duplicates import DuplicateFinder
+            finder = DuplicateFinder(max_workers=max_workers, min_size=min_size,
+                                     progress_callback=progress_callback)
+            return [group.to_dict() for group in finder.find(paths)]
+        except Exception as e:
+            report_error('find_duplicates', paths, e, f"Error finding duplicates in {paths}: {e}")
+            return []
+
+    @staticmethod
+    def get_disk_space(path: str) -> Dict[str, Any]:
+        try:
+            usage = shutil.disk_usage(path)
+            return {
+                'free_size': FileManager._get_human_readable_size(usage.free),
+                'free_bytes': usage.free,
+                'disk_total_size': FileManager._get_human_readable_size(usage.total),
+            }
+        except OSError:
+            return {}
+
     @staticmethod
-    def search_files(directory: str, query: str, recursive: bool = True) -> List[str]:
+    def _invalidate_cache(*paths: str):
+        from disk_usage import default_calculator
+        calculator = default_calculator()
+        for path in paths:
+            FileManager.cache.invalidate(path)
+            FileManager.cache.invalidate(os.path.dirname(os.path.abspath(path)))
+            calculator.invalidate_tree_above(path)
+
+    @staticmethod
+    @instrumented('search')
+    def search_files(directory: str, query: str, recursive: bool = True, use_index: bool = True) -> List[str]:
         results = []
         query = query.lower()
         
         try:
+            if recursive and use_index:
+                indexed = FileManager.iter_index_search(directory, query)
+                if indexed is not None:
+                    return list(indexed)
+
             if recursive:
-                for root, dirs, files in os.walk(directory):
-                    for dir_name in dirs:
-                        if query in dir_name.lower():
-                            results.append(os.path.join(root, dir_name))
-                    
-                    for file_name in files:
-                        if query in file_name.lower():
-                            results.append(os.path.join(root, file_name))
+                results.extend(FileManager.iter_search_files(directory, query))
             else:
+                count_syscalls('listdir')
                 for item in os.listdir(directory):
                     if query in item.lower():
                         results.append(os.path.join(directory, item))
         except Exception as e:
-            print(f"Error searching in {directory}: {e}")
+            report_error('search', directory, e, f"Error searching in {directory}: {e}")
         
         return results
     
     @staticmethod
+    def iter_index_search(directory: str, query: str) -> Optional[Iterator[str]]:
+        """Search the index covering directory, refreshing it first if stale; None if no index covers it.
+
+        Paths are reported under directory as given, like a walk of it would.
+        """
+        from file_index import FileIndex
+        index = FileIndex.find_for(directory)
+        if index is None:
+            return None
+        try:
+            index.refresh_if_stale(FileManager.INDEX_MAX_AGE)
+        except BaseException:
+            index.close()
+            raise
+        return FileManager._iter_index(index, directory, query.lower())
+
+    @staticmethod
+    def _iter_index(index, directory: str, query: str) -> Iterator[str]:
+        with index:
+            prefix = len(os.path.abspath(directory).rstrip(os.sep)) + 1
+            for path in index.iter_search(query, directory):
+                yield os.path.join(directory, path[prefix:])
+
+    @staticmethod
+    def iter_search_files(directory: str, query: str = "", recursive: bool = True,
+                          max_workers: Optional[int] = None, **criteria):
+        """Start a parallel, streaming search under directory.
+
+        Returns a search_engine.ParallelSearch; iterate it to receive matching
+        paths as they are found and call cancel() to abandon it. Extra keyword
+        arguments (glob, regex, extensions, min_size, max_size, modified_after,
+        modified_before, include_files, include_dirs) are passed to SearchCriteria.
+        """
+        from search_engine import ParallelSearch, SearchCriteria
+        return ParallelSearch(directory, SearchCriteria(query, **criteria),
+                              max_workers=max_workers, recursive=recursive)
+
+    @staticmethod
+    def search_file_contents(directory: str, pattern: str, regex: bool = False, case_sensitive: bool = False,
+                             extensions=None, max_file_size: Optional[int] = 256 * 1024 * 1024,
+                             processes: Optional[int] = None):
+        """Start a content search (grep) under directory.
+
+        Returns a content_search.ContentSearch; iterate it to receive
+        ContentMatch(path, line_number, snippet) results as worker processes
+        finish, and call cancel() to stop it.
+        """
+        from content_search import ContentSearch
+        return ContentSearch(directory, pattern, regex=regex, case_sensitive=case_sensitive,
+                             extensions=extensions, max_file_size=max_file_size, processes=processes)
+
+    @staticmethod
+    @instrumented('build_index')
+    def build_search_index(root: str) -> bool:
+        """Build (or rebuild) the persistent filename index for root."""
+        try:
+            from file_index import FileIndex
+            with FileIndex(root) as index:
+                index.build()
+            return True
+        except Exception as e:
+            report_error('build_index', root, e, f"Error building search index for {root}: {e}")
+            return False
+
+    @staticmethod
+    @instrumented('refresh_index')
+    def refresh_search_index(root: str) -> bool:
+        """Incrementally update the filename index for root from directory mtimes."""
+        try:
+            from file_index import FileIndex
+            with FileIndex(root) as index:
+                index.refresh()
+            return True
+        except Exception as e:
+            report_error('refresh_index', root, e, f"Error refreshing search index for {root}: {e}")
+            return False
+
+    @staticmethod
+    @instrumented('create_file')
     def create_file(path: str, content: str = "") -> bool:
         try:
             with open(path, 'w', encoding='utf-8') as f:
                 f.write(content)
+            FileManager._invalidate_cache(path)
             return True
         except Exception as e:
-            print(f"Error creating file {path}: {e}")
+            report_error('create_file', path, e, f"Error creating file {path}: {e}")
             return False
     
     @staticmethod
-    def get_drives() -> List[Dict[str, Any]]:
+    @instrumented('drives')
+    def get_drives(use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Enumerate drives, answering from the last enumeration when use_cache is set.
+
+        Probing drives can block on removable and network media, so callers on
+        the GUI thread should prefer the cached list and refresh_drives().
+        """
+        with FileManager._drives_lock:
+            drives = FileManager._drives
+        if use_cache and drives is not None:
+            return list(drives)
+        drives = FileManager._enumerate_drives()
+        with FileManager._drives_lock:
+            FileManager._drives = drives
+        return list(drives)
+
+    @staticmethod
+    def refresh_drives(callback: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> threading.Thread:
+        """Re-enumerate drives on a background thread and pass the fresh list to callback."""
+        def run():
+            drives = FileManager.get_drives(use_cache=False)
+            if callback is not None:
+                callback(drives)
+
+        thread = threading.Thread(target=run, name="drives", daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _enumerate_drives() -> List[Dict[str, Any]]:
         drives = []
         
         try:
@@ -206,6 +756,9 @@ class FileManager:
                 except:
                     pass
         except ImportError:
+            # Drive letters only exist on Windows
+            if os.name != 'nt':
+                return drives
             for letter in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
                 drive = f"{letter}:\\"
                 if os.path.exists(drive):
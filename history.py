@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import List, Dict, Callable, Optional, Tuple
+
+from file_manager import FileManager, DirectoryCache
+
+
+class NavigationHistory:
+    """Back/forward stacks of visited directories plus per-folder visit counts.
+
+    visit() records a new location and clears the forward stack, as in a web
+    browser; back() and forward() move through the stacks. Visit counts are
+    kept per parent so that a folder's most visited children can be looked up
+    without scanning everything ever visited.
+    """
+
+    def __init__(self, max_entries: int = 100, max_tracked_parents: int = 5000):
+        self.max_entries = max_entries
+        self.max_tracked_parents = max_tracked_parents
+        self._back: List[str] = []
+        self._forward: List[str] = []
+        self.current: Optional[str] = None
+        self._children: 'OrderedDict[str, Counter]' = OrderedDict()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def visit(self, path: str):
+        if self.current is not None and self._key(path) == self._key(self.current):
+            return
+        if self.current is not None:
+            self._back.append(self.current)
+            del self._back[:-self.max_entries]
+        self._forward.clear()
+        self.current = path
+        self._count(path)
+
+    def back(self, valid: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """Step back and return the new location, or None at the start of history.
+
+        Entries for which valid returns False (e.g. deleted folders) are dropped.
+        """
+        return self._step(self._back, self._forward, valid)
+
+    def forward(self, valid: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        return self._step(self._forward, self._back, valid)
+
+    def _step(self, source: List[str], destination: List[str], valid: Optional[Callable[[str], bool]]) -> Optional[str]:
+        while source:
+            path = source.pop()
+            if valid is None or valid(path):
+                destination.append(self.current)
+                self.current = path
+                self._count(path)
+                return path
+        return None
+
+    @property
+    def can_go_back(self) -> bool:
+        return bool(self._back)
+
+    @property
+    def can_go_forward(self) -> bool:
+        return bool(self._forward)
+
+    def peek_back(self) -> Optional[str]:
+        return self._back[-1] if self._back else None
+
+    def peek_forward(self) -> Optional[str]:
+        return self._forward[-1] if self._forward else None
+
+    def most_visited_children(self, path: str, count: int = 3) -> List[str]:
+        children = self._children.get(self._key(path))
+        if not children:
+            return []
+        return [os.path.join(path, name) for name, _ in children.most_common(count)]
+
+    def prefetch_targets(self, children: int = 3) -> List[str]:
+        """Likely next locations, most likely first: back, forward, parent, then popular children."""
+        if self.current is None:
+            return []
+        targets = [self.peek_back(), self.peek_forward()]
+        parent = os.path.dirname(self.current)
+        if parent != self.current:
+            targets.append(parent)
+        targets.extend(self.most_visited_children(self.current, children))
+
+        seen = {self._key(self.current)}
+        unique = []
+        for target in targets:
+            if target and self._key(target) not in seen:
+                seen.add(self._key(target))
+                unique.append(target)
+        return unique
+
+    def _count(self, path: str):
+        parent = os.path.dirname(path)
+        name = os.path.basename(path)
+        if not name:
+            return
+        key = self._key(parent)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = Counter()
+            if len(self._children) > self.max_tracked_parents:
+                self._children.popitem(last=False)
+        else:
+            self._children.move_to_end(key)
+        children[name] += 1
+
+
+class ListingPrefetcher:
+    """Warms FileManager.cache with listings of likely next directories while the app is idle.
+
+    schedule() replaces the pending targets; a single background thread starts
+    on them once idle_delay seconds pass without a new schedule, and abandons
+    a listing as soon as newer targets arrive. Listings loaded this way are
+    charged against memory_budget until they are used (see touch()); when the
+    budget is exceeded, or a prefetched listing stays unused for max_age
+    seconds, it is evicted from the cache again so speculation cannot crowd
+    out listings the user actually opened. Directories with more than
+    max_entries entries are not prefetched.
+    """
+
+    def __init__(self, cache: Optional[DirectoryCache] = None, memory_budget: int = 16 * 1024 * 1024,
+                 max_age: float = 120.0, idle_delay: float = 0.3, max_entries: int = 20000):
+        self.cache = cache if cache is not None else FileManager.cache
+        self.memory_budget = memory_budget
+        self.max_age = max_age
+        self.idle_delay = idle_delay
+        self.max_entries = max_entries
+        self._targets: List[str] = []
+        self._generation = 0
+        self._scheduled_at = 0.0
+        # Cache key -> (estimated bytes, time loaded) of listings not yet visited
+        self._prefetched: 'OrderedDict[str, Tuple[int, float]]' = OrderedDict()
+        self._bytes = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.prefetched = 0
+        self.used = 0
+        self.evicted = 0
+
+    def schedule(self, targets: List[str]):
+        with self._cond:
+            if self._stopped:
+                return
+            self._generation += 1
+            self._targets = list(targets)
+            self._scheduled_at = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def touch(self, path: str):
+        """Mark a directory as visited; its listing is no longer speculative."""
+        key = DirectoryCache._key(path)
+        with self._cond:
+            cached = self._prefetched.pop(key, None)
+            if cached is not None:
+                self._bytes -= cached[0]
+                self.used += 1
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                'prefetched': self.prefetched,
+                'used': self.used,
+                'evicted': self.evicted,
+                'pending': len(self._prefetched),
+                'bytes': self._bytes,
+                'memory_budget': self.memory_budget,
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and not self._targets:
+                    self._cond.wait(self.max_age)
+                    self._expire()
+                if self._stopped:
+                    return
+                delay = self._scheduled_at + self.idle_delay - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                path = self._targets.pop(0)
+                generation = self._generation
+            self._prefetch(path, generation)
+
+    def _prefetch(self, path: str, generation: int):
+        try:
+            stats = os.stat(path)
+        except OSError:
+            return
+        if self.cache.get(path, stats) is not None:
+            return
+
+        entries = []
+        for chunk in FileManager.iter_directory_contents(path, stats=stats):
+            entries.extend(chunk)
+            if len(entries) > self.max_entries or self._generation != generation or self._stopped:
+                # Closing the generator early leaves nothing in the cache
+                return
+            # Give the GUI thread a chance to run between chunks
+            time.sleep(0)
+
+        key = DirectoryCache._key(path)
+        size = DirectoryCache.estimate_size(entries)
+        with self._cond:
+            if self.cache.get(path, stats) is None:
+                # Too recently modified or too large for the cache to keep
+                return
+            self._prefetched[key] = (size, time.monotonic())
+            self._bytes += size
+            self.prefetched += 1
+            while self._bytes > self.memory_budget and self._prefetched:
+                self._evict(next(iter(self._prefetched)))
+            self._expire()
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.max_age
+        while self._prefetched:
+            key, (_, loaded) = next(iter(self._prefetched.items()))
+            if loaded > cutoff:
+                break
+            self._evict(key)
+
+    def _evict(self, key: str):
+        size, _ = self._prefetched.pop(key)
+        self._bytes -= size
+        self.cache.invalidate(key)
+        self.evicted += 1
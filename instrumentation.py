@@ -0,0 +1,288 @@
+"""Opt-in instrumentation for FileManager operations.
+
+Decorated operations record call counts, latency, bytes moved, syscall
+counts (stats and directory listings) and errors as structured events, and
+hand them to every installed sink. With no sink installed the decorators
+reduce to a single truthiness check per call and errors are printed as before.
+
+    import instrumentation
+    metrics = instrumentation.MemorySink()
+    instrumentation.enable(metrics)
+    ...
+    print(metrics.snapshot())
+"""
+import json
+import math
+import threading
+import time
+import functools
+import inspect
+import traceback
+from typing import List, Dict, Any, Callable, Optional
+
+
+_sinks: List['Sink'] = []
+_local = threading.local()
+
+
+class Sink:
+    """Receives event dicts. Implementations must be thread-safe."""
+
+    def emit(self, event: Dict[str, Any]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CallbackSink(Sink):
+    def __init__(self, callback: Callable[[Dict[str, Any]], None]):
+        self.callback = callback
+
+    def emit(self, event: Dict[str, Any]):
+        self.callback(event)
+
+
+class JsonLinesSink(Sink):
+    """Appends one JSON object per event to a file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def emit(self, event: Dict[str, Any]):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class _OperationStats:
+    __slots__ = ('calls', 'errors', 'total_seconds', 'max_seconds', 'bytes', 'syscalls', 'histogram')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.bytes = 0
+        self.syscalls: Dict[str, int] = {}
+        # Bucket i counts calls that took between 2**(i-1) and 2**i microseconds
+        self.histogram: Dict[int, int] = {}
+
+    def percentile(self, fraction: float) -> float:
+        target = self.calls * fraction
+        seen = 0
+        for bucket in sorted(self.histogram):
+            seen += self.histogram[bucket]
+            if seen >= target:
+                return (2 ** bucket) / 1e6
+        return self.max_seconds
+
+
+class MemorySink(Sink):
+    """Aggregates operation events in memory and keeps the most recent errors."""
+
+    def __init__(self, max_errors: int = 1000):
+        self.max_errors = max_errors
+        self._stats: Dict[str, _OperationStats] = {}
+        self.errors: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def emit(self, event: Dict[str, Any]):
+        with self._lock:
+            if event['type'] == 'error':
+                self.errors.append(event)
+                if len(self.errors) > self.max_errors:
+                    del self.errors[0]
+                return
+            stats = self._stats.get(event['op'])
+            if stats is None:
+                stats = self._stats[event['op']] = _OperationStats()
+            duration = event['duration']
+            stats.calls += 1
+            stats.errors += 0 if event['ok'] else 1
+            stats.total_seconds += duration
+            stats.max_seconds = max(stats.max_seconds, duration)
+            stats.bytes += event.get('bytes', 0)
+            for kind, count in event.get('syscalls', {}).items():
+                stats.syscalls[kind] = stats.syscalls.get(kind, 0) + count
+            bucket = max(0, math.ceil(math.log2(max(duration * 1e6, 1))))
+            stats.histogram[bucket] = stats.histogram.get(bucket, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                op: {
+                    'calls': stats.calls,
+                    'errors': stats.errors,
+                    'total_seconds': stats.total_seconds,
+                    'mean_seconds': stats.total_seconds / stats.calls if stats.calls else 0.0,
+                    'max_seconds': stats.max_seconds,
+                    'p50_seconds': stats.percentile(0.5),
+                    'p95_seconds': stats.percentile(0.95),
+                    'p99_seconds': stats.percentile(0.99),
+                    'bytes': stats.bytes,
+                    'syscalls': dict(stats.syscalls),
+                    'histogram_us': {2 ** bucket: count for bucket, count in sorted(stats.histogram.items())},
+                }
+                for op, stats in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.errors.clear()
+
+
+def enable(sink: Sink) -> Sink:
+    """Install a sink. Instrumentation is active while at least one sink is installed."""
+    _sinks.append(sink)
+    return sink
+
+
+def disable(sink: Optional[Sink] = None):
+    """Remove one sink, or all of them when sink is None."""
+    removed = list(_sinks) if sink is None else [sink]
+    for item in removed:
+        if item in _sinks:
+            _sinks.remove(item)
+        item.close()
+
+
+def enabled() -> bool:
+    return bool(_sinks)
+
+
+class _Context:
+    __slots__ = ('op', 'start', 'bytes', 'syscalls', 'failed')
+
+    def __init__(self, op: str):
+        self.op = op
+        self.start = time.perf_counter()
+        self.bytes = 0
+        self.syscalls: Dict[str, int] = {}
+        self.failed = False
+
+
+def _stack() -> List[_Context]:
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _emit(event: Dict[str, Any]):
+    for sink in list(_sinks):
+        try:
+            sink.emit(event)
+        except Exception:
+            traceback.print_exc()
+
+
+def _finish(context: _Context, ok: bool):
+    event = {
+        'type': 'operation',
+        'op': context.op,
+        'ts': time.time(),
+        'duration': time.perf_counter() - context.start,
+        'ok': ok and not context.failed,
+    }
+    if context.bytes:
+        event['bytes'] = context.bytes
+    if context.syscalls:
+        event['syscalls'] = context.syscalls
+    _emit(event)
+
+
+def count_syscalls(kind: str, n: int = 1):
+    """Attribute n syscalls of a kind (e.g. 'stat', 'listdir') to the innermost running operation."""
+    if not _sinks:
+        return
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        syscalls = stack[-1].syscalls
+        syscalls[kind] = syscalls.get(kind, 0) + n
+
+
+def record_bytes(n: int):
+    if not _sinks:
+        return
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        stack[-1].bytes += n
+
+
+def report_error(op: str, path: Any, error: Any, message: str):
+    """Record a failure as a structured event, or print message when instrumentation is off."""
+    if not _sinks:
+        print(message)
+        return
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        stack[-1].failed = True
+    _emit({
+        'type': 'error',
+        'op': op,
+        'ts': time.time(),
+        'path': path,
+        'error': str(error),
+        'exc_type': type(error).__name__ if isinstance(error, BaseException) else None,
+        'message': message,
+    })
+
+
+def instrumented(op: str):
+    """Decorator timing a function (or generator function) as operation op."""
+    def decorate(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if not _sinks:
+                    return (yield from func(*args, **kwargs))
+                context = _Context(op)
+                stack = _stack()
+                generator = func(*args, **kwargs)
+                ok = False
+                try:
+                    while True:
+                        stack.append(context)
+                        try:
+                            item = next(generator)
+                        except StopIteration:
+                            ok = True
+                            return
+                        finally:
+                            stack.pop()
+                        yield item
+                except GeneratorExit:
+                    # The consumer stopped early; that is not a failure of the operation
+                    ok = True
+                    raise
+                finally:
+                    generator.close()
+                    _finish(context, ok)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _sinks:
+                return func(*args, **kwargs)
+            context = _Context(op)
+            stack = _stack()
+            stack.append(context)
+            ok = False
+            try:
+                result = func(*args, **kwargs)
+                ok = result is not False
+                return result
+            finally:
+                stack.pop()
+                _finish(context, ok)
+        return wrapper
+    return decorate
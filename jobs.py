@@ -0,0 +1,381 @@
+import os
+import heapq
+import itertools
+import threading
+import time
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from file_manager import FileManager
+from instrumentation import report_error
+
+
+DELETE = 'delete'
+TRASH = 'trash'
+COPY = 'copy'
+MOVE = 'move'
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+
+class Operation:
+    """A single file operation inside a job."""
+
+    __slots__ = ('kind', 'source', 'destination')
+
+    def __init__(self, kind: str, source: str, destination: Optional[str] = None):
+        if kind not in (DELETE, TRASH, COPY, MOVE):
+            raise ValueError(f"Unknown operation: {kind}")
+        if kind in (COPY, MOVE) and not destination:
+            raise ValueError(f"{kind} needs a destination")
+        self.kind = kind
+        self.source = source
+        self.destination = destination
+
+    def __repr__(self) -> str:
+        return f"Operation({self.kind!r}, {self.source!r}, {self.destination!r})"
+
+
+class OperationResult:
+    __slots__ = ('operation', 'success', 'error', 'cancelled')
+
+    def __init__(self, operation: Operation, success: bool, error: Optional[str] = None, cancelled: bool = False):
+        self.operation = operation
+        self.success = success
+        self.error = error
+        self.cancelled = cancelled
+
+    def __repr__(self) -> str:
+        return f"OperationResult({self.operation.source!r}, success={self.success}, error={self.error!r})"
+
+
+class Job:
+    """A batch of operations scheduled together.
+
+    on_progress is called with (job, [results]) each time a unit of work
+    finishes and on_finished with (job) once every operation has a result.
+    Both run on scheduler worker threads.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    CANCELLED = 'cancelled'
+
+    _ids = itertools.count(1)
+
+    def __init__(self, operations: List[Operation], priority: int = PRIORITY_NORMAL,
+                 on_progress: Optional[Callable[['Job', List[OperationResult]], None]] = None,
+                 on_finished: Optional[Callable[['Job'], None]] = None):
+        self.id = next(Job._ids)
+        self.operations = list(operations)
+        self.priority = priority
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.results: List[OperationResult] = []
+        self.status = Job.PENDING
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._active_engines: List[Any] = []
+
+    @classmethod
+    def delete(cls, paths: List[str], use_trash: bool = True, **kwargs) -> 'Job':
+        return cls([Operation(TRASH if use_trash else DELETE, path) for path in paths], **kwargs)
+
+    @classmethod
+    def copy(cls, paths: List[str], destination_dir: str, **kwargs) -> 'Job':
+        return cls([Operation(COPY, path, os.path.join(destination_dir, os.path.basename(path))) for path in paths],
+                   **kwargs)
+
+    @classmethod
+    def move(cls, paths: List[str], destination_dir: str, **kwargs) -> 'Job':
+        return cls([Operation(MOVE, path, os.path.join(destination_dir, os.path.basename(path))) for path in paths],
+                   **kwargs)
+
+    @property
+    def total(self) -> int:
+        return len(self.operations)
+
+    @property
+    def completed(self) -> int:
+        return len(self.results)
+
+    @property
+    def failed(self) -> List[OperationResult]:
+        return [result for result in self.results if not result.success]
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            engines = list(self._active_engines)
+        for engine in engines:
+            engine.cancel()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _record(self, results: List[OperationResult]):
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+            self.status = Job.RUNNING
+            self.results.extend(results)
+            finished = len(self.results) >= len(self.operations)
+            if finished:
+                self.status = Job.CANCELLED if self.cancelled else Job.FINISHED
+                self.finished_at = time.monotonic()
+        if self.on_progress is not None:
+            self._notify(self.on_progress, self, results)
+        if finished:
+            self._done.set()
+            if self.on_finished is not None:
+                self._notify(self.on_finished, self)
+
+    def _notify(self, callback: Callable[..., None], *args):
+        # A failing callback must not take down the scheduler worker running it
+        try:
+            callback(*args)
+        except Exception as e:
+            report_error('job', [operation.source for operation in self.operations], e,
+                         f"Error in callback of job {self.id}: {e}")
+
+
+class _WorkItem:
+    __slots__ = ('job', 'kind', 'operations', 'device')
+
+    def __init__(self, job: Job, kind: str, operations: List[Operation], device: Any):
+        self.job = job
+        self.kind = kind
+        self.operations = operations
+        self.device = device
+
+
+def _device_of(path: Optional[str]) -> Any:
+    while path:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+    return None
+
+
+class JobScheduler:
+    """Runs jobs on a background pool of worker threads.
+
+    Operations are coalesced into work items: all deletions of a job on one
+    device share a DeleteEngine (trash deletions in batches of
+    trash_batch_size), and copies and moves on one device pair share a single
+    CopyEngine or MoveEngine. Work items are dispatched by job priority, with at most
+    per_device_limit items running against the same device (pair) at once so
+    that one slow disk cannot monopolise the pool.
+    """
+
+    def __init__(self, max_workers: int = 4, per_device_limit: int = 2, trash_batch_size: int = 256):
+        self.max_workers = max_workers
+        self.per_device_limit = per_device_limit
+        self.trash_batch_size = trash_batch_size
+        self._queue: List[Tuple[int, int, _WorkItem]] = []
+        self._deferred: Dict[Any, List[Tuple[int, int, _WorkItem]]] = {}
+        self._running: Dict[Any, int] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._workers: List[threading.Thread] = []
+
+    def submit(self, job: Job) -> Job:
+        items = self._plan(job)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Scheduler is shut down")
+            self._ensure_workers()
+            for item in items:
+                heapq.heappush(self._queue, (job.priority, next(self._seq), item))
+            self._cond.notify_all()
+        if not items:
+            job._record([])
+        return job
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._queue) + sum(len(items) for items in self._deferred.values())
+
+    def _ensure_workers(self):
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker, name=f"job-worker-{len(self._workers)}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _plan(self, job: Job) -> List[_WorkItem]:
+        groups: Dict[Tuple[str, Any], List[Operation]] = {}
+        for operation in job.operations:
+            device = _device_of(operation.source)
+            if operation.kind in (COPY, MOVE):
+                device = (device, _device_of(os.path.dirname(operation.destination)))
+            groups.setdefault((operation.kind, device), []).append(operation)
+
+        items = []
+        for (kind, device), operations in groups.items():
+            size = self.trash_batch_size if kind == TRASH else len(operations)
+            for i in range(0, len(operations), size):
+                items.append(_WorkItem(job, kind, operations[i:i + size], device))
+        return items
+
+    def _next_item(self) -> Optional[_WorkItem]:
+        with self._cond:
+            while True:
+                while self._queue:
+                    entry = heapq.heappop(self._queue)
+                    item = entry[2]
+                    if self._running.get(item.device, 0) < self.per_device_limit:
+                        self._running[item.device] = self._running.get(item.device, 0) + 1
+                        return item
+                    self._deferred.setdefault(item.device, []).append(entry)
+                if self._shutdown:
+                    return None
+                self._cond.wait()
+
+    def _release(self, device: Any):
+        with self._cond:
+            self._running[device] -= 1
+            if not self._running[device]:
+                del self._running[device]
+            deferred = self._deferred.pop(device, [])
+            for entry in deferred:
+                heapq.heappush(self._queue, entry)
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            item = self._next_item()
+            if item is None:
+                return
+            try:
+                if item.job.cancelled:
+                    results = [OperationResult(op, False, "Cancelled", cancelled=True) for op in item.operations]
+                else:
+                    results = self._execute(item)
+            except Exception as e:
+                results = [OperationResult(op, False, str(e)) for op in item.operations]
+            finally:
+                self._release(item.device)
+            item.job._record(results)
+
+    def _execute(self, item: _WorkItem) -> List[OperationResult]:
+        if item.kind in (DELETE, TRASH):
+            return self._delete(item.job, item.operations, use_trash=item.kind == TRASH)
+        if item.kind == COPY:
+            return self._copy(item.job, item.operations)
+        return self._move(item.job, item.operations)
+
+    def _delete(self, job: Job, operations: List[Operation], use_trash: bool) -> List[OperationResult]:
+        from delete_engine import DeleteEngine
+        engine = DeleteEngine(use_trash=use_trash, trash_batch_size=self.trash_batch_size)
+        paths = [operation.source for operation in operations]
+        with job._lock:
+            job._active_engines.append(engine)
+        try:
+            result = engine.delete_many(paths)
+        finally:
+            with job._lock:
+                job._active_engines.remove(engine)
+        FileManager._invalidate_cache(*paths)
+        deleted = set(result.deleted)
+        results = []
+        for operation in operations:
+            if operation.source in deleted:
+                results.append(OperationResult(operation, True))
+            else:
+                failed = _failed_result(operation, result.errors, result.cancelled)
+                results.append(failed or OperationResult(operation, False, "Operation failed"))
+        return results
+
+    def _copy(self, job: Job, operations: List[Operation]) -> List[OperationResult]:
+        from copy_engine import CopyEngine
+        engine = CopyEngine()
+        with job._lock:
+            job._active_engines.append(engine)
+        try:
+            result = engine.copy_many([(operation.source, operation.destination) for operation in operations])
+        finally:
+            with job._lock:
+                job._active_engines.remove(engine)
+        FileManager._invalidate_cache(*[operation.destination for operation in operations])
+
+        results = []
+        for operation in operations:
+            failed = _failed_result(operation, result.errors, result.cancelled)
+            # Operations whose files were all copied before a cancel are complete
+            if failed is not None and failed.cancelled and not _under(operation.source, result.skipped):
+                failed = None
+            results.append(failed if failed is not None else OperationResult(operation, True))
+        return results
+
+    def _move(self, job: Job, operations: List[Operation]) -> List[OperationResult]:
+        from move_engine import MoveEngine
+        engine = MoveEngine()
+        with job._lock:
+            job._active_engines.append(engine)
+        try:
+            result = engine.move_many([(operation.source, operation.destination) for operation in operations])
+        finally:
+            with job._lock:
+                job._active_engines.remove(engine)
+        for operation in operations:
+            FileManager._invalidate_cache(operation.source, operation.destination)
+
+        results = []
+        for operation in operations:
+            failed = _failed_result(operation, result.errors, result.cancelled)
+            # Items moved before a cancel are complete; their sources are gone
+            if failed is not None and failed.cancelled and not os.path.lexists(operation.source):
+                failed = None
+            results.append(failed if failed is not None else OperationResult(operation, True))
+        return results
+
+
+def _under(source: str, paths: List[str]) -> bool:
+    """Whether any of paths is source or lies inside it."""
+    prefix = source.rstrip(os.sep)
+    return any(path == prefix or path.startswith(prefix + os.sep) for path in paths)
+
+
+def _failed_result(operation: Operation, errors: List[Tuple[str, str]], cancelled: bool) -> Optional[OperationResult]:
+    """Failure result for operation from an engine's (path, error) list, or None if it succeeded."""
+    for path, error in errors:
+        if _under(operation.source, [path]):
+            return OperationResult(operation, False, error)
+    if cancelled:
+        return OperationResult(operation, False, "Cancelled", cancelled=True)
+    return None
+
+
+_default_scheduler: Optional[JobScheduler] = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> JobScheduler:
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = JobScheduler()
+        return _default_scheduler
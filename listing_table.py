@@ -0,0 +1,197 @@
+import re
+from array import array
+from itertools import compress
+from typing import List, Dict, Any, Callable, Iterable, Optional, Sequence, Union
+
+from file_manager import ListingEntry
+
+
+SORT_KEYS = ('type', 'name', 'natural', 'extension', 'size', 'modified')
+
+_DIGITS = re.compile(r'\d+')
+
+Indices = Union[array, Sequence[int]]
+
+
+def _encode_number(match) -> str:
+    digits = match.group().lstrip('0') or '0'
+    return f"{len(digits):02d}{digits}"
+
+
+def natural_key(name: str) -> str:
+    """Sort key ordering digit runs by value, so "file2" sorts before "file10".
+
+    Each run of digits is replaced by its length and then the digits, which
+    makes plain string comparison numeric; strings sort much faster than the
+    usual tuple of text and int parts.
+    """
+    return _DIGITS.sub(_encode_number, name.casefold())
+
+
+def _ranks(values: Sequence, order: Sequence[int]) -> array:
+    """Dense rank of every value given the ascending order of values; equal values share a rank."""
+    ranks = array('l', [0]) * len(values)
+    previous = None
+    rank = -1
+    for i in order:
+        value = values[i]
+        if rank < 0 or value != previous:
+            rank += 1
+            previous = value
+        ranks[i] = rank
+    return ranks
+
+
+class ListingTable:
+    """Column-oriented view of a directory listing for repeated sorting and filtering.
+
+    Numeric fields live in array columns. Every sort key is prepared once,
+    on first use, as an integer column (a dense rank for text keys) plus the
+    ascending permutation of rows. A sort starts from the permutation of its
+    least significant key and applies a stable list.sort() keyed by a C-level
+    array lookup for each remaining key; a filter is an index selection.
+    Neither copies nor rebuilds the ListingEntry rows, which are only touched
+    again when results are materialised with entries() or to_dicts().
+
+        table = ListingTable(entries)
+        order = table.sort(['type', '-size', 'natural'])
+        order = table.filter(order, extensions={'.log'}, min_size=1024)
+    """
+
+    def __init__(self, entries: List[ListingEntry]):
+        self._entries = entries
+        self.size = array('q', (entry.size_bytes for entry in entries))
+        self.mtime = array('d', (entry.mtime for entry in entries))
+        # 0 for directories so ascending 'type' lists them first
+        self.kind = array('b', (0 if entry.is_directory else 1 for entry in entries))
+        self._names_lower: Optional[List[str]] = None
+        self._extensions: Optional[List[str]] = None
+        self._ranks: Dict[str, array] = {}
+        self._orders: Dict[str, array] = {}
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[List[ListingEntry]]) -> 'ListingTable':
+        entries: List[ListingEntry] = []
+        for chunk in chunks:
+            entries.extend(chunk)
+        return cls(entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def all(self) -> array:
+        return array('l', range(len(self._entries)))
+
+    @property
+    def names_lower(self) -> List[str]:
+        if self._names_lower is None:
+            self._names_lower = [entry.name.lower() for entry in self._entries]
+        return self._names_lower
+
+    @property
+    def extensions(self) -> List[str]:
+        if self._extensions is None:
+            self._extensions = [entry.extension for entry in self._entries]
+        return self._extensions
+
+    def key_column(self, key: str) -> Sequence:
+        """Numeric column whose ascending order is the ascending order of key."""
+        if key == 'type':
+            return self.kind
+        if key == 'size':
+            return self.size
+        if key == 'modified':
+            return self.mtime
+        ranks = self._ranks.get(key)
+        if ranks is None:
+            if key == 'name':
+                values = self.names_lower
+            elif key == 'natural':
+                values = [natural_key(entry.name) for entry in self._entries]
+            elif key == 'extension':
+                values = self.extensions
+            else:
+                raise ValueError(f"Unknown sort key {key!r}; expected one of {', '.join(SORT_KEYS)}")
+            order = array('l', sorted(range(len(values)), key=values.__getitem__))
+            ranks = self._ranks[key] = _ranks(values, order)
+            self._orders[key] = order
+        return ranks
+
+    def key_order(self, key: str) -> array:
+        """Row indices in ascending order of key, ties in row order."""
+        order = self._orders.get(key)
+        if order is None:
+            column = self.key_column(key)
+            order = self._orders.get(key)
+            if order is None:
+                order = self._orders[key] = array('l', sorted(range(len(column)), key=column.__getitem__))
+        return order
+
+    def sort(self, keys: Union[str, Sequence[str]], indices: Optional[Indices] = None) -> array:
+        """Return row indices ordered by keys, most significant first.
+
+        Prefix a key with '-' to sort it descending, e.g. ['type', '-size', 'name'].
+        Passing indices (such as a filter result) sorts only those rows.
+        """
+        if isinstance(keys, str):
+            keys = [keys]
+        keys = list(keys)
+        if indices is None and keys and not keys[-1].startswith('-'):
+            # The least significant key's cached order replaces its sort pass
+            order = self.key_order(keys.pop()).tolist()
+        else:
+            order = list(range(len(self._entries))) if indices is None else list(indices)
+        # Stable sorts from the least significant key up give the combined order
+        for key in reversed(keys):
+            descending = key.startswith('-')
+            column = self.key_column(key.lstrip('-'))
+            order.sort(key=column.__getitem__, reverse=descending)
+        return array('l', order)
+
+    def filter(self, indices: Optional[Indices] = None, name_contains: Optional[str] = None,
+               extensions: Optional[Iterable[str]] = None, min_size: Optional[int] = None,
+               max_size: Optional[int] = None, modified_after: Optional[float] = None,
+               modified_before: Optional[float] = None, include_files: bool = True,
+               include_dirs: bool = True, predicate: Optional[Callable[[ListingEntry], bool]] = None) -> array:
+        """Return the rows of indices (all rows by default) that match every criterion, in order."""
+        rows: Sequence[int] = self.all() if indices is None else indices
+        if not include_dirs or not include_files:
+            if not include_dirs and not include_files:
+                return array('l')
+            wanted = 1 if include_files else 0
+            kind = self.kind
+            rows = [i for i in rows if kind[i] == wanted]
+        if min_size is not None or max_size is not None:
+            size = self.size
+            low = min_size if min_size is not None else -1
+            high = max_size if max_size is not None else float('inf')
+            rows = [i for i in rows if low <= size[i] <= high]
+        if modified_after is not None or modified_before is not None:
+            mtime = self.mtime
+            low = modified_after if modified_after is not None else float('-inf')
+            high = modified_before if modified_before is not None else float('inf')
+            rows = [i for i in rows if low <= mtime[i] <= high]
+        if extensions is not None:
+            wanted_extensions = {ext.lower() if ext.startswith('.') else '.' + ext.lower() for ext in extensions}
+            matches = [ext in wanted_extensions for ext in self.extensions]
+            rows = [i for i in rows if matches[i]]
+        if name_contains:
+            needle = name_contains.lower()
+            names = self.names_lower
+            rows = [i for i in rows if needle in names[i]]
+        if predicate is not None:
+            entries = self._entries
+            rows = list(compress(rows, (predicate(entries[i]) for i in rows)))
+        return rows if isinstance(rows, array) else array('l', rows)
+
+    def entry(self, row: int) -> ListingEntry:
+        return self._entries[row]
+
+    def entries(self, indices: Optional[Indices] = None) -> List[ListingEntry]:
+        if indices is None:
+            return list(self._entries)
+        entries = self._entries
+        return [entries[i] for i in indices]
+
+    def to_dicts(self, indices: Optional[Indices] = None) -> List[Dict[str, Any]]:
+        return [entry.to_dict() for entry in self.entries(indices)]
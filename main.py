@@ -1,4 +1,30 @@
-from ui import main
+import os
+import sys
+import time
+
+
+def profile_startup() -> int:
+    started = time.perf_counter()
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    import ui
+    return ui.profile_startup(started, time.perf_counter())
+
+
+def serve_in_background():
+    """Let scripts use this GUI process, and its warm caches, through daemon.DaemonClient."""
+    import atexit
+    from daemon import FileManagerDaemon
+    daemon = FileManagerDaemon()
+    daemon.start_in_thread()
+    atexit.register(daemon.close)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if '--profile-startup' in sys.argv[1:]:
+        sys.argv.remove('--profile-startup')
+        sys.exit(profile_startup())
+    if '--serve' in sys.argv[1:]:
+        sys.argv.remove('--serve')
+        serve_in_background()
+    from ui import main
+    main()
@@ -0,0 +1,378 @@
+import os
+import json
+import errno
+import shutil
+import hashlib
+import threading
+import time
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from copy_engine import CopyEngine, CopyProgress
+
+
+def default_journal_dir() -> str:
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'windows-file-manager', 'moves')
+
+
+def journal_path(source: str, destination: str, journal_dir: Optional[str] = None) -> str:
+    """Location of the journal kept while source is moved to destination."""
+    key = os.path.normcase(os.path.abspath(source)) + '\0' + os.path.normcase(os.path.abspath(destination))
+    digest = hashlib.sha1(key.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    return os.path.join(journal_dir or default_journal_dir(), f"{digest}.journal")
+
+
+class MoveJournal:
+    """Append-only record of a cross-device move, one JSON object per line.
+
+    The first line names the move; each further line records a file copied
+    completely (with the size and mtime its source had) or that the copy
+    phase finished and only deleting the source remains. Appends are
+    buffered and flushed at most every flush_interval seconds, so a crash
+    costs at most that much copying.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.source: Optional[str] = None
+        self.destination: Optional[str] = None
+        self.files: Dict[str, Tuple[int, int]] = {}
+        self.copied = False
+        self._file = None
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def exists(self) -> bool:
+        return self.source is not None
+
+    def load(self) -> 'MoveJournal':
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final line from an interrupted write
+                        break
+                    if 'source' in record:
+                        self.source = record['source']
+                        self.destination = record['destination']
+                    elif 'file' in record:
+                        self.files[record['file']] = (record['size'], record['mtime_ns'])
+                    elif record.get('phase') == 'copied':
+                        self.copied = True
+        except OSError:
+            pass
+        return self
+
+    def start(self, source: str, destination: str):
+        self.source = source
+        self.destination = destination
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._append({'source': source, 'destination': destination, 'started': time.time()}, flush=True)
+
+    def record_file(self, relative: str, size: int, mtime_ns: int):
+        self.files[relative] = (size, mtime_ns)
+        self._append({'file': relative, 'size': size, 'mtime_ns': mtime_ns})
+
+    def mark_copied(self):
+        self.copied = True
+        self._append({'phase': 'copied'}, flush=True)
+
+    def is_copied(self, relative: str, size: int, mtime_ns: int) -> bool:
+        return self.files.get(relative) == (size, mtime_ns)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _append(self, record: Dict[str, Any], flush: bool = False):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+            now = time.monotonic()
+            if flush or now - self._last_flush >= self.flush_interval:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._last_flush = now
+
+
+def _fsync(path: str, directory: bool = False):
+    """Flush one file, or a directory's entries, to disk."""
+    if directory and os.name == 'nt':
+        # Directories cannot be opened on Windows; NTFS journals their metadata itself
+        return
+    flags = (os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0)) if directory else os.O_RDWR
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class MoveResult:
+    def __init__(self):
+        self.moved: List[str] = []
+        self.errors: List[Tuple[str, str]] = []
+        self.renamed = 0
+        self.resumed = 0
+        self.bytes_copied = 0
+        self.elapsed = 0.0
+        self.cancelled = False
+
+    @property
+    def success(self) -> bool:
+        return not self.errors and not self.cancelled
+
+
+ProgressCallback = Callable[[CopyProgress], None]
+
+
+class MoveEngine:
+    """Moves files and directory trees, renaming where possible.
+
+    Each top-level item is first tried with os.rename, which is atomic and
+    instant on the same filesystem. Items that cross filesystems are copied
+    with a CopyEngine and their sources removed with a DeleteEngine once the
+    whole item has been copied and fsync'ed. While an item crosses
+    filesystems a MoveJournal records every completed file, so a move that
+    was cancelled, failed or killed part way resumes where it stopped when
+    the same move is started again (see interrupted()); files whose source
+    changed since are copied again. A file that was only partly copied is
+    copied again from the start.
+
+    As with shutil.move, a destination that is an existing directory
+    receives the source inside it. Progress is reported as CopyProgress
+    snapshots of the copy phase.
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 use_journal: bool = True,
+                 journal_dir: Optional[str] = None,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 progress_interval: float = 0.1):
+        self.max_workers = max_workers
+        self.use_journal = use_journal
+        self.journal_dir = journal_dir or default_journal_dir()
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._engine = None
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            engine = self._engine
+        if engine is not None:
+            engine.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def move(self, source: str, destination: str) -> MoveResult:
+        return self.move_many([(source, destination)])
+
+    def move_many(self, pairs: List[Tuple[str, str]]) -> MoveResult:
+        result = MoveResult()
+        start = time.monotonic()
+        for source, destination in pairs:
+            if self.cancelled:
+                break
+            try:
+                self._move_one(source, destination, result)
+            except OSError as e:
+                result.errors.append((source, str(e)))
+        result.cancelled = self.cancelled
+        result.elapsed = time.monotonic() - start
+        return result
+
+    def interrupted(self) -> List[Tuple[str, str]]:
+        """(source, destination) of moves whose journals show they did not finish."""
+        moves = []
+        try:
+            names = sorted(os.listdir(self.journal_dir))
+        except OSError:
+            return moves
+        for name in names:
+            if name.endswith('.journal'):
+                journal = MoveJournal(os.path.join(self.journal_dir, name)).load()
+                if journal.exists:
+                    moves.append((journal.source, journal.destination))
+        return moves
+
+    def resume(self) -> MoveResult:
+        """Finish every interrupted move."""
+        return self.move_many(self.interrupted())
+
+    def _journal(self, source: str, destination: str) -> Optional[MoveJournal]:
+        if not self.use_journal:
+            return None
+        return MoveJournal(journal_path(source, destination, self.journal_dir)).load()
+
+    def _move_one(self, source: str, destination: str, result: MoveResult):
+        journal = self._journal(source, destination)
+        if (journal is None or not journal.exists) and os.path.isdir(destination) and not os.path.islink(destination):
+            destination = os.path.join(destination, os.path.basename(source.rstrip(os.sep)))
+            journal = self._journal(source, destination)
+        if journal is not None and journal.exists:
+            result.resumed += 1
+            self._move_across(source, destination, journal, result)
+            return
+
+        # Fails early for a missing source; rename may report EXDEV before ENOENT
+        os.lstat(source)
+        if os.path.lexists(destination) and os.path.isdir(source):
+            raise FileExistsError(errno.EEXIST, "Destination path already exists", destination)
+        try:
+            os.rename(source, destination)
+            result.renamed += 1
+            result.moved.append(destination)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        self._move_across(source, destination, journal, result)
+
+    def _move_across(self, source: str, destination: str, journal: Optional[MoveJournal], result: MoveResult):
+        try:
+            if journal is not None and not journal.exists:
+                journal.start(os.path.abspath(source), os.path.abspath(destination))
+            if journal is None or not journal.copied:
+                if not self._copy(source, destination, journal, result):
+                    return
+            if self._remove_source(source, result):
+                result.moved.append(destination)
+                if journal is not None:
+                    journal.remove()
+        finally:
+            if journal is not None:
+                journal.close()
+
+    def _copy(self, source: str, destination: str, journal: Optional[MoveJournal], result: MoveResult) -> bool:
+        """Copy whatever the journal does not already show as copied; True if the item is now complete."""
+        files, links, dirs = self._plan(source, destination)
+        errors_before = len(result.errors)
+        pending = []
+        wanted: Dict[str, Tuple[str, int, int]] = {}
+        for src, dst, relative, stats in files:
+            if journal is not None and journal.is_copied(relative, stats.st_size, stats.st_mtime_ns):
+                try:
+                    if os.path.getsize(dst) == stats.st_size:
+                        continue
+                except OSError:
+                    pass
+            pending.append((src, dst))
+            wanted[src] = (relative, stats.st_size, stats.st_mtime_ns)
+
+        def record(src: str, dst: str):
+            # The source is deleted later, so the copy must be on disk before the journal counts it
+            try:
+                _fsync(dst)
+            except OSError as e:
+                result.errors.append((src, str(e)))
+                return
+            if journal is not None:
+                journal.record_file(*wanted[src])
+
+        engine = CopyEngine(max_workers=self.max_workers, overwrite=True, progress_callback=self.progress_callback,
+                            progress_interval=self.progress_interval, file_callback=record)
+        copied = self._run(engine, lambda: engine.copy_many(pending))
+        result.bytes_copied += copied.bytes_copied
+        result.errors.extend(copied.errors)
+        if len(result.errors) > errors_before or copied.cancelled or self.cancelled:
+            return False
+
+        for src, dst in links:
+            try:
+                if os.path.lexists(dst):
+                    os.remove(dst)
+                os.symlink(os.readlink(src), dst)
+            except OSError as e:
+                result.errors.append((src, str(e)))
+        if len(result.errors) > errors_before:
+            return False
+        # Directory timestamps are restored last because copying files into them changes their mtime
+        for src, dst in reversed(dirs):
+            try:
+                shutil.copystat(src, dst, follow_symlinks=False)
+            except OSError:
+                pass
+
+        # Make the new directory entries durable too; for a single file that is its parent's entry
+        try:
+            for dst in [dst for _, dst in dirs] or [os.path.dirname(os.path.abspath(destination))]:
+                _fsync(dst, directory=True)
+        except OSError as e:
+            result.errors.append((source, str(e)))
+            return False
+        if journal is not None:
+            journal.mark_copied()
+        return True
+
+    def _plan(self, source: str, destination: str):
+        """Files (source, destination, relative path, stat), links and directories of source; creates the directories."""
+        files = []
+        links = []
+        dirs = []
+        stats = os.lstat(source)
+        if os.path.islink(source):
+            links.append((source, destination))
+            return files, links, dirs
+        if not os.path.isdir(source):
+            files.append((source, destination, '', stats))
+            return files, links, dirs
+
+        os.makedirs(destination, exist_ok=True)
+        dirs.append((source, destination))
+        pending = [(source, destination, '')]
+        while pending:
+            src_dir, dst_dir, prefix = pending.pop()
+            with os.scandir(src_dir) as it:
+                for dirent in it:
+                    dst_path = os.path.join(dst_dir, dirent.name)
+                    relative = prefix + dirent.name
+                    if dirent.is_symlink():
+                        links.append((dirent.path, dst_path))
+                    elif dirent.is_dir():
+                        os.makedirs(dst_path, exist_ok=True)
+                        dirs.append((dirent.path, dst_path))
+                        pending.append((dirent.path, dst_path, relative + '/'))
+                    else:
+                        files.append((dirent.path, dst_path, relative, dirent.stat(follow_symlinks=False)))
+        return files, links, dirs
+
+    def _remove_source(self, source: str, result: MoveResult) -> bool:
+        from delete_engine import DeleteEngine
+        if not os.path.lexists(source):
+            return True
+        engine = DeleteEngine(max_workers=self.max_workers)
+        deleted = self._run(engine, lambda: engine.delete(source))
+        # On failure the journal stays in the copied phase, so resuming only finishes the delete
+        result.errors.extend(deleted.errors)
+        return deleted.success
+
+    def _run(self, engine, operation: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._engine = engine
+        if self.cancelled:
+            engine.cancel()
+        try:
+            return operation()
+        finally:
+            with self._lock:
+                self._engine = None
@@ -0,0 +1,324 @@
+import os
+import stat
+import codecs
+import heapq
+import hashlib
+import itertools
+import tempfile
+import threading
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from instrumentation import report_error
+
+
+TEXT_EXTENSIONS = {
+    '.txt', '.log', '.md', '.rst', '.csv', '.tsv', '.json', '.xml', '.yaml', '.yml', '.ini', '.cfg',
+    '.conf', '.toml', '.py', '.js', '.ts', '.html', '.htm', '.css', '.c', '.h', '.cpp', '.hpp', '.cs',
+    '.java', '.go', '.rs', '.rb', '.php', '.sh', '.bat', '.ps1', '.sql',
+}
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.ico', '.tif', '.tiff'}
+
+
+class Preview:
+    __slots__ = ('path', 'kind', 'text', 'image_path', 'info', 'truncated')
+
+    def __init__(self, path: str, kind: str, text: str = "", image_path: Optional[str] = None,
+                 info: Optional[Dict[str, Any]] = None, truncated: bool = False):
+        self.path = path
+        self.kind = kind
+        self.text = text
+        self.image_path = image_path
+        self.info = info or {}
+        self.truncated = truncated
+
+    def __repr__(self) -> str:
+        return f"Preview({self.path!r}, kind={self.kind!r}, truncated={self.truncated})"
+
+
+def read_text_preview(path: str, head_bytes: int = 64 * 1024, tail_bytes: int = 16 * 1024,
+                      max_lines: int = 500) -> Preview:
+    """Preview a text file from bounded reads of its head and tail, however large it is."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        head = f.read(head_bytes)
+        encoding = _detect_encoding(head)
+        if not encoding.startswith('utf-16') and b'\0' in head[:8192]:
+            return Preview(path, 'binary', info={'size_bytes': size})
+        tail = b''
+        if size > head_bytes + tail_bytes:
+            f.seek(-tail_bytes, os.SEEK_END)
+            tail = f.read(tail_bytes)
+        elif size > head_bytes:
+            tail = f.read()
+            head, tail = head + tail, b''
+
+    text = _decode(head, encoding)
+    lines = text.splitlines()
+    truncated = size > len(head) + len(tail)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        truncated = True
+    if tail:
+        tail_lines = _decode(tail, encoding, size - len(tail)).splitlines()[1:]  # first line is probably partial
+        lines.append(f"... [{size - len(head) - len(tail)} bytes skipped] ...")
+        lines.extend(tail_lines[-max_lines // 4:])
+    return Preview(path, 'text', "\n".join(lines), info={'size_bytes': size}, truncated=truncated)
+
+
+def _detect_encoding(head: bytes) -> str:
+    """Encoding of a file from its first bytes: a BOM, valid UTF-8, or else the Windows ANSI code page."""
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith(codecs.BOM_UTF16_LE):
+        return 'utf-16-le'
+    if head.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16-be'
+    try:
+        # Not final: a character cut in two at the end of the read is not an error
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1252'
+
+
+def _decode(data: bytes, encoding: str, offset: int = 0) -> str:
+    """Decode bytes read at offset into a file, dropping characters cut off at either end."""
+    if encoding.startswith('utf-16'):
+        # Skip the BOM, or a stray byte when the read started mid code unit
+        data = data[2:] if offset == 0 else data[offset % 2:]
+    elif encoding.startswith('utf-8') and offset:
+        start = 0
+        while start < min(len(data), 3) and 0x80 <= data[start] < 0xC0:
+            start += 1
+        data = data[start:]
+    return codecs.getincrementaldecoder(encoding)(errors='replace').decode(data, final=False)
+
+
+class ThumbnailCache:
+    """On-disk thumbnail cache keyed by path, mtime, size and thumbnail dimensions.
+
+    Thumbnails are PNG files; a hit refreshes the file's mtime, so eviction
+    removes the least recently used thumbnails once max_bytes is exceeded.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        if directory is None:
+            base = (os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME')
+                    or os.path.join(os.path.expanduser('~'), '.cache'))
+            directory = os.path.join(base, 'windows-file-manager', 'thumbnails')
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._bytes = sum(entry.stat().st_size for entry in os.scandir(directory)
+                          if entry.name.endswith(".png") and entry.is_file())
+
+    def key(self, path: str, stats: os.stat_result, width: int, height: int) -> str:
+        raw = f"{os.path.abspath(path)}|{stats.st_mtime_ns}|{stats.st_size}|{width}x{height}"
+        return hashlib.sha1(raw.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        cached = os.path.join(self.directory, key + ".png")
+        try:
+            os.utime(cached)
+            return cached
+        except OSError:
+            return None
+
+    def reserve(self, key: str) -> str:
+        """Unique temporary path a new thumbnail should be written to; pass it to added() or discard()."""
+        fd, temporary = tempfile.mkstemp(prefix=key + ".", suffix=".tmp", dir=self.directory)
+        os.close(fd)
+        return temporary
+
+    def added(self, key: str, temporary: str) -> str:
+        """Move a thumbnail written to a reserve()d path into the cache and return its cached path."""
+        destination = os.path.join(self.directory, key + ".png")
+        size = os.path.getsize(temporary)
+        with self._lock:
+            # Another worker may have stored the same thumbnail first; only the difference is new
+            try:
+                replaced = os.path.getsize(destination)
+            except OSError:
+                replaced = 0
+            os.replace(temporary, destination)
+            self._bytes += size - replaced
+            if self._bytes > self.max_bytes:
+                self._evict()
+        return destination
+
+    @staticmethod
+    def discard(temporary: str):
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            for entry in os.scandir(self.directory):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+            self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".png"):
+                # Thumbnails still being written
+                continue
+            try:
+                stats = entry.stat()
+            except OSError:
+                continue
+            entries.append((stats.st_mtime, stats.st_size, entry.path))
+        entries.sort()
+        # Trim to 90% of the cap so eviction does not run on every insert
+        target = self.max_bytes * 0.9
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._bytes = total
+
+
+def make_thumbnail(path: str, destination: str, width: int, height: int) -> Optional[Dict[str, Any]]:
+    """Decode an image at reduced resolution and save it as PNG.
+
+    QImageReader lets codecs such as JPEG decode directly at the smaller
+    size instead of decoding the full image and scaling it afterwards.
+    """
+    from PySide6.QtGui import QImageReader
+    from PySide6.QtCore import QSize, Qt
+
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    original = reader.size()
+    if original.isValid():
+        target = original.scaled(QSize(width, height), Qt.KeepAspectRatio)
+        if target.width() < original.width():
+            reader.setScaledSize(target)
+    image = reader.read()
+    if image.isNull():
+        return None
+    if image.width() > width or image.height() > height:
+        image = image.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    if not image.save(destination, "PNG"):
+        return None
+    return {'width': original.width(), 'height': original.height()}
+
+
+_scratch_thumbnails: Optional[ThumbnailCache] = None
+_scratch_directory = None
+_scratch_lock = threading.Lock()
+
+
+def _scratch_cache() -> ThumbnailCache:
+    """Thumbnail cache in a temporary directory removed at exit, for callers without a cache."""
+    global _scratch_thumbnails, _scratch_directory
+    with _scratch_lock:
+        if _scratch_thumbnails is None:
+            _scratch_directory = tempfile.TemporaryDirectory(prefix="wfm-thumbnails-")
+            _scratch_thumbnails = ThumbnailCache(_scratch_directory.name, max_bytes=32 * 1024 * 1024)
+        return _scratch_thumbnails
+
+
+def build_preview(path: str, thumbnails: Optional[ThumbnailCache] = None,
+                  thumbnail_size: Tuple[int, int] = (256, 256)) -> Preview:
+    try:
+        stats = os.stat(path)
+    except OSError as e:
+        return Preview(path, 'error', str(e))
+    if stat.S_ISDIR(stats.st_mode):
+        return Preview(path, 'directory', info={'size_bytes': stats.st_size})
+
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension in IMAGE_EXTENSIONS:
+            width, height = thumbnail_size
+            if thumbnails is None:
+                thumbnails = _scratch_cache()
+            key = thumbnails.key(path, stats, width, height)
+            cached = thumbnails.get(key)
+            if cached is not None:
+                return Preview(path, 'image', image_path=cached, info={'size_bytes': stats.st_size})
+            temporary = thumbnails.reserve(key)
+            try:
+                info = make_thumbnail(path, temporary, width, height)
+                if info is None:
+                    return Preview(path, 'unsupported', info={'size_bytes': stats.st_size})
+                destination = thumbnails.added(key, temporary)
+            finally:
+                # Left behind only when the thumbnail was not stored
+                thumbnails.discard(temporary)
+            info['size_bytes'] = stats.st_size
+            return Preview(path, 'image', image_path=destination, info=info)
+        if extension in TEXT_EXTENSIONS or not extension:
+            return read_text_preview(path)
+        # Unknown extension: sniff it as text, which only costs bounded reads
+        preview = read_text_preview(path)
+        return preview if preview.kind == 'text' else Preview(path, 'unsupported', info=preview.info)
+    except OSError as e:
+        return Preview(path, 'error', str(e))
+
+
+class PreviewService:
+    """Generates previews on a small background pool, newest request first.
+
+    Each request gets a rising sequence number and the pending queue is
+    ordered newest-first, so when the user moves through a list the current
+    selection is served before the ones they skipped. With supersede=True
+    older pending requests are dropped outright. Callbacks run on worker threads.
+    """
+
+    def __init__(self, max_workers: int = 2, thumbnails: Optional[ThumbnailCache] = None,
+                 thumbnail_size: Tuple[int, int] = (256, 256)):
+        self.thumbnails = thumbnails if thumbnails is not None else ThumbnailCache()
+        self.thumbnail_size = thumbnail_size
+        self._queue: List[Tuple[int, str, Callable[[Preview], None]]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"preview-{i}", daemon=True) for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def request(self, path: str, callback: Callable[[Preview], None], supersede: bool = True):
+        with self._cond:
+            if supersede:
+                self._queue.clear()
+            heapq.heappush(self._queue, (-next(self._seq), path, callback))
+            self._cond.notify()
+
+    def shutdown(self):
+        with self._cond:
+            self._shutdown = True
+            self._queue.clear()
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._shutdown:
+                    self._cond.wait()
+                if self._shutdown:
+                    return
+                _, path, callback = heapq.heappop(self._queue)
+            preview = build_preview(path, self.thumbnails, self.thumbnail_size)
+            try:
+                callback(preview)
+            except Exception as e:
+                report_error('preview', path, e, f"Error delivering preview for {path}: {e}")
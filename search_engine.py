@@ -0,0 +1,208 @@
+import os
+import re
+import fnmatch
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Iterator, Iterable, Union
+
+
+class SearchCriteria:
+    """Predicates a search result must satisfy.
+
+    Name-based predicates (substring, glob, regex, extension) are checked first
+    and never touch the filesystem. Size and modification-time predicates need
+    stat data, which is only requested from the dirent when one of them is set;
+    on Windows scandir already carries it, so no extra syscall is made there.
+    """
+
+    def __init__(self,
+                 query: str = "",
+                 glob: Optional[str] = None,
+                 regex: Optional[Union[str, 're.Pattern']] = None,
+                 extensions: Optional[Iterable[str]] = None,
+                 min_size: Optional[int] = None,
+                 max_size: Optional[int] = None,
+                 modified_after: Optional[float] = None,
+                 modified_before: Optional[float] = None,
+                 include_files: bool = True,
+                 include_dirs: bool = True,
+                 case_sensitive: bool = False):
+        self.case_sensitive = case_sensitive
+        self.query = query if case_sensitive else query.lower()
+        self.glob = glob
+        flags = 0 if case_sensitive else re.IGNORECASE
+        if glob:
+            self._glob_re = re.compile(fnmatch.translate(glob), flags)
+        else:
+            self._glob_re = None
+        if isinstance(regex, str):
+            regex = re.compile(regex, flags)
+        self.regex = regex
+        if extensions:
+            self.extensions = {
+                (ext if ext.startswith('.') else '.' + ext).lower() for ext in extensions
+            }
+        else:
+            self.extensions = None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.modified_after = modified_after
+        self.modified_before = modified_before
+        self.include_files = include_files
+        self.include_dirs = include_dirs
+
+    @property
+    def needs_stat(self) -> bool:
+        return (self.min_size is not None or self.max_size is not None
+                or self.modified_after is not None or self.modified_before is not None)
+
+    def match_name(self, name: str, is_directory: bool) -> bool:
+        if is_directory and not self.include_dirs:
+            return False
+        if not is_directory and not self.include_files:
+            return False
+        if self.query and self.query not in (name if self.case_sensitive else name.lower()):
+            return False
+        if self._glob_re is not None and not self._glob_re.match(name):
+            return False
+        if self.regex is not None and not self.regex.search(name):
+            return False
+        if self.extensions is not None:
+            if is_directory or os.path.splitext(name)[1].lower() not in self.extensions:
+                return False
+        return True
+
+    def match_stat(self, stats: os.stat_result) -> bool:
+        if self.min_size is not None and stats.st_size < self.min_size:
+            return False
+        if self.max_size is not None and stats.st_size > self.max_size:
+            return False
+        if self.modified_after is not None and stats.st_mtime < self.modified_after:
+            return False
+        if self.modified_before is not None and stats.st_mtime > self.modified_before:
+            return False
+        return True
+
+    def match_entry(self, dirent: os.DirEntry, is_directory: bool) -> bool:
+        if not self.match_name(dirent.name, is_directory):
+            return False
+        if self.needs_stat:
+            try:
+                return self.match_stat(dirent.stat(follow_symlinks=False))
+            except OSError:
+                return False
+        return True
+
+
+_DONE = object()
+
+
+class ParallelSearch:
+    """Recursive search that scans subtrees concurrently and streams matches.
+
+    Each directory is scanned by a pool worker, which queues its subdirectories
+    as new tasks and pushes matches onto a bounded result queue. Iterating the
+    search yields matches as soon as they are found; cancel() (or closing the
+    iterator) stops all workers at the next directory entry.
+    """
+
+    def __init__(self, root: str, criteria: SearchCriteria, max_workers: Optional[int] = None,
+                 recursive: bool = True, queue_size: int = 10000):
+        self.root = root
+        self.criteria = criteria
+        self.recursive = recursive
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self._results: 'queue.Queue' = queue.Queue(maxsize=queue_size)
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.errors: List[str] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def __iter__(self) -> Iterator[str]:
+        return self._run()
+
+    def results(self) -> List[str]:
+        return list(self)
+
+    def _run(self) -> Iterator[str]:
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="search")
+        self._submit(self.root)
+        try:
+            while True:
+                item = self._results.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self.cancel()
+            self._executor.shutdown(wait=False)
+
+    def _submit(self, path: str):
+        with self._lock:
+            self._pending += 1
+        try:
+            self._executor.submit(self._scan, path)
+        except RuntimeError:
+            # Executor already shut down after cancellation
+            self._task_done()
+
+    def _task_done(self):
+        with self._lock:
+            self._pending -= 1
+            finished = self._pending == 0
+        if finished:
+            self._put(_DONE, force=True)
+
+    def _put(self, item, force: bool = False) -> bool:
+        while True:
+            if self._cancelled.is_set() and not force:
+                return False
+            try:
+                self._results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if self._cancelled.is_set():
+                    if force:
+                        # Nobody is consuming any more; drop a result to make room for the sentinel
+                        try:
+                            self._results.get_nowait()
+                        except queue.Empty:
+                            pass
+                        continue
+                    return False
+
+    def _scan(self, path: str):
+        try:
+            if self._cancelled.is_set():
+                return
+            with os.scandir(path) as it:
+                for dirent in it:
+                    if self._cancelled.is_set():
+                        return
+                    try:
+                        is_directory = dirent.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_directory = False
+                    if self.criteria.match_entry(dirent, is_directory):
+                        if not self._put(dirent.path):
+                            return
+                    if is_directory and self.recursive:
+                        self._submit(dirent.path)
+        except OSError as e:
+            self.errors.append(f"{path}: {e}")
+        finally:
+            self._task_done()
+
+
+def search(root: str, criteria: SearchCriteria, recursive: bool = True,
+           max_workers: Optional[int] = None) -> ParallelSearch:
+    return ParallelSearch(root, criteria, max_workers=max_workers, recursive=recursive)
@@ -0,0 +1,211 @@
+import os
+import stat
+import time
+import queue
+import threading
+from collections import OrderedDict
+from typing import List, Iterator, Optional
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+
+from file_manager import FileManager, _format_timestamp
+from instrumentation import report_error
+
+
+class _SearchRun:
+    __slots__ = ('generation', 'cancel_event', 'search')
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.cancel_event = threading.Event()
+        self.search = None
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.search is not None:
+            self.search.cancel()
+
+
+class SearchResultsModel(QAbstractTableModel):
+    """Table of search hits filled from a background producer.
+
+    The model stores one path string per row and stats a row only when a view
+    asks to display it, so memory grows with the number of hits (capped at
+    max_results) rather than with what is known about them. The producer
+    thread hands over matches in batches batch_interval seconds after the
+    first match of each batch, even while the walk goes on finding nothing,
+    and each batch becomes a single row insertion. Starting a new search
+    cancels the previous one, and batches from superseded searches are dropped.
+    """
+
+    COLUMNS = ('Name', 'Folder', 'Size', 'Modified')
+
+    batch_ready = Signal(int, object)
+    search_truncated = Signal(int)
+    search_finished = Signal(int, int)
+
+    def __init__(self, batch_interval: float = 0.05, max_results: int = 1000000,
+                 stat_cache_size: int = 4096, parent=None):
+        super().__init__(parent)
+        self.batch_interval = batch_interval
+        self.max_results = max_results
+        self.stat_cache_size = stat_cache_size
+        self.truncated = False
+        self._paths: List[str] = []
+        self._stats: OrderedDict = OrderedDict()
+        self._generation = 0
+        self._run: Optional[_SearchRun] = None
+        self.batch_ready.connect(self._append_batch)
+        self.search_truncated.connect(self._truncate)
+        self.search_finished.connect(self._finish)
+
+    @property
+    def searching(self) -> bool:
+        return self._run is not None
+
+    def start(self, directory: str, query: str, recursive: bool = True):
+        """Clear the results and start streaming matches for query under directory."""
+        self.cancel()
+        self.beginResetModel()
+        self._paths = []
+        self._stats.clear()
+        self.truncated = False
+        self.endResetModel()
+
+        self._generation += 1
+        run = _SearchRun(self._generation)
+        self._run = run
+        threading.Thread(target=self._produce, args=(run, directory, query, recursive),
+                         name="search-results", daemon=True).start()
+
+    def cancel(self):
+        if self._run is not None:
+            self._run.cancel()
+            self._run = None
+
+    def clear(self):
+        self.cancel()
+        self.beginResetModel()
+        self._paths = []
+        self._stats.clear()
+        self.truncated = False
+        self.endResetModel()
+
+    def path(self, row: int) -> str:
+        return self._paths[row]
+
+    def _produce(self, run: _SearchRun, directory: str, query: str, recursive: bool):
+        # The walk runs on its own thread so a batch is flushed on time even while no match arrives
+        matches: 'queue.Queue' = queue.Queue()
+        done = object()
+
+        def walk():
+            try:
+                for path in self._iter_matches(run, directory, query, recursive):
+                    if run.cancel_event.is_set():
+                        break
+                    matches.put(path)
+            except Exception as e:
+                report_error('search', directory, e, f"Error searching in {directory}: {e}")
+            finally:
+                matches.put(done)
+
+        threading.Thread(target=walk, name="search-walk", daemon=True).start()
+        batch = []
+        count = 0
+        deadline = None
+        try:
+            while True:
+                try:
+                    path = matches.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    path = None
+                if path is done or run.cancel_event.is_set():
+                    break
+                if path is not None:
+                    batch.append(path)
+                    count += 1
+                    if count >= self.max_results:
+                        self.search_truncated.emit(run.generation)
+                        run.cancel()
+                        break
+                    if deadline is None:
+                        deadline = time.monotonic() + self.batch_interval
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.batch_ready.emit(run.generation, batch)
+                    batch = []
+                    deadline = None
+        finally:
+            if batch:
+                self.batch_ready.emit(run.generation, batch)
+            self.search_finished.emit(run.generation, count)
+
+    def _iter_matches(self, run: _SearchRun, directory: str, query: str, recursive: bool) -> Iterator[str]:
+        query = query.lower()
+        if recursive:
+            indexed = FileManager.iter_index_search(directory, query)
+            if indexed is not None:
+                yield from indexed
+                return
+        run.search = FileManager.iter_search_files(directory, query, recursive)
+        if run.cancel_event.is_set():
+            run.search.cancel()
+        yield from run.search
+
+    def _append_batch(self, generation: int, batch: List[str]):
+        if generation != self._generation:
+            return
+        start = len(self._paths)
+        self.beginInsertRows(QModelIndex(), start, start + len(batch) - 1)
+        self._paths.extend(batch)
+        self.endInsertRows()
+
+    def _truncate(self, generation: int):
+        if generation == self._generation:
+            self.truncated = True
+
+    def _finish(self, generation: int, count: int):
+        if generation == self._generation:
+            self._run = None
+
+    def _stat(self, path: str) -> Optional[os.stat_result]:
+        if path in self._stats:
+            self._stats.move_to_end(path)
+            return self._stats[path]
+        try:
+            stats = os.stat(path)
+        except OSError:
+            stats = None
+        self._stats[path] = stats
+        if len(self._stats) > self.stat_cache_size:
+            self._stats.popitem(last=False)
+        return stats
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._paths)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        path = self._paths[index.row()]
+        if role == Qt.ToolTipRole:
+            return path
+        column = index.column()
+        if column == 0:
+            return os.path.basename(path)
+        if column == 1:
+            return os.path.dirname(path)
+        stats = self._stat(path)
+        if stats is None:
+            return ""
+        if column == 2:
+            return "" if stat.S_ISDIR(stats.st_mode) else FileManager._get_human_readable_size(stats.st_size)
+        return _format_timestamp(stats.st_mtime)
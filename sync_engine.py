@@ -0,0 +1,630 @@
+import os
+import json
+import mmap
+import time
+import zlib
+import base64
+import shutil
+import hashlib
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Callable, FrozenSet, Optional, Set, Tuple
+
+from copy_engine import CopyEngine, CopyProgress, file_checksum
+
+
+MANIFEST_VERSION = 1
+
+_ADLER_MOD = 65521
+
+
+def default_manifest_dir() -> str:
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'windows-file-manager', 'manifests')
+
+
+def default_manifest_path(destination: str) -> str:
+    """Location of the manifest kept for a sync destination."""
+    destination = os.path.normcase(os.path.abspath(destination))
+    digest = hashlib.sha1(destination.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    return os.path.join(default_manifest_dir(), f"{digest}.json")
+
+
+class BlockSignatures:
+    """Per-block weak (Adler-32) and strong (BLAKE2b) checksums of a file."""
+
+    __slots__ = ('block_size', 'size', 'weak', 'strong')
+
+    def __init__(self, block_size: int, size: int, weak: array, strong: List[bytes]):
+        self.block_size = block_size
+        self.size = size
+        self.weak = weak
+        self.strong = strong
+
+    def lookup(self) -> Dict[int, List[int]]:
+        table: Dict[int, List[int]] = {}
+        for index, weak in enumerate(self.weak):
+            table.setdefault(weak, []).append(index)
+        return table
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'block_size': self.block_size,
+            'size': self.size,
+            'weak': base64.b64encode(self.weak.tobytes()).decode('ascii'),
+            'strong': base64.b64encode(b''.join(self.strong)).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BlockSignatures':
+        weak = array('I')
+        weak.frombytes(base64.b64decode(data['weak']))
+        raw = base64.b64decode(data['strong'])
+        strong = [raw[i:i + 16] for i in range(0, len(raw), 16)]
+        return cls(data['block_size'], data['size'], weak, strong)
+
+
+def _strong(data) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def block_signatures(path: str, block_size: int) -> BlockSignatures:
+    weak = array('I')
+    strong = []
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            weak.append(zlib.adler32(block))
+            strong.append(_strong(block))
+            size += len(block)
+    return BlockSignatures(block_size, size, weak, strong)
+
+
+def compute_delta(source: str, signatures: BlockSignatures,
+                  max_roll_bytes: int = 2 * 1024 * 1024) -> List[Tuple[str, int, int]]:
+    """Describe source as a list of ('copy', old_offset, length) and ('data', source_offset, length) ops.
+
+    Blocks are first matched at block-aligned positions with zlib.adler32,
+    which finds in-place edits at C speed. After a miss the window is rolled
+    byte by byte, rsync-style, to find blocks that moved because data was
+    inserted or removed; rolling runs in Python, so it is limited to
+    max_roll_bytes per file and later misses fall back to aligned checks.
+    """
+    block_size = signatures.block_size
+    table = signatures.lookup()
+    strong = signatures.strong
+    ops: List[Tuple[str, int, int]] = []
+
+    def emit(kind: str, offset: int, length: int):
+        if ops and ops[-1][0] == kind and ops[-1][1] + ops[-1][2] == offset:
+            ops[-1] = (kind, ops[-1][1], ops[-1][2] + length)
+        else:
+            ops.append((kind, offset, length))
+
+    def block_length(index: int) -> int:
+        return min(block_size, signatures.size - index * block_size)
+
+    with open(source, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return ops
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+
+            def find(start: int, length: int, weak: int) -> Optional[int]:
+                candidates = table.get(weak)
+                if candidates:
+                    digest = _strong(data[start:start + length])
+                    for index in candidates:
+                        if strong[index] == digest and block_length(index) == length:
+                            return index
+                return None
+
+            def roll(start: int, weak: int) -> Tuple[int, Optional[int]]:
+                # Tries the full windows starting at start+1 .. start+block_size and
+                # returns (window start, block index), or (next untried start, None)
+                a = weak & 0xffff
+                b = weak >> 16
+                last = min(start + block_size, size - block_size)
+                for position in range(start, last):
+                    out_byte = data[position]
+                    a = (a - out_byte + data[position + block_size]) % _ADLER_MOD
+                    b = (b - block_size * out_byte - 1 + a) % _ADLER_MOD
+                    index = find(position + 1, block_size, (b << 16) | a)
+                    if index is not None:
+                        return position + 1, index
+                return last + 1, None
+
+            literal = 0
+            position = 0
+            budget = max_roll_bytes
+            while position < size:
+                length = min(block_size, size - position)
+                weak = zlib.adler32(data[position:position + length])
+                index = find(position, length, weak)
+                if index is None and budget > 0 and position + block_size < size:
+                    next_position, index = roll(position, weak)
+                    budget -= next_position - position
+                    position = next_position
+                    if index is None:
+                        continue
+                if index is not None:
+                    if position > literal:
+                        emit('data', literal, position - literal)
+                    emit('copy', index * block_size, block_length(index))
+                    position += block_length(index)
+                    literal = position
+                else:
+                    position += length
+            if size > literal:
+                emit('data', literal, size - literal)
+    return ops
+
+
+def apply_delta(source: str, destination: str, ops: List[Tuple[str, int, int]],
+                buffer_size: int = 1024 * 1024) -> Tuple[int, int]:
+    """Rewrite destination so it matches source. Returns (literal bytes written, bytes reused).
+
+    When every reused block is already at its final offset the file is
+    patched in place and only literal ranges are written; otherwise the new
+    content is assembled in a temporary file next to destination.
+    """
+    literal = sum(length for kind, _, length in ops if kind == 'data')
+    reused = sum(length for kind, _, length in ops if kind == 'copy')
+    new_size = literal + reused
+
+    in_place = True
+    offset = 0
+    for kind, start, length in ops:
+        if kind == 'copy' and start != offset:
+            in_place = False
+            break
+        offset += length
+
+    with open(source, 'rb') as fsrc:
+        if in_place:
+            with open(destination, 'r+b') as fdst:
+                offset = 0
+                for kind, start, length in ops:
+                    if kind == 'data':
+                        fdst.seek(offset)
+                        _copy_range(fsrc, start, fdst, length, buffer_size)
+                    offset += length
+                fdst.truncate(new_size)
+            return literal, reused
+
+        temporary = os.path.join(os.path.dirname(destination), f".{os.path.basename(destination)}.fm-sync")
+        try:
+            with open(destination, 'rb') as fold, open(temporary, 'wb') as fdst:
+                for kind, start, length in ops:
+                    _copy_range(fsrc if kind == 'data' else fold, start, fdst, length, buffer_size)
+            os.replace(temporary, destination)
+        except BaseException:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            raise
+    return literal, reused
+
+
+def _copy_range(fsrc, start: int, fdst, length: int, buffer_size: int):
+    fsrc.seek(start)
+    while length > 0:
+        chunk = fsrc.read(min(buffer_size, length))
+        if not chunk:
+            raise IOError("Source changed while syncing")
+        fdst.write(chunk)
+        length -= len(chunk)
+
+
+class Manifest:
+    """Cached state of a sync destination: size, mtime, hash and block signatures per file.
+
+    A record is only trusted while the destination file still has the size
+    and mtime it was recorded with.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'Manifest':
+        manifest = cls(path)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                manifest.files = data.get('files', {})
+        except (OSError, ValueError):
+            pass
+        return manifest
+
+    def save(self):
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = self.path + ".tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files}, f)
+        os.replace(temporary, self.path)
+
+    def get(self, rel: str, size: int, mtime_ns: int) -> Optional[Dict[str, Any]]:
+        record = self.files.get(rel)
+        if record is not None and record['size'] == size and record['mtime_ns'] == mtime_ns:
+            return record
+        return None
+
+    def signatures(self, rel: str, size: int, mtime_ns: int, block_size: int) -> Optional[BlockSignatures]:
+        record = self.get(rel, size, mtime_ns)
+        if record is None or not record.get('blocks'):
+            return None
+        signatures = BlockSignatures.from_dict(record['blocks'])
+        return signatures if signatures.block_size == block_size else None
+
+
+class SyncResult:
+    def __init__(self):
+        self.copied: List[str] = []
+        self.updated: List[str] = []
+        self.deleted: List[str] = []
+        self.skipped = 0
+        self.errors: List[Tuple[str, str]] = []
+        self.bytes_copied = 0
+        self.bytes_literal = 0
+        self.bytes_reused = 0
+        self.elapsed = 0.0
+        self.cancelled = False
+
+    @property
+    def success(self) -> bool:
+        return not self.errors and not self.cancelled
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'copied': len(self.copied),
+            'updated': len(self.updated),
+            'deleted': len(self.deleted),
+            'skipped': self.skipped,
+            'errors': list(self.errors),
+            'bytes_copied': self.bytes_copied,
+            'bytes_literal': self.bytes_literal,
+            'bytes_reused': self.bytes_reused,
+            'elapsed': self.elapsed,
+            'cancelled': self.cancelled,
+        }
+
+
+def _scan(root: str, errors: List[Tuple[str, str]]) -> Tuple[Dict[str, Tuple[int, int]], List[str], Set[str]]:
+    """Map every file under root to (size, mtime_ns) by relative path and list its subdirectories.
+
+    Symlinks are followed the way CopyEngine copies them: a symlinked file is
+    described by its target and a symlinked directory is walked as a directory.
+    Entries that cannot be read are added to errors; the last value holds the
+    directories that could not be listed, whose contents are unknown.
+    """
+    files: Dict[str, Tuple[int, int]] = {}
+    dirs: List[str] = []
+    unlisted: Set[str] = set()
+    pending: List[Tuple[str, str, FrozenSet[Tuple[int, int]]]] = [('', root, frozenset())]
+    while pending:
+        rel_dir, path, ancestors = pending.pop()
+        try:
+            stats = os.stat(path)
+            identity = (stats.st_dev, stats.st_ino)
+            if identity in ancestors:
+                # A symlink back to an enclosing directory; walking it would never end
+                errors.append((path, "Directory symlink loop"))
+                continue
+            ancestors = ancestors | {identity}
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError as e:
+            errors.append((path, str(e)))
+            unlisted.add(rel_dir)
+            continue
+        for dirent in entries:
+            rel = f"{rel_dir}/{dirent.name}" if rel_dir else dirent.name
+            try:
+                if dirent.is_dir():
+                    dirs.append(rel)
+                    pending.append((rel, dirent.path, ancestors))
+                    continue
+                try:
+                    stats = dirent.stat()
+                except OSError:
+                    # Dangling symlink; copying it will report the error
+                    stats = dirent.stat(follow_symlinks=False)
+            except OSError as e:
+                # Vanished since the listing was read
+                errors.append((dirent.path, str(e)))
+                continue
+            files[rel] = (stats.st_size, stats.st_mtime_ns)
+    return files, dirs, unlisted
+
+
+def _within(rel: str, dirs: Set[str]) -> bool:
+    """Whether rel is one of dirs or lies beneath one of them ('' is the root)."""
+    if '' in dirs:
+        return True
+    while rel:
+        if rel in dirs:
+            return True
+        rel = rel.rsplit('/', 1)[0] if '/' in rel else ''
+    return False
+
+
+class SyncEngine:
+    """Mirrors a source tree onto a destination, transferring only what changed.
+
+    Files are compared by size and mtime (and content hash with checksum=True).
+    New files and small changed files are copied through CopyEngine; changed
+    files of at least delta_threshold bytes are updated from a block delta so
+    only modified blocks are written. The destination's hashes and block
+    signatures are cached in a manifest, so repeat syncs need not read the
+    destination back. Extra destination entries are removed with delete_extra.
+    """
+
+    def __init__(self,
+                 delete_extra: bool = False,
+                 checksum: bool = False,
+                 delta_threshold: int = 8 * 1024 * 1024,
+                 block_size: int = 64 * 1024,
+                 max_roll_bytes: int = 2 * 1024 * 1024,
+                 modify_window: float = 0.0,
+                 max_workers: Optional[int] = None,
+                 manifest_path: Optional[str] = None,
+                 use_manifest: bool = True,
+                 progress_callback: Optional[Callable[[CopyProgress], None]] = None,
+                 progress_interval: float = 0.1):
+        self.delete_extra = delete_extra
+        self.checksum = checksum
+        self.delta_threshold = delta_threshold
+        self.block_size = block_size
+        self.max_roll_bytes = max_roll_bytes
+        self.modify_window_ns = int(modify_window * 1e9)
+        self.max_workers = max_workers
+        self.manifest_path = manifest_path
+        self.use_manifest = use_manifest
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self._cancelled = threading.Event()
+        self._copy_engine: Optional[CopyEngine] = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._copy_engine is not None:
+            self._copy_engine.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def sync(self, source: str, destination: str) -> SyncResult:
+        result = SyncResult()
+        start = time.monotonic()
+        if not os.path.isdir(source):
+            raise NotADirectoryError(f"Source is not a directory: {source}")
+        os.makedirs(destination, exist_ok=True)
+
+        if self.use_manifest:
+            manifest = Manifest.load(self.manifest_path or default_manifest_path(destination))
+        else:
+            manifest = Manifest()
+        source_files, source_dirs, source_unlisted = _scan(source, result.errors)
+        dest_files, dest_dirs, _ = _scan(destination, result.errors)
+        source_dir_set = set(source_dirs)
+        dest_dir_set = set(dest_dirs)
+
+        # An entry that changed between file and directory is removed before anything is copied
+        for rel in [rel for rel in source_files if rel in dest_dir_set]:
+            self._remove(self._join(destination, rel), result)
+            prefix = rel + '/'
+            dest_dir_set = {d for d in dest_dir_set if d != rel and not d.startswith(prefix)}
+            dest_files = {f: s for f, s in dest_files.items() if not f.startswith(prefix)}
+        for rel in [rel for rel in dest_files if rel in source_dir_set]:
+            self._remove(self._join(destination, rel), result)
+            del dest_files[rel]
+
+        for rel in sorted(source_dirs):
+            os.makedirs(self._join(destination, rel), exist_ok=True)
+
+        copies: List[str] = []
+        deltas: List[str] = []
+        for rel, (size, mtime_ns) in source_files.items():
+            existing = dest_files.get(rel)
+            if existing is not None and self._unchanged(rel, source, destination, (size, mtime_ns),
+                                                        existing, manifest):
+                result.skipped += 1
+                continue
+            if existing is not None and size >= self.delta_threshold and existing[0] >= self.delta_threshold:
+                deltas.append(rel)
+            else:
+                copies.append(rel)
+
+        total_bytes = sum(source_files[rel][0] for rel in copies) + sum(source_files[rel][0] for rel in deltas)
+        self._progress = CopyProgress(total_bytes, len(copies) + len(deltas))
+        self._start = start
+        self._last_report = 0.0
+        self._copy_done = (0, 0)
+        self._delta_done = (0, 0)
+
+        if copies and not self.cancelled:
+            self._copy_engine = CopyEngine(max_workers=self.max_workers, overwrite=True,
+                                           progress_callback=self._on_copy_progress,
+                                           progress_interval=self.progress_interval)
+            copied = self._copy_engine.copy_many(
+                [(self._join(source, rel), self._join(destination, rel)) for rel in copies])
+            result.copied.extend(copied.copied)
+            result.errors.extend(copied.errors)
+            result.bytes_copied += copied.bytes_copied
+
+        if deltas and not self.cancelled:
+            with ThreadPoolExecutor(max_workers=min(4, len(deltas)), thread_name_prefix="sync-delta") as executor:
+                futures = {executor.submit(self._update, rel, source, destination, manifest): rel for rel in deltas}
+                for future in as_completed(futures):
+                    rel = futures[future]
+                    error = future.exception()
+                    if error is not None:
+                        result.errors.append((self._join(source, rel), str(error)))
+                        continue
+                    applied = future.result()
+                    if applied is None:
+                        # Cancelled before the destination was touched
+                        continue
+                    literal, reused = applied
+                    result.updated.append(self._join(destination, rel))
+                    result.bytes_literal += literal
+                    result.bytes_reused += reused
+
+        if self.delete_extra and not self.cancelled:
+            # Nothing is extra beneath a source directory whose contents could not be read
+            extra_dirs = set(d for d in dest_dir_set
+                             if d not in source_dir_set and not _within(d, source_unlisted))
+            for rel in sorted(extra_dirs):
+                parent = rel.rsplit('/', 1)[0] if '/' in rel else None
+                if parent is None or parent not in extra_dirs:
+                    self._remove(self._join(destination, rel), result)
+            for rel in dest_files:
+                parent = rel.rsplit('/', 1)[0] if '/' in rel else None
+                if (rel not in source_files and (parent is None or parent not in extra_dirs)
+                        and not _within(rel, source_unlisted)):
+                    self._remove(self._join(destination, rel), result)
+
+        # Directory timestamps last, since writing into a directory changes its mtime
+        for rel in sorted(source_dirs, reverse=True):
+            try:
+                shutil.copystat(self._join(source, rel), self._join(destination, rel))
+            except OSError:
+                pass
+
+        self._record(manifest, source_files, dest_files, set(copies) | set(deltas), source, destination, result)
+        result.cancelled = self.cancelled
+        result.elapsed = time.monotonic() - start
+        self._report(force=True)
+        return result
+
+    @staticmethod
+    def _join(root: str, rel: str) -> str:
+        return os.path.join(root, *rel.split('/'))
+
+    def _unchanged(self, rel: str, source: str, destination: str, source_stat: Tuple[int, int],
+                   dest_stat: Tuple[int, int], manifest: Manifest) -> bool:
+        if source_stat[0] != dest_stat[0]:
+            return False
+        if abs(source_stat[1] - dest_stat[1]) > self.modify_window_ns:
+            return False
+        if not self.checksum:
+            return True
+        record = manifest.get(rel, *dest_stat)
+        dest_hash = record.get('hash') if record else None
+        if dest_hash is None:
+            dest_hash = file_checksum(self._join(destination, rel))
+            manifest.files[rel] = {'size': dest_stat[0], 'mtime_ns': dest_stat[1], 'hash': dest_hash,
+                                   'blocks': record.get('blocks') if record else None}
+        return file_checksum(self._join(source, rel)) == dest_hash
+
+    def _update(self, rel: str, source: str, destination: str, manifest: Manifest) -> Optional[Tuple[int, int]]:
+        """Patch one destination file from a block delta; None if cancelled before anything was written."""
+        src_path = self._join(source, rel)
+        dst_path = self._join(destination, rel)
+        if self.cancelled:
+            return None
+        dst_stats = os.stat(dst_path)
+        signatures = manifest.signatures(rel, dst_stats.st_size, dst_stats.st_mtime_ns, self.block_size)
+        if signatures is None:
+            signatures = block_signatures(dst_path, self.block_size)
+        ops = compute_delta(src_path, signatures, self.max_roll_bytes)
+        literal, reused = apply_delta(src_path, dst_path, ops)
+        shutil.copystat(src_path, dst_path)
+        with self._lock:
+            done_bytes, done_files = self._delta_done
+            self._delta_done = (done_bytes + literal + reused, done_files + 1)
+        self._report()
+        return literal, reused
+
+    def _remove(self, path: str, result: SyncResult):
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            result.deleted.append(path)
+        except OSError as e:
+            result.errors.append((path, str(e)))
+
+    def _record(self, manifest: Manifest, source_files: Dict[str, Tuple[int, int]],
+                dest_files: Dict[str, Tuple[int, int]], pending: Set[str], source: str, destination: str,
+                result: SyncResult):
+        """Save the manifest for the destination as this run left it.
+
+        Files that were due to be written but were not (a cancelled run, or a
+        failed copy) get no record, since their content is no longer known.
+        """
+        if manifest.path is None:
+            return
+        written = set(result.copied) | set(result.updated)
+        files: Dict[str, Dict[str, Any]] = {}
+        for rel in source_files:
+            path = self._join(destination, rel)
+            if path in written:
+                try:
+                    stats = os.stat(path)
+                except OSError:
+                    continue
+                files[rel] = {'size': stats.st_size, 'mtime_ns': stats.st_mtime_ns, 'hash': None,
+                              'blocks': self._written_signatures(self._join(source, rel), stats)}
+            elif rel in dest_files and rel not in pending:
+                previous = manifest.get(rel, *dest_files[rel])
+                files[rel] = previous or {'size': dest_files[rel][0], 'mtime_ns': dest_files[rel][1],
+                                          'hash': None, 'blocks': None}
+        manifest.files = files
+        try:
+            manifest.save()
+        except OSError as e:
+            result.errors.append((manifest.path, str(e)))
+
+    def _written_signatures(self, src_path: str, dest_stats: os.stat_result) -> Optional[Dict[str, Any]]:
+        """Block signatures of a freshly written file, taken from its source to avoid reading the copy back.
+
+        The destination carries the source's size and mtime from when it was
+        written, so the source is only signed while it still has both; if it
+        changed since, the copy is left unsigned and read back on the next delta.
+        """
+        if dest_stats.st_size < self.delta_threshold:
+            return None
+        try:
+            before = os.stat(src_path)
+            if (before.st_size, before.st_mtime_ns) != (dest_stats.st_size, dest_stats.st_mtime_ns):
+                return None
+            signatures = block_signatures(src_path, self.block_size)
+            after = os.stat(src_path)
+        except OSError:
+            return None
+        if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+            return None
+        return signatures.to_dict()
+
+    def _on_copy_progress(self, progress: CopyProgress):
+        with self._lock:
+            self._copy_done = (progress.bytes_done, progress.files_done)
+        self._report()
+
+    def _report(self, force: bool = False):
+        if self.progress_callback is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_report < self.progress_interval:
+                return
+            self._last_report = now
+            self._progress.bytes_done = self._copy_done[0] + self._delta_done[0]
+            self._progress.files_done = self._copy_done[1] + self._delta_done[1]
+            self._progress.elapsed = now - self._start
+            snapshot = self._progress.copy()
+        self.progress_callback(snapshot)
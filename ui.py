@@ -1,19 +1,112 @@
 import sys
 import os
+import time
+import threading
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QTreeView, QPushButton, QLineEdit, QLabel,
     QMenuBar, QMenu, QStatusBar, QFileDialog, QMessageBox,
-    QSplitter, QStyle, QToolBar, QComboBox, QFileSystemModel
+    QSplitter, QStyle, QToolBar, QComboBox, QFileSystemModel,
+    QStackedWidget, QPlainTextEdit, QTableView, QHeaderView
 )
-from PySide6.QtCore import Qt, QDir, QSize
-from PySide6.QtGui import QAction, QIcon
+from PySide6.QtCore import Qt, QDir, QSize, QObject, Signal, QTimer, QEvent
+from PySide6.QtGui import QAction, QIcon, QPixmap
 from file_manager import FileManager
 
+
+class JobSignals(QObject):
+    """Bridges scheduler callbacks from worker threads to the GUI thread."""
+    progress = Signal(object, object)
+    finished = Signal(object)
+
+
+class WatchSignals(QObject):
+    """Delivers coalesced filesystem change batches from the watcher thread."""
+    changed = Signal(object)
+
+
+class PreviewSignals(QObject):
+    """Delivers previews built on the preview pool."""
+    ready = Signal(object)
+
+
+class UsageSignals(QObject):
+    """Delivers folder sizes computed on background threads."""
+    usage_ready = Signal(str, object)
+
+
+class DriveSignals(QObject):
+    """Delivers drive lists enumerated on a background thread."""
+    ready = Signal(object)
+
+
+# Modules that should not be imported before the window first paints
+DEFERRED_MODULES = ('send2trash', 'jobs', 'watcher', 'preview', 'copy_engine', 'disk_usage', 'search_model',
+                    'history')
+
+
+class StartupProfiler(QObject):
+    """Records startup milestones, relative to process start, for --profile-startup."""
+
+    def __init__(self, started: float):
+        super().__init__()
+        self.started = started
+        self.marks = {}
+        self.loaded_before_paint = []
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.started
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and 'first paint' not in self.marks:
+            self.mark('first paint')
+            self.loaded_before_paint = [name for name in DEFERRED_MODULES if name in sys.modules]
+        return False
+
+    def report(self):
+        lines = [f"Startup profile (QT_QPA_PLATFORM={os.environ.get('QT_QPA_PLATFORM', '')})"]
+        for name, seconds in sorted(self.marks.items(), key=lambda item: item[1]):
+            lines.append(f"  {name:<24} {seconds * 1000:>9.1f} ms")
+        loaded = ", ".join(self.loaded_before_paint) or "none"
+        lines.append(f"Deferred modules imported before first paint: {loaded}")
+        return "\n".join(lines)
+
+
 class FileManagerUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.file_manager = FileManager()
+        # Jobs, the watcher and previews are set up on first use or after the
+        # first paint; see finish_startup()
+        self.scheduler = None
+        self.job_signals = JobSignals()
+        self.job_signals.progress.connect(self.on_job_progress)
+        self.job_signals.finished.connect(self.on_job_finished)
+        self.clipboard_paths = []
+        self.clipboard_mode = None
+        self.usage_signals = UsageSignals()
+        self.usage_signals.usage_ready.connect(self.on_usage_ready)
+        self.usage_cancel = None
+        # Folder sizes are refreshed at most once per interval however many changes arrive
+        self.usage_timer = QTimer(self)
+        self.usage_timer.setSingleShot(True)
+        self.usage_timer.setInterval(1000)
+        self.usage_timer.timeout.connect(self.refresh_usage)
+        self.properties_box = None
+        self.watch_signals = WatchSignals()
+        self.watch_signals.changed.connect(self.on_directory_changed)
+        self.watcher = None
+        self.watched_path = None
+        self.preview_signals = PreviewSignals()
+        self.preview_signals.ready.connect(self.on_preview_ready)
+        self.preview_service = None
+        self.preview_path = None
+        self.drive_signals = DriveSignals()
+        self.drive_signals.ready.connect(self.set_drive_list)
+        self.history = None
+        self.prefetcher = None
+        self.started = False
         self.init_ui()
 
     def init_ui(self):
@@ -30,10 +123,11 @@ class FileManagerUI(QMainWindow):
         self.path_combo = QComboBox()
         self.path_combo.setEditable(True)
         self.path_combo.setMinimumWidth(300)
-        self.path_combo.currentTextChanged.connect(self.navigate_to_path)
+        # Typing follows along without touching history; only a committed path is a visit
+        self.path_combo.currentTextChanged.connect(lambda text: self.navigate_to_path(text, record=False))
+        self.path_combo.textActivated.connect(self.navigate_to_path)
         
         self.drive_combo = QComboBox()
-        self.update_drive_list()
         self.drive_combo.currentTextChanged.connect(self.change_drive)
         
         address_layout.addWidget(QLabel("Drive:"))
@@ -44,12 +138,11 @@ class FileManagerUI(QMainWindow):
 
         splitter = QSplitter(Qt.Horizontal)
 
+        # The model is not rooted (and so not populated) until finish_startup()
         self.model = QFileSystemModel()
-        self.model.setRootPath(QDir.rootPath())
-        
+
         self.tree_view = QTreeView()
         self.tree_view.setModel(self.model)
-        self.tree_view.setRootIndex(self.model.index(QDir.rootPath()))
         self.tree_view.setAnimated(True)
         self.tree_view.setIndentation(20)
         self.tree_view.setSortingEnabled(True)
@@ -61,15 +154,41 @@ class FileManagerUI(QMainWindow):
 
         self.details_view = QTreeView()
         self.details_view.setModel(self.model)
-        self.details_view.setRootIndex(self.model.index(QDir.rootPath()))
         self.details_view.setSelectionMode(QTreeView.ExtendedSelection)
         self.details_view.setSortingEnabled(True)
         self.details_view.doubleClicked.connect(self.on_item_double_clicked)
 
+        self.details_view.selectionModel().currentChanged.connect(self.on_current_item_changed)
+
+        self.preview_text = QPlainTextEdit()
+        self.preview_text.setReadOnly(True)
+        self.preview_image = QLabel()
+        self.preview_image.setAlignment(Qt.AlignCenter)
+        self.preview_stack = QStackedWidget()
+        self.preview_stack.addWidget(self.preview_text)
+        self.preview_stack.addWidget(self.preview_image)
+
+        # Search results replace the folder listing while a query is active
+        self.results_model = None
+        self.results_view = QTableView()
+        self.results_view.setSelectionBehavior(QTableView.SelectRows)
+        self.results_view.setWordWrap(False)
+        self.results_view.verticalHeader().hide()
+        # Fixed-height rows keep scrolling and row insertion independent of the row count
+        self.results_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.results_view.verticalHeader().setDefaultSectionSize(20)
+        self.results_view.horizontalHeader().setStretchLastSection(True)
+        self.results_view.doubleClicked.connect(self.on_result_double_clicked)
+        self.content_stack = QStackedWidget()
+        self.content_stack.addWidget(self.details_view)
+        self.content_stack.addWidget(self.results_view)
+
         splitter.addWidget(self.tree_view)
-        splitter.addWidget(self.details_view)
+        splitter.addWidget(self.content_stack)
+        splitter.addWidget(self.preview_stack)
         splitter.setStretchFactor(0, 1)
         splitter.setStretchFactor(1, 2)
+        splitter.setStretchFactor(2, 1)
 
         main_layout.addWidget(splitter)
 
@@ -77,24 +196,50 @@ class FileManagerUI(QMainWindow):
         self.setStatusBar(self.status_bar)
         
         self.create_menu_bar()
-        
-        initial_path = QDir.rootPath()
-        self.navigate_to_path(initial_path)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.started:
+            self.started = True
+            # Let the rest of the first frame reach the screen before loading anything
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        from history import NavigationHistory, ListingPrefetcher
+        self.history = NavigationHistory()
+        self.prefetcher = ListingPrefetcher()
+        self.model.setRootPath(QDir.rootPath())
+        self.tree_view.setRootIndex(self.model.index(QDir.rootPath()))
+        self.details_view.setRootIndex(self.model.index(QDir.rootPath()))
+        self.start_watcher()
+        self.update_drive_list()
+        self.navigate_to_path(QDir.rootPath())
+
+    def start_watcher(self):
+        from watcher import create_watcher, cache_invalidator
+        self.watcher = create_watcher()
+        self.watcher.subscribe(cache_invalidator)
+        self.watcher.subscribe(self.watch_signals.changed.emit)
+        self.watcher.start()
 
     def create_toolbar(self):
         toolbar = QToolBar()
         toolbar.setIconSize(QSize(16, 16))
         self.addToolBar(toolbar)
 
-        back_action = QAction("Back", self)
-        back_action.setStatusTip("Go back to previous directory")
-        back_action.triggered.connect(self.go_back)
-        toolbar.addAction(back_action)
+        self.back_action = QAction("Back", self)
+        self.back_action.setStatusTip("Go back to previous directory")
+        self.back_action.setShortcut("Alt+Left")
+        self.back_action.setEnabled(False)
+        self.back_action.triggered.connect(self.go_back)
+        toolbar.addAction(self.back_action)
 
-        forward_action = QAction("Forward", self)
-        forward_action.setStatusTip("Go forward to next directory")
-        forward_action.triggered.connect(self.go_forward)
-        toolbar.addAction(forward_action)
+        self.forward_action = QAction("Forward", self)
+        self.forward_action.setStatusTip("Go forward to next directory")
+        self.forward_action.setShortcut("Alt+Right")
+        self.forward_action.setEnabled(False)
+        self.forward_action.triggered.connect(self.go_forward)
+        toolbar.addAction(self.forward_action)
 
         up_action = QAction("Up", self)
         up_action.setStatusTip("Go up one directory")
@@ -114,6 +259,12 @@ class FileManagerUI(QMainWindow):
         self.search_box.textChanged.connect(self.search_files)
         toolbar.addWidget(self.search_box)
 
+        # Searches start once typing pauses rather than on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.run_search)
+
     def create_menu_bar(self):
         menubar = self.menuBar()
 
@@ -165,32 +316,108 @@ class FileManagerUI(QMainWindow):
         view_menu.addAction(refresh_action)
 
     def update_drive_list(self):
-        drives = self.file_manager.get_drives()
+        # Probing can block on removable and network drives, so it never runs on the GUI thread
+        self.file_manager.refresh_drives(self.drive_signals.ready.emit)
+
+    def set_drive_list(self, drives):
+        current = self.drive_combo.currentData()
+        self.drive_combo.blockSignals(True)
         self.drive_combo.clear()
         for drive in drives:
             self.drive_combo.addItem(f"{drive['path']} ({drive['type']})", drive['path'])
+        index = self.drive_combo.findData(current)
+        if index >= 0:
+            self.drive_combo.setCurrentIndex(index)
+        self.drive_combo.blockSignals(False)
 
     def change_drive(self, drive_text):
         if drive_text:
             drive_path = drive_text.split(" ")[0]
             self.navigate_to_path(drive_path)
 
-    def navigate_to_path(self, path):
+    def navigate_to_path(self, path, record=True):
         if path and os.path.exists(path):
+            if self.prefetcher is not None:
+                self.prefetcher.touch(path)
             self.details_view.setRootIndex(self.model.index(path))
             self.path_combo.setCurrentText(path)
+            self.watch_directory(path)
             self.update_status_bar()
+            if self.history is not None:
+                if record:
+                    self.history.visit(path)
+                self.update_history_actions()
+                self.prefetcher.schedule(self.history.prefetch_targets())
+
+    def update_history_actions(self):
+        self.back_action.setEnabled(self.history.can_go_back)
+        self.forward_action.setEnabled(self.history.can_go_forward)
+
+    def watch_directory(self, path):
+        if self.watcher is None or path == self.watched_path:
+            return
+        if self.watched_path is not None:
+            self.watcher.unwatch(self.watched_path)
+        try:
+            self.watcher.watch(path)
+            self.watched_path = path
+        except OSError:
+            self.watched_path = None
+
+    def on_directory_changed(self, events):
+        self.update_status_bar()
 
     def update_status_bar(self):
         current_path = self.path_combo.currentText()
         try:
             properties = self.file_manager.get_item_properties(current_path)
             if properties['is_directory']:
-                status_text = f"Items: {properties.get('contents_count', 0)} | Free space: {properties.get('free_size', 'Unknown')}"
-                self.status_bar.showMessage(status_text)
+                self.status_bar.showMessage(self.format_status(properties))
+                # Cached totals are shown at once and revalidated in the background,
+                # since changes deep in the tree do not reach the watcher
+                if not self.usage_timer.isActive():
+                    self.usage_timer.start()
         except Exception as e:
             self.status_bar.showMessage(str(e))
 
+    def refresh_usage(self):
+        current_path = self.path_combo.currentText()
+        # Sizing a whole drive is too expensive to start implicitly
+        if os.path.isdir(current_path) and os.path.dirname(current_path) != current_path:
+            self.calculate_usage(current_path)
+
+    def format_status(self, properties):
+        status_text = f"Items: {properties.get('contents_count', 0)}"
+        if 'total_size' in properties:
+            status_text += f" | Size: {properties['total_size']} in {properties['file_count']} files"
+        return status_text + f" | Free space: {properties.get('free_size', 'Unknown')}"
+
+    def calculate_usage(self, path):
+        if self.usage_cancel is not None:
+            self.usage_cancel.set()
+        cancel_event = threading.Event()
+        self.usage_cancel = cancel_event
+
+        def run():
+            from disk_usage import default_calculator
+            usage = default_calculator().calculate(path, cancel_event)
+            if usage is not None:
+                self.usage_signals.usage_ready.emit(path, usage)
+
+        threading.Thread(target=run, name="usage", daemon=True).start()
+
+    def on_usage_ready(self, path, usage):
+        # The totals are passed along because a change since the walk keeps them out of the cache
+        def properties():
+            result = self.file_manager.get_item_properties(path)
+            result.update(self.file_manager.usage_properties(usage))
+            return result
+
+        if path == self.path_combo.currentText():
+            self.status_bar.showMessage(self.format_status(properties()))
+        if self.properties_box is not None and self.properties_box.property("path") == path:
+            self.properties_box.setText(self.format_properties(properties()))
+
     def on_tree_view_clicked(self, index):
         path = self.model.filePath(index)
         self.navigate_to_path(path)
@@ -200,13 +427,46 @@ class FileManagerUI(QMainWindow):
         if os.path.isdir(path):
             self.navigate_to_path(path)
 
+    def on_current_item_changed(self, current, previous):
+        path = self.model.filePath(current)
+        if not path or path == self.preview_path:
+            return
+        self.preview_path = path
+        if self.preview_service is None:
+            from preview import PreviewService
+            self.preview_service = PreviewService()
+        self.preview_service.request(path, self.preview_signals.ready.emit)
+
+    def on_preview_ready(self, preview):
+        if preview.path != self.preview_path:
+            return
+        if preview.kind == 'image' and preview.image_path:
+            self.preview_image.setPixmap(QPixmap(preview.image_path))
+            self.preview_stack.setCurrentWidget(self.preview_image)
+        else:
+            if preview.kind == 'text':
+                text = preview.text
+            elif preview.kind == 'error':
+                text = f"Cannot preview: {preview.text}"
+            else:
+                text = f"No preview available ({preview.kind})"
+            self.preview_text.setPlainText(text)
+            self.preview_stack.setCurrentWidget(self.preview_text)
+
     def go_back(self):
-        # Implement history navigation
-        pass
+        if self.history is not None:
+            self.show_history_step(self.history.back(os.path.isdir))
 
     def go_forward(self):
-        # Implement history navigation
-        pass
+        if self.history is not None:
+            self.show_history_step(self.history.forward(os.path.isdir))
+
+    def show_history_step(self, path):
+        if path is not None:
+            self.navigate_to_path(path, record=False)
+        else:
+            # Every remaining entry had been deleted
+            self.update_history_actions()
 
     def go_up(self):
         current_path = self.path_combo.currentText()
@@ -221,12 +481,50 @@ class FileManagerUI(QMainWindow):
 
     def search_files(self, query):
         if not query:
-            self.refresh()
+            self.search_timer.stop()
+            if self.results_model is not None:
+                self.results_model.clear()
+            self.content_stack.setCurrentWidget(self.details_view)
+            self.update_status_bar()
             return
+        self.search_timer.start()
 
-        current_path = self.path_combo.currentText()
-        results = self.file_manager.search_files(current_path, query, recursive=False)
-        # Implement search results display
+    def run_search(self):
+        query = self.search_box.text()
+        if not query:
+            return
+        if self.results_model is None:
+            from search_model import SearchResultsModel
+            self.results_model = SearchResultsModel(parent=self)
+            self.results_model.rowsInserted.connect(self.on_search_progress)
+            self.results_model.search_finished.connect(self.on_search_finished)
+            self.results_view.setModel(self.results_model)
+            self.results_view.setColumnWidth(0, 250)
+            self.results_view.setColumnWidth(1, 350)
+        self.results_model.start(self.path_combo.currentText(), query)
+        self.content_stack.setCurrentWidget(self.results_view)
+        self.status_bar.showMessage(f"Searching for '{query}'...")
+
+    def on_search_progress(self, parent, first, last):
+        self.status_bar.showMessage(f"Searching... {self.results_model.rowCount()} result(s)")
+
+    def on_search_finished(self, generation, count):
+        if self.results_model.searching:
+            return
+        message = f"{self.results_model.rowCount()} result(s)"
+        if self.results_model.truncated:
+            message += f" (stopped at {self.results_model.max_results})"
+        self.status_bar.showMessage(message)
+
+    def on_result_double_clicked(self, index):
+        path = self.results_model.path(index.row())
+        if os.path.isdir(path):
+            self.search_box.clear()
+            self.navigate_to_path(path)
+        else:
+            self.search_box.clear()
+            self.navigate_to_path(os.path.dirname(path))
+            self.details_view.setCurrentIndex(self.model.index(path))
 
     def create_new_file(self):
         current_path = self.path_combo.currentText()
@@ -254,15 +552,8 @@ class FileManagerUI(QMainWindow):
         )
 
         if reply == QMessageBox.Yes:
-            paths = set()
-            for index in selected:
-                if index.column() == 0:
-                    paths.add(self.model.filePath(index))
-
-            for path in paths:
-                self.file_manager.delete_item(path, use_trash=True)
-            
-            self.refresh()
+            from jobs import Job
+            self.submit_job(Job.delete(self.selected_paths(), use_trash=True))
 
     def rename_selected(self):
         selected = self.details_view.selectedIndexes()
@@ -288,25 +579,127 @@ class FileManagerUI(QMainWindow):
         path = self.model.filePath(selected[0])
         properties = self.file_manager.get_item_properties(path)
         
-        msg = QMessageBox()
+        msg = QMessageBox(self)
         msg.setWindowTitle("Properties")
-        msg.setText("\n".join([f"{k}: {v}" for k, v in properties.items()]))
-        msg.exec_()
+        msg.setProperty("path", path)
+        msg.setText(self.format_properties(properties))
+        msg.setModal(False)
+        self.properties_box = msg
+        msg.show()
+
+        if properties.get('is_directory') and 'total_size' not in properties:
+            self.calculate_usage(path)
+
+    def format_properties(self, properties):
+        text = "\n".join([f"{k}: {v}" for k, v in properties.items()])
+        if properties.get('is_directory') and 'total_size' not in properties:
+            text += "\ntotal_size: Calculating..."
+        return text
+
+    def selected_paths(self):
+        paths = []
+        for index in self.details_view.selectedIndexes():
+            if index.column() == 0:
+                path = self.model.filePath(index)
+                if path not in paths:
+                    paths.append(path)
+        return paths
 
     def copy_selected(self):
-        # Implement copy functionality
-        pass
+        self.clipboard_paths = self.selected_paths()
+        self.clipboard_mode = 'copy'
 
     def cut_selected(self):
-        # Implement cut functionality
-        pass
+        self.clipboard_paths = self.selected_paths()
+        self.clipboard_mode = 'move'
 
     def paste_items(self):
-        # Implement paste functionality
-        pass
+        if not self.clipboard_paths:
+            return
+
+        from jobs import Job
+        current_path = self.path_combo.currentText()
+        if self.clipboard_mode == 'move':
+            self.submit_job(Job.move(self.clipboard_paths, current_path))
+            self.clipboard_paths = []
+            self.clipboard_mode = None
+        else:
+            self.submit_job(Job.copy(self.clipboard_paths, current_path))
+
+    def submit_job(self, job):
+        if self.scheduler is None:
+            from jobs import JobScheduler
+            self.scheduler = JobScheduler()
+        job.on_progress = self.job_signals.progress.emit
+        job.on_finished = self.job_signals.finished.emit
+        self.scheduler.submit(job)
+        self.status_bar.showMessage(f"Started {job.total} item(s)")
+
+    def on_job_progress(self, job, results):
+        self.status_bar.showMessage(f"Processing: {job.completed}/{job.total}")
+
+    def on_job_finished(self, job):
+        failed = job.failed
+        if failed:
+            details = "\n".join(f"{result.operation.source}: {result.error}" for result in failed[:10])
+            QMessageBox.warning(self, "Operation Failed",
+                                f"{len(failed)} of {job.total} item(s) failed.\n\n{details}")
+        self.refresh()
+
+    def closeEvent(self, event):
+        self.usage_timer.stop()
+        if self.usage_cancel is not None:
+            self.usage_cancel.set()
+        if self.results_model is not None:
+            self.results_model.cancel()
+        if self.scheduler is not None:
+            self.scheduler.shutdown(wait=False)
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.preview_service is not None:
+            self.preview_service.shutdown()
+        if self.prefetcher is not None:
+            self.prefetcher.stop()
+        super().closeEvent(event)
 
 def main():
     app = QApplication(sys.argv)
     window = FileManagerUI()
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
+
+
+def profile_startup(started: float, imported: float, timeout: float = 10.0) -> int:
+    """Start the window, wait for the deferred startup work and print when each stage finished."""
+    profiler = StartupProfiler(started)
+    profiler.marks['imports'] = imported - started
+    app = QApplication.instance() or QApplication(sys.argv)
+    profiler.mark('QApplication')
+    app.installEventFilter(profiler)
+    window = FileManagerUI()
+    profiler.mark('window constructed')
+    window.drive_signals.ready.connect(lambda drives: profiler.mark('drives enumerated'))
+    window.model.directoryLoaded.connect(lambda path: profiler.mark('model populated'))
+    finish_startup = window.finish_startup
+
+    def timed_finish_startup():
+        finish_startup()
+        profiler.mark('deferred startup')
+
+    window.finish_startup = timed_finish_startup
+    window.show()
+    profiler.mark('shown')
+
+    expected = ('first paint', 'deferred startup', 'drives enumerated', 'model populated')
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and not all(name in profiler.marks for name in expected):
+        app.processEvents()
+        time.sleep(0.001)
+    app.removeEventFilter(profiler)
+    window.close()
+    print(profiler.report())
+    missing = [name for name in expected if name not in profiler.marks]
+    if missing:
+        print(f"Timed out waiting for: {', '.join(missing)}")
+    return 0
+
@@ -0,0 +1,425 @@
+import os
+import sys
+import errno
+import select
+import struct
+import threading
+import time
+from typing import List, Dict, Callable, Optional, Tuple
+
+from instrumentation import report_error
+
+
+ADDED = 'added'
+REMOVED = 'removed'
+MODIFIED = 'modified'
+
+
+class ChangeEvent:
+    __slots__ = ('kind', 'path', 'is_directory')
+
+    def __init__(self, kind: str, path: str, is_directory: bool = False):
+        self.kind = kind
+        self.path = path
+        self.is_directory = is_directory
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, ChangeEvent) and self.kind == other.kind
+                and self.path == other.path and self.is_directory == other.is_directory)
+
+    def __hash__(self) -> int:
+        return hash((self.kind, self.path, self.is_directory))
+
+    def __repr__(self) -> str:
+        return f"ChangeEvent({self.kind!r}, {self.path!r}, is_directory={self.is_directory})"
+
+
+Subscriber = Callable[[List[ChangeEvent]], None]
+
+
+class _Coalescer:
+    """Merges bursts of raw events per path and flushes them as one batch.
+
+    added then removed cancels out, removed then added becomes modified,
+    added then modified stays added, and repeated modifications collapse.
+    """
+
+    def __init__(self, window: float, flush: Callable[[List[ChangeEvent]], None]):
+        self.window = window
+        self._flush = flush
+        self._pending: Dict[str, ChangeEvent] = {}
+        self._lock = threading.Lock()
+        self._first_at: Optional[float] = None
+
+    def add(self, kind: str, path: str, is_directory: bool):
+        with self._lock:
+            if self._first_at is None:
+                self._first_at = time.monotonic()
+            previous = self._pending.get(path)
+            if previous is None:
+                self._pending[path] = ChangeEvent(kind, path, is_directory)
+            elif previous.kind == ADDED and kind == REMOVED:
+                del self._pending[path]
+            elif previous.kind == REMOVED and kind == ADDED:
+                self._pending[path] = ChangeEvent(MODIFIED, path, is_directory)
+            elif previous.kind == ADDED and kind == MODIFIED:
+                pass
+            else:
+                self._pending[path] = ChangeEvent(kind, path, is_directory)
+
+    def flush(self, force: bool = False):
+        with self._lock:
+            if not self._pending or (not force and (self._first_at is None
+                                                    or time.monotonic() - self._first_at < self.window)):
+                return
+            events = list(self._pending.values())
+            self._pending.clear()
+            self._first_at = None
+        self._flush(events)
+
+
+class Watcher:
+    """Base class for filesystem watchers that push coalesced change deltas to subscribers.
+
+    Subscribers are called on the watcher thread with a list of ChangeEvent.
+    """
+
+    def __init__(self, coalesce_window: float = 0.1):
+        self._subscribers: List[Subscriber] = []
+        self._coalescer = _Coalescer(coalesce_window, self._dispatch)
+        self._lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.overflowed = False
+
+    def subscribe(self, callback: Subscriber):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Subscriber):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def watch(self, path: str, recursive: bool = False):
+        raise NotImplementedError
+
+    def unwatch(self, path: str):
+        raise NotImplementedError
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._coalescer.flush(force=True)
+
+    def __enter__(self) -> 'Watcher':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _emit(self, kind: str, path: str, is_directory: bool = False):
+        self._coalescer.add(kind, path, is_directory)
+
+    def _dispatch(self, events: List[ChangeEvent]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(events)
+            except Exception as e:
+                report_error('watch', None, e, f"Error in watcher subscriber: {e}")
+
+    def _loop(self):
+        raise NotImplementedError
+
+
+class PollingWatcher(Watcher):
+    """Portable watcher that diffs scandir snapshots every interval seconds."""
+
+    def __init__(self, interval: float = 1.0, coalesce_window: float = 0.1):
+        super().__init__(coalesce_window)
+        self.interval = interval
+        self._roots: Dict[str, bool] = {}
+        self._snapshots: Dict[str, Dict[str, Tuple[bool, int, int]]] = {}
+
+    def watch(self, path: str, recursive: bool = False):
+        path = os.path.abspath(path)
+        with self._lock:
+            self._roots[path] = recursive
+            for directory, snapshot in self._snapshot_tree(path, recursive).items():
+                self._snapshots[directory] = snapshot
+
+    def unwatch(self, path: str):
+        path = os.path.abspath(path)
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            self._roots.pop(path, None)
+            for directory in list(self._snapshots):
+                if directory == path or directory.startswith(prefix):
+                    del self._snapshots[directory]
+
+    def poll(self):
+        """Compare the current state with the last snapshot and emit differences."""
+        with self._lock:
+            roots = dict(self._roots)
+        for root, recursive in roots.items():
+            current = self._snapshot_tree(root, recursive)
+            with self._lock:
+                if root not in self._roots:
+                    continue
+                prefix = root.rstrip(os.sep) + os.sep
+                previous_dirs = [d for d in self._snapshots if d == root or d.startswith(prefix)]
+                for directory in previous_dirs:
+                    if directory not in current:
+                        self._diff(directory, self._snapshots.pop(directory), {})
+                for directory, snapshot in current.items():
+                    before = self._snapshots.get(directory)
+                    self._snapshots[directory] = snapshot
+                    if before is None and directory == root:
+                        continue
+                    self._diff(directory, before or {}, snapshot)
+        self._coalescer.flush(force=True)
+
+    def _diff(self, directory: str, before: Dict[str, Tuple[bool, int, int]],
+              after: Dict[str, Tuple[bool, int, int]]):
+        for name, info in after.items():
+            old = before.get(name)
+            if old is None:
+                self._emit(ADDED, os.path.join(directory, name), info[0])
+            elif old != info and not (info[0] and old[0]):
+                self._emit(MODIFIED, os.path.join(directory, name), info[0])
+        for name, info in before.items():
+            if name not in after:
+                self._emit(REMOVED, os.path.join(directory, name), info[0])
+
+    def _snapshot_tree(self, root: str, recursive: bool) -> Dict[str, Dict[str, Tuple[bool, int, int]]]:
+        snapshots = {}
+        pending = [root]
+        while pending:
+            directory = pending.pop()
+            snapshot = {}
+            try:
+                with os.scandir(directory) as it:
+                    for dirent in it:
+                        try:
+                            is_directory = dirent.is_dir(follow_symlinks=False)
+                            stats = dirent.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        snapshot[dirent.name] = (is_directory, stats.st_size, stats.st_mtime_ns)
+                        if is_directory and recursive:
+                            pending.append(dirent.path)
+            except OSError:
+                continue
+            snapshots[directory] = snapshot
+        return snapshots
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_libc():
+    import ctypes
+    import ctypes.util
+    libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+class InotifyWatcher(Watcher):
+    """Linux watcher built on inotify through ctypes.
+
+    Recursive watches add a watch per directory and extend themselves when
+    directories are created or moved in. On queue overflow every watched
+    directory is reported as modified so subscribers rescan.
+    """
+
+    def __init__(self, coalesce_window: float = 0.1):
+        super().__init__(coalesce_window)
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = self._libc_errno()
+            raise OSError(err, os.strerror(err))
+        self._wd_to_path: Dict[int, str] = {}
+        self._path_to_wd: Dict[str, int] = {}
+        self._recursive: Dict[int, bool] = {}
+
+    @staticmethod
+    def _libc_errno() -> int:
+        import ctypes
+        return ctypes.get_errno()
+
+    def watch(self, path: str, recursive: bool = False):
+        path = os.path.abspath(path)
+        self._add_watch(path, recursive)
+        if recursive:
+            for root, dirs, _ in os.walk(path):
+                for name in dirs:
+                    self._add_watch(os.path.join(root, name), True)
+
+    def unwatch(self, path: str):
+        path = os.path.abspath(path)
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            for watched in list(self._path_to_wd):
+                if watched == path or watched.startswith(prefix):
+                    wd = self._path_to_wd.pop(watched)
+                    self._wd_to_path.pop(wd, None)
+                    self._recursive.pop(wd, None)
+                    self._libc.inotify_rm_watch(self._fd, wd)
+
+    def stop(self):
+        super().stop()
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _add_watch(self, path: str, recursive: bool):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = self._libc_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return
+            raise OSError(err, f"inotify_add_watch({path}): {os.strerror(err)}")
+        with self._lock:
+            self._wd_to_path[wd] = path
+            self._path_to_wd[path] = wd
+            self._recursive[wd] = recursive
+
+    def _loop(self):
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        while not self._stop.is_set():
+            if poller.poll(max(int(self._coalescer.window * 1000), 10)):
+                self._read_events()
+            self._coalescer.flush()
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            self._handle(wd, mask, name)
+
+    def _handle(self, wd: int, mask: int, name: str):
+        if mask & IN_Q_OVERFLOW:
+            self.overflowed = True
+            with self._lock:
+                paths = list(self._path_to_wd)
+            for path in paths:
+                self._emit(MODIFIED, path, True)
+            return
+
+        with self._lock:
+            directory = self._wd_to_path.get(wd)
+            recursive = self._recursive.get(wd, False)
+        if directory is None:
+            return
+
+        if mask & IN_IGNORED:
+            with self._lock:
+                self._wd_to_path.pop(wd, None)
+                self._recursive.pop(wd, None)
+                if self._path_to_wd.get(directory) == wd:
+                    del self._path_to_wd[directory]
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            self._emit(REMOVED, directory, True)
+            return
+
+        path = os.path.join(directory, name) if name else directory
+        is_directory = bool(mask & IN_ISDIR)
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            self._emit(ADDED, path, is_directory)
+            if is_directory and recursive:
+                self.watch(path, recursive=True)
+                # Entries created before the watch was in place would otherwise be missed
+                self._emit_existing(path)
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            self._emit(REMOVED, path, is_directory)
+            if is_directory:
+                self.unwatch(path)
+        elif mask & (IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB):
+            self._emit(MODIFIED, path, is_directory)
+
+    def _emit_existing(self, path: str):
+        for root, dirs, files in os.walk(path):
+            for name in dirs:
+                self._emit(ADDED, os.path.join(root, name), True)
+            for name in files:
+                self._emit(ADDED, os.path.join(root, name), False)
+
+
+def create_watcher(coalesce_window: float = 0.1, poll_interval: float = 1.0) -> Watcher:
+    """Return an inotify watcher on Linux, or a polling watcher elsewhere or on failure."""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(coalesce_window)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(poll_interval, coalesce_window)
+
+
+def cache_invalidator(events: List[ChangeEvent]):
+    """Subscriber that drops cached listings and folder sizes touched by events.
+
+    Recursive folder totals include every subfolder, so those of each changed
+    directory's ancestors up to the root are dropped as well.
+    """
+    from file_manager import FileManager
+    from disk_usage import default_calculator
+    from file_index import mark_changed
+    calculator = default_calculator()
+    directories = set()
+    for event in events:
+        directories.add(os.path.dirname(event.path))
+        if event.is_directory:
+            directories.add(event.path)
+    for directory in directories:
+        FileManager.cache.invalidate(directory)
+        calculator.invalidate_tree_above(directory)
+        mark_changed(directory)